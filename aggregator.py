@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Ring-buffer aggregation of the smartwatch MQTT stream.
+
+Replaces the flow-context arrays of the Node-RED flow. Every device gets
+fixed-size NumPy ring buffers for its heart rate history (timestamp, value,
+zone) and its raw ECG, allocated once on its first message, so memory stays
+constant however long the stream runs. Messages are read from the
+single-device topic and from the per-device fleet topics. The device is
+taken from the topic, <prefix>/<device_id>/data, because binary frames carry
+no device_id; messages on <prefix>/data are stored under DEFAULT_DEVICE.
+
+Heart rate timestamps normally increase, so the ring holds at most two sorted
+segments. Time windows are located with a binary search in each segment and
+only the samples inside the window are copied, which keeps queries O(window)
+rather than O(capacity). Messages drained from a publisher's spool or a
+restarted replay can arrive out of order; they are stored and counted, and
+until they have been overwritten windows are found by scanning the whole ring
+and sorting the matches by time.
+"""
+import json
+import threading
+from datetime import datetime
+import numpy as np
+import paho.mqtt.client as mqtt
+import config
+from payload_codec import decode_messages
+from live_stream import ZONE_TEXT
+
+DEFAULT_DEVICE = "default"
+NODE_RED_HISTORY = 61
+NODE_RED_ECG_SAMPLES = 128 * 5
+
+
+def summarize(timestamps, values):
+    """
+    Get heart rate statistics of a window.
+
+    Args:
+        timestamps (np.ndarray): Timestamps of the window, oldest first
+        values (np.ndarray): Heart rates of the window
+
+    Returns:
+        dict: start, end, count, min, max and mean; None values for an empty window
+    """
+    if not len(values):
+        return {"start": None, "end": None, "count": 0, "min": None, "max": None, "mean": None}
+    return {
+        "start": float(timestamps[0]),
+        "end": float(timestamps[-1]),
+        "count": int(len(values)),
+        "min": int(values.min()),
+        "max": int(values.max()),
+        "mean": float(values.mean())
+    }
+
+
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.float64):
+        """
+        Initialize an empty ring buffer.
+
+        Args:
+            capacity (int): Number of values kept
+            dtype: NumPy dtype of the values
+        """
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, values):
+        """
+        Append values, overwriting the oldest ones once the buffer is full.
+
+        Args:
+            values (array-like): Values to append, oldest first
+        """
+        values = np.asarray(values, dtype=self.data.dtype).ravel()[-self.capacity:]
+        n = len(values)
+        first = min(n, self.capacity - self.head)
+        self.data[self.head:self.head + first] = values[:first]
+        self.data[:n - first] = values[first:]
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def append(self, value):
+        """Append a single value."""
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def segments(self):
+        """
+        Get the stored values as views in insertion order.
+
+        Returns:
+            tuple: (older, newer) array views; older is empty until the buffer wraps
+        """
+        if self.count < self.capacity:
+            return self.data[:0], self.data[:self.count]
+        return self.data[self.head:], self.data[:self.head]
+
+    def positions(self, start, stop):
+        """
+        Map logical positions (0 is the oldest stored value) to array indices.
+
+        Args:
+            start (int): First logical position
+            stop (int): Logical position after the last one
+
+        Returns:
+            np.ndarray: Array indices
+        """
+        oldest = (self.head - self.count) % self.capacity
+        return (oldest + np.arange(start, stop)) % self.capacity
+
+    def last(self, n):
+        """
+        Get the newest values in insertion order.
+
+        Args:
+            n (int): Number of values
+
+        Returns:
+            np.ndarray: Copy of the last min(n, len(self)) values
+        """
+        n = min(n, self.count)
+        return self.data[self.positions(self.count - n, self.count)]
+
+
+class DeviceBuffers:
+    def __init__(self, history_seconds=config.AGGREGATOR_HISTORY_SECONDS,
+                 ecg_seconds=config.AGGREGATOR_ECG_SECONDS, sampling_rate=config.SAMPLING_RATE):
+        """
+        Allocate the ring buffers of one device.
+
+        Args:
+            history_seconds (int): Heart rate values kept, one per message
+            ecg_seconds (int): Seconds of raw ECG kept
+            sampling_rate (int): ECG sampling rate in Hz
+        """
+        self.timestamps = RingBuffer(history_seconds, np.float64)
+        self.heart_rates = RingBuffer(history_seconds, np.int16)
+        self.zones = RingBuffer(history_seconds, np.int8)
+        self.ecg = RingBuffer(ecg_seconds * sampling_rate, np.float32)
+        self.participant = None
+        self.quality = None
+        self.updates = 0
+        self.out_of_order = 0
+        # Number of updates after which the last out-of-order entry has been overwritten
+        self._unsorted_until = 0
+
+    @property
+    def ordered(self):
+        """Whether the stored timestamps are in insertion order, so windows can use binary search."""
+        return self.updates >= self._unsorted_until
+
+    def add(self, message):
+        """
+        Store one decoded smartwatch message.
+
+        Args:
+            message (dict): Message returned by payload_codec.decode_messages
+        """
+        timestamp = message["timestamp"]
+        if len(self.timestamps) and timestamp < self.timestamps.last(1)[0]:
+            # The ring is unsorted until the entry before this one is overwritten
+            self.out_of_order += 1
+            self._unsorted_until = self.updates + self.timestamps.capacity
+        self.timestamps.append(timestamp)
+        self.heart_rates.append(message["heart_rate"])
+        self.zones.append(message["zone"])
+        self.ecg.extend(message["ecg_samples"])
+        self.participant = message.get("participant")
+        self.quality = message.get("quality")
+        self.updates += 1
+
+    def window(self, start=None, end=None):
+        """
+        Find the heart rate entries with start <= timestamp <= end.
+
+        Args:
+            start (float, optional): First timestamp, open-ended if None
+            end (float, optional): Last timestamp, open-ended if None
+
+        Returns:
+            np.ndarray: Array indices of the entries, oldest first
+        """
+        if not self.ordered:
+            positions = self.timestamps.positions(0, len(self.timestamps))
+            timestamps = self.timestamps.data[positions]
+            keep = np.ones(len(positions), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps <= end
+            return positions[keep][np.argsort(timestamps[keep], kind='stable')]
+        segments = self.timestamps.segments()
+        lo = 0 if start is None else sum(int(np.searchsorted(s, start, side='left')) for s in segments)
+        hi = len(self.timestamps) if end is None else sum(int(np.searchsorted(s, end, side='right')) for s in segments)
+        return self.timestamps.positions(lo, max(lo, hi))
+
+    def history(self, seconds=None, start=None, end=None):
+        """
+        Get heart rate entries by time.
+
+        Args:
+            seconds (float, optional): Only the last seconds before the newest entry
+            start (float, optional): First timestamp
+            end (float, optional): Last timestamp
+
+        Returns:
+            tuple: (timestamps, heart rates, zones) arrays, oldest first
+        """
+        if seconds is not None and len(self.timestamps):
+            if self.ordered:
+                newest = self.timestamps.last(1)[0]
+            else:
+                newest = max(segment.max() for segment in self.timestamps.segments() if len(segment))
+            start = newest - seconds
+        indices = self.window(start, end)
+        return self.timestamps.data[indices], self.heart_rates.data[indices], self.zones.data[indices]
+
+    def summary(self, seconds=None, start=None, end=None):
+        """
+        Get heart rate statistics over a time window.
+
+        Args:
+            seconds (float, optional): Only the last seconds before the newest entry
+            start (float, optional): First timestamp
+            end (float, optional): Last timestamp
+
+        Returns:
+            dict: Result of summarize()
+        """
+        timestamps, values, _ = self.history(seconds, start, end)
+        return summarize(timestamps, values)
+
+    def latest(self, history=NODE_RED_HISTORY, ecg_samples=NODE_RED_ECG_SAMPLES):
+        """
+        Build the response of the Node-RED "Get Latest Data" function.
+
+        Args:
+            history (int): Number of heart rate entries
+            ecg_samples (int): Number of ECG samples
+
+        Returns:
+            dict: timestamp, heart_rate, quality, zone, zone_text, history and ecg_samples
+        """
+        timestamps = self.timestamps.last(history)
+        values = self.heart_rates.last(history)
+        zones = self.zones.last(history)
+        heart_rate = int(values[-1]) if len(values) else 0
+        zone = int(zones[-1]) if len(zones) else 0
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "heart_rate": heart_rate,
+            "quality": self.quality,
+            "zone": zone,
+            "zone_text": ZONE_TEXT.get(zone, 'Unknown'),
+            "history": [{"time": t, "value": v, "zone": z}
+                        for t, v, z in zip(timestamps.tolist(), values.tolist(), zones.tolist())],
+            "ecg_samples": np.round(self.ecg.last(ecg_samples).astype(np.float64), 4).tolist()
+        }
+
+
+class Aggregator:
+    def __init__(self, broker=config.MQTT_BROKER, port=config.MQTT_PORT, topic_prefix=config.MQTT_TOPIC_PREFIX,
+                 max_devices=config.AGGREGATOR_MAX_DEVICES, history_seconds=config.AGGREGATOR_HISTORY_SECONDS,
+                 ecg_seconds=config.AGGREGATOR_ECG_SECONDS):
+        """
+        Initialize the aggregator. Call start() to subscribe.
+
+        Args:
+            broker (str): MQTT broker address
+            port (int): MQTT broker port
+            topic_prefix (str): Prefix of the data topics
+            max_devices (int): Devices tracked; messages from further devices are counted and ignored
+            history_seconds (int): Heart rate entries kept per device
+            ecg_seconds (int): Seconds of raw ECG kept per device
+        """
+        self.broker = broker
+        self.port = port
+        self.topic_prefix = topic_prefix
+        self.topics = [f"{topic_prefix}/data", f"{topic_prefix}/+/data"]
+        self.max_devices = max_devices
+        self.history_seconds = history_seconds
+        self.ecg_seconds = ecg_seconds
+
+        self.devices = {}
+        self._listeners = []
+        self._responses = {}
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.ignored = 0
+        self.connected = False
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+
+    def start(self):
+        """Connect to the broker in the background."""
+        self.client.connect_async(self.broker, self.port)
+        self.client.loop_start()
+
+    def stop(self):
+        """Disconnect from the broker."""
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connected = True
+            client.subscribe([(topic, 0) for topic in self.topics])
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+
+    def on_message(self, client, userdata, msg):
+        try:
+            messages = decode_messages(msg.payload)
+        except (ValueError, KeyError):
+            return
+        device_id = self.topic_device(msg.topic)
+        for message in messages:
+            self.add(message, device_id)
+        for topic, callback in self._listeners:
+            if msg.topic == topic:
+                callback(messages)
+
+    def add_listener(self, topic, callback):
+        """
+        Pass the decoded messages of one data topic on to another consumer.
+
+        Lets a consumer share the aggregator's subscription instead of
+        subscribing and decoding every frame itself.
+
+        Args:
+            topic (str): One of the data topics the aggregator subscribes to, without wildcards
+            callback (callable): Called with the list of decoded messages of every frame on topic
+        """
+        self._listeners.append((topic, callback))
+
+    def topic_device(self, topic):
+        """
+        Get the device of a data topic.
+
+        Args:
+            topic (str): <prefix>/<device_id>/data or <prefix>/data
+
+        Returns:
+            str: Device identifier, DEFAULT_DEVICE for the single-device topic
+        """
+        parts = topic[len(self.topic_prefix) + 1:].split("/")
+        return parts[0] if len(parts) == 2 else DEFAULT_DEVICE
+
+    def add(self, message, device_id=None):
+        """
+        Store one decoded smartwatch message in the buffers of its device.
+
+        Args:
+            message (dict): Message returned by payload_codec.decode_messages
+            device_id (str, optional): Device of the message, defaults to its device_id field or DEFAULT_DEVICE
+        """
+        if device_id is None:
+            device_id = message.get("device_id", DEFAULT_DEVICE)
+        with self._lock:
+            buffers = self.devices.get(device_id)
+            if buffers is None:
+                if len(self.devices) >= self.max_devices:
+                    self.ignored += 1
+                    return
+                buffers = self.devices[device_id] = DeviceBuffers(self.history_seconds, self.ecg_seconds)
+            buffers.add(message)
+            self.messages += 1
+
+    def _device(self, device_id):
+        if device_id is None:
+            device_id = DEFAULT_DEVICE if DEFAULT_DEVICE in self.devices else next(iter(self.devices), None)
+        return self.devices.get(device_id)
+
+    def heartrate_response(self, device_id=None):
+        """
+        Get the /api/heartrate response body of a device.
+
+        The body is serialized once per received message and reused until the
+        next one, so polling dashboards cost no work between messages.
+
+        Args:
+            device_id (str, optional): Device, defaults to the single-device stream or the first device seen
+
+        Returns:
+            bytes: JSON body, or None if the device has not sent data yet
+        """
+        with self._lock:
+            buffers = self._device(device_id)
+            if buffers is None or not buffers.updates:
+                return None
+            cached = self._responses.get(buffers)
+            if cached is None or cached[0] != buffers.updates:
+                cached = self._responses[buffers] = (buffers.updates, json.dumps(buffers.latest()).encode())
+            return cached[1]
+
+    def window(self, device_id=None, seconds=None, start=None, end=None):
+        """
+        Get heart rate history and statistics of a device over a time window.
+
+        Args:
+            device_id (str, optional): Device, defaults as in heartrate_response
+            seconds (float, optional): Only the last seconds before the newest entry
+            start (float, optional): First timestamp
+            end (float, optional): Last timestamp
+
+        Returns:
+            dict: summary statistics plus the history entries, or None for an unknown device
+        """
+        with self._lock:
+            buffers = self._device(device_id)
+            if buffers is None:
+                return None
+            timestamps, values, zones = buffers.history(seconds, start, end)
+        summary = summarize(timestamps, values)
+        summary["history"] = [{"time": t, "value": v, "zone": z}
+                              for t, v, z in zip(timestamps.tolist(), values.tolist(), zones.tolist())]
+        return summary
+
+    def stats(self):
+        """
+        Get aggregator counters.
+
+        Returns:
+            dict: MQTT connection state, topics, devices tracked, messages stored, stored out of order and ignored
+        """
+        with self._lock:
+            return {
+                "mqtt_connected": self.connected,
+                "topics": self.topics,
+                "devices": len(self.devices),
+                "messages": self.messages,
+                "out_of_order": sum(buffers.out_of_order for buffers in self.devices.values()),
+                "ignored": self.ignored
+            }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Batch heart rate extraction for the whole ECG dataset.
+
+Every (session, participant, video) recording is processed independently on a
+concurrent.futures.ProcessPoolExecutor and the results are written to a single
+compressed columnar table (.npz) with one row per second of ECG.
+
+Usage:
+    python batch_heart_rate.py --workers 8 --output heart_rates.npz
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import ECGProcessor, HEART_RATE_METHODS
+from gap_filling import GAP_FILL_STRATEGIES
+
+TABLE_COLUMNS = ("session", "participant", "video", "second", "heart_rate", "measured")
+
+
+def compute_recording(task):
+    """
+    Compute the heart rate series of a single recording.
+
+    Runs in a worker process, so it only takes and returns plain picklable values.
+
+    Args:
+        task (tuple): (session, participant, video, file_path, window_seconds,
+                       method, gap_fill, seed, sampling_rate)
+
+    Returns:
+        tuple: (session, participant, video, np.ndarray of heart rates,
+                np.ndarray of measured flags), with empty arrays if the file failed to load
+    """
+    session, participant, video, file_path, window_seconds, method, gap_fill, seed, sampling_rate = task
+    processor = ECGProcessor(file_path, sampling_rate=sampling_rate)
+    if not processor.load_data():
+        return session, participant, video, np.zeros(0, dtype=np.int16), np.zeros(0, dtype=bool)
+    heart_rates = processor.calculate_heart_rate(window_seconds=window_seconds, method=method,
+                                                 gap_fill=gap_fill, seed=seed)
+    return session, participant, video, heart_rates.astype(np.int16), processor.hr_measured
+
+
+def run_batch(base_path=config.BASE_PATH, workers=None, window_seconds=3, method=config.HEART_RATE_METHOD,
+              gap_fill=config.GAP_FILL_STRATEGY, seed=config.GAP_FILL_SEED, sampling_rate=config.SAMPLING_RATE,
+              sessions=None):
+    """
+    Compute heart rates for every recording in the dataset in parallel.
+
+    Args:
+        base_path (str): Base path to the dataset
+        workers (int, optional): Number of worker processes. Defaults to the CPU count
+        window_seconds (int): Heart rate window in seconds
+        method (str): Heart rate method passed to calculate_heart_rate
+        gap_fill (str): Gap fill strategy passed to calculate_heart_rate
+        seed (int): Seed for the "jitter" gap fill strategy
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+        sessions (list, optional): Restrict the batch to these sessions
+
+    Returns:
+        dict: Columnar table with the keys in TABLE_COLUMNS
+    """
+    recordings = [recording for recording in get_catalog(base_path).recordings()
+                  if sessions is None or recording.session in sessions]
+    tasks = [(r.session, r.participant, r.video, r.path, window_seconds, method, gap_fill, seed, sampling_rate)
+             for r in recordings]
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(compute_recording, tasks, chunksize=chunksize))
+
+    # A placeholder row group of length zero keeps the concatenations valid for an empty dataset
+    results.append((0, 0, 0, np.zeros(0, dtype=np.int16), np.zeros(0, dtype=bool)))
+    lengths = np.array([len(result[3]) for result in results], dtype=np.int64)
+    keys = np.array([result[:3] for result in results], dtype=np.int16)
+    return {
+        "session": np.repeat(keys[:, 0], lengths),
+        "participant": np.repeat(keys[:, 1], lengths),
+        "video": np.repeat(keys[:, 2], lengths),
+        "second": np.concatenate([np.arange(n, dtype=np.int32) for n in lengths]),
+        "heart_rate": np.concatenate([result[3] for result in results]),
+        "measured": np.concatenate([result[4] for result in results]),
+    }
+
+
+def save_heart_rate_table(table, output_path, **metadata):
+    """
+    Write a heart rate table as a compressed .npz file.
+
+    Args:
+        table (dict): Columnar table returned by run_batch
+        output_path (str): Destination file
+        **metadata: Scalar parameters stored alongside the columns
+    """
+    np.savez_compressed(output_path, **table, **{f"meta_{key}": np.asarray(value) for key, value in metadata.items()})
+
+
+def load_heart_rate_table(path):
+    """
+    Read a heart rate table written by save_heart_rate_table.
+
+    Args:
+        path (str): Path to the .npz file
+
+    Returns:
+        tuple: (dict of column arrays, dict of metadata values)
+    """
+    with np.load(path) as data:
+        table = {column: data[column] for column in TABLE_COLUMNS}
+        metadata = {key[len("meta_"):]: data[key].item() for key in data.files if key.startswith("meta_")}
+    return table, metadata
+
+
+def select_recording(table, session, participant, video):
+    """
+    Extract the heart rate series of one recording from a table.
+
+    Args:
+        table (dict): Columnar heart rate table
+        session (int): Session number
+        participant (int): Participant number
+        video (int): Video number
+
+    Returns:
+        tuple: (np.ndarray of heart rates, np.ndarray of measured flags) ordered by second
+    """
+    rows = (table["session"] == session) & (table["participant"] == participant) & (table["video"] == video)
+    order = np.argsort(table["second"][rows], kind="stable")
+    return table["heart_rate"][rows][order], table["measured"][rows][order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute heart rates for the whole ECG dataset")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--output", default="heart_rates.npz", help="Output table (.npz)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--window", type=int, default=3, help="Heart rate window in seconds (default: 3)")
+    parser.add_argument("--method", default=config.HEART_RATE_METHOD, choices=HEART_RATE_METHODS, help="Heart rate method")
+    parser.add_argument("--gap-fill", default=config.GAP_FILL_STRATEGY, choices=GAP_FILL_STRATEGIES, help="Gap fill strategy")
+    parser.add_argument("--seed", type=int, default=config.GAP_FILL_SEED, help="Seed for the jitter gap fill strategy")
+    parser.add_argument("--session", type=int, action="append", help="Only process this session (repeatable)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = run_batch(args.base_path, workers=args.workers, window_seconds=args.window, method=args.method,
+                      gap_fill=args.gap_fill, seed=args.seed, sessions=args.session)
+    elapsed = time.perf_counter() - start
+
+    save_heart_rate_table(table, args.output, window_seconds=args.window, method=args.method,
+                          gap_fill=args.gap_fill, seed=args.seed, sampling_rate=config.SAMPLING_RATE)
+    recordings = len(set(zip(table["session"], table["participant"], table["video"])))
+    print(f"Processed {recordings} recordings ({len(table['heart_rate'])} seconds) in {elapsed:.2f} s")
+    print(f"Measured {np.mean(table['measured']):.1%} of seconds, wrote {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.1f} KB)")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-pass global peak detection against the sliding-window method.
+
+Runs calculate_heart_rate with method="window" and method="global" on every
+whole-participant recording and reports the speedup and how far the measured
+heart rates of the two methods are apart.
+
+Usage:
+    python benchmarks/bench_global.py [--window 3] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import ECGProcessor
+
+
+def time_method(processor, recordings, window_seconds, method, repeat):
+    """
+    Time calculate_heart_rate over all recordings and return the best pass.
+
+    Args:
+        processor (ECGProcessor): Processor used for the calculation
+        recordings (list): Participant recordings as arrays
+        window_seconds (int): Heart rate window in seconds
+        method (str): Heart rate method to run
+        repeat (int): Number of timed passes
+
+    Returns:
+        tuple: (fastest pass in seconds, list of heart rate series from the last pass)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        results = []
+        start = time.perf_counter()
+        for data in recordings:
+            processor.ecg_data = data
+            results.append(np.asarray(processor.calculate_heart_rate(window_seconds=window_seconds, method=method)))
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Global vs sliding-window heart rate benchmark")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--window", type=int, default=3, help="Heart rate window in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes")
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.base_path)
+    processor = ECGProcessor(sampling_rate=config.SAMPLING_RATE)
+
+    recordings = []
+    for session in catalog.sessions():
+        for participant in catalog.participants(session):
+            if processor.load_participant_data(args.base_path, session, participant):
+                recordings.append(np.asarray(processor.ecg_data))
+    total_seconds = sum(len(data) for data in recordings) / processor.sampling_rate
+    print(f"Loaded {len(recordings)} participant recordings ({total_seconds / 3600:.2f} h of ECG)")
+
+    window_time, window_results = time_method(processor, recordings, args.window, "window", args.repeat)
+    global_time, global_results = time_method(processor, recordings, args.window, "global", args.repeat)
+
+    print(f"window (find_peaks per second): {window_time:.3f} s ({total_seconds / window_time:,.0f} s of ECG per s)")
+    print(f"global (one find_peaks)       : {global_time:.3f} s ({total_seconds / global_time:,.0f} s of ECG per s)")
+    print(f"speedup                       : {window_time / global_time:.1f}x")
+
+    differences = np.concatenate([np.abs(w - g) for w, g in zip(window_results, global_results)])
+    print(f"median |window - global|      : {np.median(differences):.1f} BPM "
+          f"(both include imputed seconds)")
+
+
+if __name__ == "__main__":
+    main()
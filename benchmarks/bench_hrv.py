@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the HRV metrics.
+
+Detects the beats of every whole-participant recording, then evaluates the
+HRV window once per second of ECG in three ways: RollingHRV time-domain
+metrics (incremental running sums), a full recomputation of every window
+with hrv_metrics, and RollingHRV including the Lomb-Scargle LF/HF spectrum.
+Reports windows per second and the time per window for each, and the
+largest difference between the incremental and recomputed metrics.
+
+Usage:
+    python benchmarks/bench_hrv.py [--window 60] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import ECGProcessor
+from hrv import RollingHRV, hrv_metrics, RR_MEDIAN_INTERVALS
+
+TIME_METRICS = ("artifact_fraction", "mean_rr_ms", "sdnn_ms", "rmssd_ms", "pnn50")
+
+
+def rolling(beats, num_seconds, sampling_rate, window_seconds, frequency):
+    """Evaluate a RollingHRV window at the end of every second."""
+    hrv = RollingHRV(window_seconds, sampling_rate)
+    bounds = np.searchsorted(beats, np.arange(num_seconds + 1) * sampling_rate)
+    results = []
+    for second in range(num_seconds):
+        hrv.add_beats(beats[bounds[second]:bounds[second + 1]])
+        hrv.advance((second + 1) * sampling_rate)
+        results.append(hrv.metrics(frequency=frequency))
+    return results
+
+
+def recompute(beats, num_seconds, sampling_rate, window_seconds):
+    """Recompute the metrics of every window from scratch."""
+    window_size = window_seconds * sampling_rate
+    ends = (np.arange(num_seconds) + 1) * sampling_rate
+    # RollingHRV keeps the intervals whose closing beat is inside the window, so include the beat before it
+    first = np.maximum(np.searchsorted(beats, ends - window_size) - 1, 0)
+    last = np.searchsorted(beats, ends)
+    # Earlier intervals give the artifact filter the running median RollingHRV has at the window start
+    context = np.minimum(first, 16 * RR_MEDIAN_INTERVALS)
+    return [hrv_metrics(beats[lo - c:hi], sampling_rate, frequency=False, context=c)
+            for lo, hi, c in zip(first, last, context)]
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HRV metrics throughput benchmark")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--window", type=float, default=config.HRV_WINDOW_SECONDS, help="HRV window in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes")
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.base_path)
+    processor = ECGProcessor(sampling_rate=config.SAMPLING_RATE)
+    fs = processor.sampling_rate
+    recordings = []
+    for session in catalog.sessions():
+        for participant in catalog.participants(session):
+            if processor.load_participant_data(args.base_path, session, participant):
+                processor.calculate_heart_rate(window_seconds=3, method="streaming")
+                recordings.append((np.asarray(processor.r_peaks), len(processor.ecg_data) // fs))
+    total_seconds = sum(seconds for _, seconds in recordings)
+    print(f"{len(recordings)} recordings, {total_seconds / 3600:.2f} h of ECG, "
+          f"{sum(len(beats) for beats, _ in recordings)} beats, {args.window:g} s window")
+
+    runs = {
+        "rolling time-domain": lambda: [rolling(b, n, fs, args.window, False) for b, n in recordings],
+        "recompute time-domain": lambda: [recompute(b, n, fs, args.window) for b, n in recordings],
+        "rolling + LF/HF": lambda: [rolling(b, n, fs, args.window, True) for b, n in recordings],
+    }
+    results = {}
+    # One window per second of ECG, so windows per second equals seconds of ECG processed per second
+    print(f"{'method':<22} {'windows/s':>11} {'us/window':>10}")
+    for name, run in runs.items():
+        elapsed, results[name] = best_time(run, args.repeat)
+        print(f"{name:<22} {total_seconds / elapsed:11,.0f} {1e6 * elapsed / total_seconds:10.1f}")
+
+    differences = [abs(a[key] - b[key])
+                   for rolled, recomputed in zip(results["rolling time-domain"], results["recompute time-domain"])
+                   for a, b in zip(rolled, recomputed)
+                   for key in TIME_METRICS if a[key] is not None and b[key] is not None]
+    print(f"max |rolling - recompute| over {TIME_METRICS}: {max(differences, default=0.0):.2g}")
+
+
+if __name__ == "__main__":
+    main()
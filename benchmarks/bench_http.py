@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load test for health_server.py.
+
+Starts a stub Node-RED backend answering /heartrate and /status with responses
+shaped like the flow in flows.json, starts the dashboard server in-process in
+front of it, and drives /health and /api/heartrate from concurrent keep-alive
+clients. Reports requests per second and p50/p99 latency per endpoint, and
+how many requests reached the backend.
+
+Usage:
+    python benchmarks/bench_http.py [--clients 16] [--duration 5] [--backend-delay 0.005] [--cache-ttl 0.5]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+import http.server
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_server
+
+
+def stub_heartrate_body():
+    """Build a /heartrate response like the "Get Latest Data" function of flows.json."""
+    now = time.time()
+    history = [{"time": now - 60 + i, "value": random.randint(60, 120), "zone": 2} for i in range(61)]
+    return json.dumps({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "heart_rate": history[-1]["value"],
+        "zone": 2,
+        "zone_text": "Light Activity",
+        "history": history,
+        "ecg_samples": [round(random.uniform(2.0, 3.0), 4) for _ in range(128 * 5)]
+    }).encode()
+
+
+class StubNodeRedHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    body = b"{}"
+    requests = 0
+
+    def do_GET(self):
+        StubNodeRedHandler.requests += 1
+        if self.path not in ("/heartrate", "/status"):
+            self.send_error(404)
+            return
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubNodeRedServer(http.server.ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def run_client(port, path, deadline, latencies, errors):
+    """
+    Send requests over one keep-alive connection until the deadline.
+
+    Args:
+        port (int): Server port
+        path (str): Request path
+        deadline (float): time.perf_counter() value to stop at
+        latencies (list): Receives the latency of each successful request in seconds
+        errors (list): Receives one entry per failed request
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(e)
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.close()
+
+
+def load_test(port, path, clients, duration):
+    """
+    Run concurrent keep-alive clients against one path.
+
+    Returns:
+        tuple: (requests per second, p50 latency in ms, p99 latency in ms, error count)
+    """
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    threads = [threading.Thread(target=run_client, args=(port, path, deadline, latencies, errors))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if not latencies:
+        return 0.0, 0.0, 0.0, len(errors)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return len(latencies) / elapsed, p50, p99, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="health_server.py load test")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per endpoint")
+    parser.add_argument("--workers", type=int, default=health_server.HTTP_WORKERS, help="Server worker threads")
+    parser.add_argument("--cache-ttl", type=float, default=health_server.PROXY_CACHE_TTL, help="Proxy cache TTL in seconds (0 disables)")
+    parser.add_argument("--backend-delay", type=float, default=0.005, help="Stub Node-RED response time in seconds")
+    args = parser.parse_args()
+
+    StubNodeRedHandler.delay = args.backend_delay
+    StubNodeRedHandler.body = stub_heartrate_body()
+    backend = StubNodeRedServer(("127.0.0.1", 0), StubNodeRedHandler)
+    start_server(backend)
+    server = health_server.create_server(0, workers=args.workers, node_red_port=backend.server_address[1],
+                                         cache_ttl=args.cache_ttl)
+    start_server(server)
+    port = server.server_address[1]
+    print(f"{args.clients} clients, {args.workers} workers, stub backend delay {args.backend_delay * 1000:.0f} ms, "
+          f"{len(StubNodeRedHandler.body)} byte heart rate response, cache TTL {args.cache_ttl:g} s")
+
+    print(f"{'endpoint':<16} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for path in ("/health", "/api/heartrate"):
+        rps, p50, p99, errors = load_test(port, path, args.clients, args.duration)
+        print(f"{path:<16} {rps:9.0f} {p50:8.2f} {p99:8.2f} {errors:7d}")
+
+    stats = server.proxy.stats()
+    print(f"backend requests: {StubNodeRedHandler.requests}, proxy cache hit rate {stats['cache_hit_rate']:.1%}, "
+          f"upstream connections opened: {stats['connections_created']}")
+
+    server.graceful_shutdown()
+    backend.shutdown()
+
+
+if __name__ == "__main__":
+    main()
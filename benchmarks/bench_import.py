@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for importing the processing modules.
+
+Imports each module in a fresh interpreter several times and reports the
+median wall time of the import, the peak resident memory of the process and
+whether matplotlib was loaded. The time of an empty interpreter is reported
+as the baseline. The core modules should not load matplotlib; only ecg_plots
+does.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 5] [module ...]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ("ecg_processor", "smartwatch_simulator", "fleet_simulator", "batch_heart_rate", "ecg_plots")
+
+PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+if {module!r}:
+    __import__({module!r})
+elapsed = time.perf_counter() - start
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+scale = 1 if sys.platform == "darwin" else 1024
+print(json.dumps({{"seconds": elapsed, "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+                  "matplotlib": "matplotlib" in sys.modules, "modules": len(sys.modules)}}))
+"""
+
+
+def measure(module, repeat):
+    """
+    Import a module in repeat fresh interpreters.
+
+    Args:
+        module (str): Module name, "" for an empty interpreter
+        repeat (int): Number of interpreters
+
+    Returns:
+        dict: Median import seconds and peak RSS, module count and whether matplotlib was loaded
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "max_rss": statistics.median(run["max_rss"] for run in runs),
+        "modules": runs[-1]["modules"],
+        "matplotlib": runs[-1]["matplotlib"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Module import time benchmark")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'import ms':>10} {'peak RSS MB':>12} {'modules':>8} {'matplotlib':>11}")
+    for module in ("",) + tuple(args.modules):
+        result = measure(module, args.repeat)
+        print(f"{module or '(interpreter)':<22} {1000 * result['seconds']:10.1f} {result['max_rss'] / 2**20:12.1f} "
+              f"{result['modules']:8d} {'yes' if result['matplotlib'] else 'no':>11}")
+
+
+if __name__ == "__main__":
+    main()
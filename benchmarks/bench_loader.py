@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized .dat reader against the original list comprehension
+parser and verify both produce identical samples for every dataset file.
+
+Usage:
+    python benchmarks/bench_loader.py [--repeat N]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from ecg_processor import read_ecg_file
+
+
+def legacy_read(file_path):
+    """
+    Original parser: split the text and call float() on every sample.
+
+    Args:
+        file_path (str): Path to the ECG data file
+
+    Returns:
+        np.ndarray: Parsed samples
+    """
+    with open(file_path, 'r') as file:
+        data = file.read()
+    return np.array([float(x) for x in data.split(',')])
+
+
+def time_loader(loader, files, repeat):
+    """
+    Time a loader over all files and return the best wall-clock run.
+
+    Args:
+        loader (callable): Function taking a file path and returning an array
+        files (list): File paths to load
+        repeat (int): Number of timed passes
+
+    Returns:
+        float: Fastest pass in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for file_path in files:
+            loader(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ECG .dat loader benchmark")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes")
+    args = parser.parse_args()
+
+    ecg_path = os.path.join(args.base_path, "Raw Data", "Multimodal", "ECG")
+    files = sorted(os.path.join(ecg_path, f) for f in os.listdir(ecg_path) if f.endswith('.dat'))
+
+    mismatches = []
+    total_samples = 0
+    for file_path in files:
+        expected = legacy_read(file_path).astype(np.float32)
+        actual = read_ecg_file(file_path)
+        total_samples += len(actual)
+        if actual.dtype != np.float32 or not np.array_equal(expected, actual):
+            mismatches.append(os.path.basename(file_path))
+
+    print(f"Verified {len(files)} files ({total_samples} samples), {len(mismatches)} mismatches")
+    for name in mismatches:
+        print(f"  MISMATCH: {name}")
+
+    legacy_time = time_loader(legacy_read, files, args.repeat)
+    fast_time = time_loader(read_ecg_file, files, args.repeat)
+
+    print(f"legacy float() parser : {legacy_time:.3f} s ({total_samples / legacy_time / 1e6:.2f} M samples/s)")
+    print(f"read_ecg_file         : {fast_time:.3f} s ({total_samples / fast_time / 1e6:.2f} M samples/s)")
+    print(f"speedup               : {legacy_time / fast_time:.2f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
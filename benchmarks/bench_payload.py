@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the binary payload formats against the JSON messages.
+
+Builds the one-second messages of a participant with
+SmartWatchSimulator.build_payload and reports, for every format in
+PAYLOAD_FORMATS, the mean message size, the encode and decode time per message
+and the largest sample error after a round trip. It then reports the size
+and build time of the ecg_views representations.
+
+Usage:
+    python benchmarks/bench_payload.py [--session 1] [--participant 1] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from ecg_processor import ECGProcessor
+from payload_codec import PAYLOAD_FORMATS, encode_payload, decode_payload
+from smartwatch_simulator import SmartWatchSimulator
+from ecg_views import parse_views, build_view
+
+
+def time_calls(function, items, repeat):
+    """
+    Time function over all items and return the fastest pass.
+
+    Args:
+        function (callable): Function applied to each item
+        items (list): Inputs
+        repeat (int): Number of timed passes
+
+    Returns:
+        tuple: (fastest pass in seconds, list of results from the last pass)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [function(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary vs JSON payload benchmark")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--session", type=int, default=config.DEFAULT_SESSION, help="Session number")
+    parser.add_argument("--participant", type=int, default=config.DEFAULT_PARTICIPANT, help="Participant number")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes")
+    parser.add_argument("--views", default="minmax:32,lttb:32,varint,peaks", help="Views to measure")
+    args = parser.parse_args()
+
+    processor = ECGProcessor(sampling_rate=config.SAMPLING_RATE)
+    if not processor.load_participant_data(args.base_path, args.session, args.participant):
+        sys.exit(f"No data for session {args.session}, participant {args.participant}")
+    heart_rates = processor.calculate_heart_rate(window_seconds=3, method=config.HEART_RATE_METHOD)
+
+    # build_payload does not touch the MQTT client, so no broker is needed
+    simulator = SmartWatchSimulator(base_path=args.base_path, use_cache=False, use_hr_cache=False, spool_mb=0)
+    payloads = [simulator.build_payload(processor.ecg_data, heart_rates, processor.hr_measured, second,
+                                        processor.source_files, args.participant)
+                for second in range(len(heart_rates))]
+    seconds = [second for second, payload in enumerate(payloads) if payload is not None]
+    payloads = [payload for payload in payloads if payload is not None]
+    print(f"{len(payloads)} one-second messages from session {args.session}, participant {args.participant}")
+
+    print(f"{'format':<8} {'bytes':>7} {'vs json':>8} {'encode us':>10} {'decode us':>10} {'max error':>10}")
+    json_size = None
+    for payload_format in PAYLOAD_FORMATS:
+        encode_time, messages = time_calls(lambda p: encode_payload(p, payload_format), payloads, args.repeat)
+        decode_time, decoded = time_calls(decode_payload, messages, args.repeat)
+        size = np.mean([len(message) for message in messages])
+        json_size = json_size or size
+        error = max(float(np.max(np.abs(d["ecg_samples"] - p["ecg_samples"]))) for d, p in zip(decoded, payloads))
+        print(f"{payload_format:<8} {size:7.0f} {size / json_size:7.2f}x {1e6 * encode_time / len(payloads):10.1f} "
+              f"{1e6 * decode_time / len(payloads):10.1f} {error:10.2g}")
+
+    print(f"\n{'view':<10} {'bytes':>7} {'vs json':>8} {'build us':>10}")
+    for view, points in parse_views(args.views).items():
+        build_time, messages = time_calls(
+            lambda item: build_view(item[1], view, points, processor.r_peaks, item[0], processor.sampling_rate),
+            list(zip(seconds, payloads)), args.repeat)
+        size = np.mean([len(message) for message in messages])
+        name = view if points is None else f"{view}:{points}"
+        print(f"{name:<10} {size:7.0f} {size / json_size:7.2f}x {1e6 * build_time / len(payloads):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
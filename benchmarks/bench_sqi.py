@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Calibration of the signal quality gate against the heart rate detector.
+
+Runs the window method with quality_threshold=0 on the whole dataset, so every
+window is searched, and takes the detector's outcome (measured or not) as the
+reference. For each candidate threshold it reports how many windows the gate
+would reject, how many of those the detector could not measure anyway, and how
+many of all unmeasurable windows the gate catches. A useful threshold rejects
+almost only unmeasurable windows; rejected windows that were measured are real
+readings thrown away.
+
+Usage:
+    python benchmarks/bench_sqi.py [--windows 3 5] [--thresholds 0.3 0.4 0.5]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import ECGProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signal quality gate calibration")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--windows", type=int, nargs="+", default=[3, 5], help="Heart rate windows in seconds")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6],
+                        help="Window quality thresholds to evaluate")
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.base_path)
+    processor = ECGProcessor(sampling_rate=config.SAMPLING_RATE)
+    recordings = []
+    for session in catalog.sessions():
+        for participant in catalog.participants(session):
+            if processor.load_participant_data(args.base_path, session, participant):
+                recordings.append(np.asarray(processor.ecg_data))
+    print(f"Loaded {len(recordings)} participant recordings")
+
+    for window_seconds in args.windows:
+        measured, quality = [], []
+        for data in recordings:
+            processor.ecg_data = data
+            processor.calculate_heart_rate(window_seconds=window_seconds, method="window", quality_threshold=0)
+            measured.append(processor.hr_measured)
+            quality.append(processor.hr_quality)
+        measured, quality = np.concatenate(measured), np.concatenate(quality)
+        unmeasurable = ~measured
+        print(f"\n{window_seconds} s windows: {len(measured)} windows, {unmeasurable.sum()} unmeasurable, "
+              f"median quality {np.median(quality[measured]):.3f} measured / "
+              f"{np.median(quality[unmeasurable]):.3f} unmeasurable")
+        print(f"{'threshold':>9} {'rejected':>9} {'unmeasurable':>13} {'measured lost':>14} {'caught':>12}")
+        for threshold in args.thresholds:
+            rejected = quality < threshold
+            hits = int((rejected & unmeasurable).sum())
+            print(f"{threshold:9.2f} {int(rejected.sum()):9d} {hits:13d} {int((rejected & measured).sum()):14d} "
+                  f"{hits / max(int(unmeasurable.sum()), 1):12.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the streaming peak detector.
+
+Compares samples per second of StreamingPeakDetector (fed live-sized and
+offline-sized chunks) with the sliding-window method of calculate_heart_rate,
+and reports how closely the measured heart rates agree on the whole dataset.
+
+Usage:
+    python benchmarks/bench_streaming.py [--window 3]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from scipy.signal import find_peaks
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import ECGProcessor
+from peak_detection import detect_heart_rates
+
+
+def windowed_heart_rates(ecg_data, sampling_rate, window_seconds):
+    """
+    Sliding-window detection as in calculate_heart_rate, without gap filling.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+        window_seconds (int): Size of the sliding window in seconds
+
+    Returns:
+        list: Measured heart rate or None per second
+    """
+    window_size = window_seconds * sampling_rate
+    measured = []
+    for i in range(0, len(ecg_data) - window_size, sampling_rate):
+        window = ecg_data[i:i + window_size]
+        normalized = (window - np.mean(window)) / np.std(window)
+        peaks, _ = find_peaks(normalized, height=0.5, distance=sampling_rate // 4, prominence=0.2)
+        instant_hrs = 60 * sampling_rate / np.diff(peaks)
+        valid_hrs = instant_hrs[(instant_hrs >= 40) & (instant_hrs <= 200)]
+        measured.append(int(np.mean(valid_hrs)) if len(peaks) > 2 and len(valid_hrs) >= 2 else None)
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming peak detector benchmark")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--window", type=int, default=3, help="Heart rate window in seconds")
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.base_path)
+    processor = ECGProcessor(sampling_rate=config.SAMPLING_RATE)
+    fs = processor.sampling_rate
+
+    recordings = []
+    for session in catalog.sessions():
+        for participant in catalog.participants(session):
+            if processor.load_participant_data(args.base_path, session, participant):
+                recordings.append(np.asarray(processor.ecg_data))
+    total_samples = sum(len(data) for data in recordings)
+    print(f"Loaded {len(recordings)} participant recordings ({total_samples} samples)")
+
+    start = time.perf_counter()
+    for data in recordings:
+        processor.ecg_data = data
+        processor.calculate_heart_rate(window_seconds=args.window, method="window")
+    window_time = time.perf_counter() - start
+    print(f"sliding window find_peaks   : {total_samples / window_time / 1e6:6.2f} M samples/s")
+
+    for label, chunk_seconds in (("streaming, 1 s chunks", 1), ("streaming, 30 s chunks", 30)):
+        start = time.perf_counter()
+        for data in recordings:
+            detect_heart_rates(data, fs, args.window, chunk_size=chunk_seconds * fs)
+        elapsed = time.perf_counter() - start
+        print(f"{label:28s}: {total_samples / elapsed / 1e6:6.2f} M samples/s "
+              f"({window_time / elapsed:.1f}x)")
+
+    differences = []
+    only_window = only_streaming = 0
+    for data in recordings:
+        reference = windowed_heart_rates(data, fs, args.window)
+        _, streamed = detect_heart_rates(data, fs, args.window)
+        for expected, actual in zip(reference, streamed):
+            if expected is not None and actual is not None:
+                differences.append(abs(expected - actual))
+            elif expected is not None:
+                only_window += 1
+            elif actual is not None:
+                only_streaming += 1
+
+    differences = np.array(differences)
+    print(f"Seconds measured by both    : {len(differences)}")
+    print(f"Mean absolute difference    : {differences.mean():.2f} BPM")
+    print(f"Within 2 BPM / 5 BPM        : {np.mean(differences <= 2):.1%} / {np.mean(differences <= 5):.1%}")
+    print(f"Measured only by window     : {only_window}")
+    print(f"Measured only by streaming  : {only_streaming}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,58 @@ MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
 MQTT_QOS = 0
 MQTT_TOPIC_PREFIX = "smartwatch"
+PAYLOAD_FORMAT = "json"  # "json", "f32", "delta16" or "varint"
+PAYLOAD_DELTA_RESOLUTION = 1e-4
+ECG_VIEWS = ""  # extra representations published on <data topic>/<view>, e.g. "minmax:32,peaks"
+ECG_VIEWS_ONLY = False  # publish only the views, not the full-rate <data topic> messages
+BATCH_SECONDS = 1  # seconds of data per MQTT message, 1 disables batching
+BATCH_MAX_BYTES = 262144
+BATCH_MAX_DELAY = 1.0
+PUBLISH_MAX_IN_FLIGHT = 100
+PUBLISH_QUEUE_SIZE = 1000
+PUBLISH_QUEUE_TIMEOUT = 5.0
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+SPOOL_PATH = ".mqtt_spool"
+SPOOL_MAX_MB = 64
+SPOOL_CATCHUP_RATE = 200
+
+# Aggregator Configuration
+AGGREGATOR_HISTORY_SECONDS = 3600
+AGGREGATOR_ECG_SECONDS = 60
+AGGREGATOR_MAX_DEVICES = 1000
 
 # Dataset Configuration
 BASE_PATH = "dataset"
 DEFAULT_SESSION = 1
 DEFAULT_PARTICIPANT = 1
+CACHE_PATH = ".ecg_cache"
+USE_DATA_CACHE = True
 
 # Simulator Configuration
 DEFAULT_DATA_INTERVAL = 1.0
 DEFAULT_LOOP_FOREVER = False
 DEFAULT_MAX_VIDEOS = None
 DEFAULT_RANDOM_PARTICIPANTS = False
+POOL_MEMORY_BUDGET_MB = 64
+DEFAULT_FLEET_DEVICES = 1
+DEFAULT_REPLAY_SPEED = 1.0
 
 # ECG Processing Configuration
 SAMPLING_RATE = 128
+ECG_FILTER_LOW_HZ = 0.5
+ECG_FILTER_HIGH_HZ = 40.0
+ECG_FILTER_ORDER = 3
+ECG_NOTCH_HZ = None  # 50 or 60 to remove power-line interference
+HEART_RATE_METHOD = "window"
+SQI_THRESHOLD = 0  # heart rate windows with a lower mean signal quality are not measured, 0 disables gating
+HRV_WINDOW_SECONDS = 60
+HRV_PUBLISH_INTERVAL = 5  # seconds between HRV messages, 0 disables them
+GAP_FILL_STRATEGY = "jitter"  # "hold", "interpolate" or "jitter"
+GAP_FILL_SEED = 0
+HR_CACHE_PATH = ".hr_cache"
+HR_CACHE_MEMORY_ENTRIES = 64
+USE_HR_CACHE = True
 
 # Heart Rate Zones (BPM)
 HEART_RATE_ZONES = {
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Catalog of the ECG recordings in the dataset.
+
+Filenames of the form ECGdata_s{session}p{participant}v{video}.dat are parsed
+once into Recording tuples and indexed by session, participant and video, so
+lookups never rescan the directory or rely on substring matching.
+"""
+import os
+import re
+import threading
+from collections import namedtuple
+import config
+
+FILENAME_PATTERN = re.compile(r'^ecgdata_s(\d+)p(\d+)v(\d+)\.dat$', re.IGNORECASE)
+
+Recording = namedtuple('Recording', ['session', 'participant', 'video', 'filename', 'path', 'mtime_ns'])
+
+
+def ecg_directory(base_path):
+    """
+    Get the directory holding the ECG .dat files of a dataset.
+
+    Args:
+        base_path (str): Base path to the dataset
+
+    Returns:
+        str: Path to the ECG directory
+    """
+    return os.path.join(base_path, "Raw Data", "Multimodal", "ECG")
+
+
+def parse_filename(filename):
+    """
+    Parse an ECG recording filename.
+
+    Args:
+        filename (str): Filename such as 'ECGdata_s1p10v3.dat' (session prefix is case-insensitive)
+
+    Returns:
+        tuple: (session, participant, video), or None if the name is not an ECG recording
+    """
+    match = FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    return tuple(int(g) for g in match.groups())
+
+
+class DatasetCatalog:
+    def __init__(self, base_path=config.BASE_PATH):
+        """
+        Initialize the catalog and scan the dataset directory.
+
+        Args:
+            base_path (str): Base path to the dataset
+        """
+        self.base_path = base_path
+        self.ecg_path = ecg_directory(base_path)
+        self._lock = threading.Lock()
+        self._dir_mtime_ns = None
+        self._by_name = {}
+        self._by_key = {}
+        self._by_participant = {}
+        self._by_session = {}
+        self.refresh()
+
+    def refresh(self, force=False):
+        """
+        Pick up files added to or removed from the dataset directory.
+
+        The directory is only listed again when its modification time changed
+        (or when forced), and only names not seen before are parsed.
+
+        Args:
+            force (bool): Rescan and re-stat every file even if the directory is unchanged
+
+        Returns:
+            bool: True if the index changed
+        """
+        with self._lock:
+            try:
+                dir_mtime_ns = os.stat(self.ecg_path).st_mtime_ns
+            except OSError:
+                dir_mtime_ns = None
+            if not force and dir_mtime_ns == self._dir_mtime_ns:
+                return False
+
+            seen = set()
+            changed = False
+            if dir_mtime_ns is not None:
+                with os.scandir(self.ecg_path) as entries:
+                    for entry in entries:
+                        known = self._by_name.get(entry.name)
+                        if known is None:
+                            key = parse_filename(entry.name)
+                            if key is None or not entry.is_file():
+                                continue
+                            self._add(Recording(*key, entry.name, entry.path, entry.stat().st_mtime_ns))
+                            changed = True
+                        elif force:
+                            mtime_ns = entry.stat().st_mtime_ns
+                            if mtime_ns != known.mtime_ns:
+                                self._add(known._replace(mtime_ns=mtime_ns))
+                                changed = True
+                        seen.add(entry.name)
+
+            for name in set(self._by_name) - seen:
+                self._remove(self._by_name[name])
+                changed = True
+
+            self._dir_mtime_ns = dir_mtime_ns
+            return changed
+
+    def _add(self, recording):
+        key = (recording.session, recording.participant, recording.video)
+        self._by_name[recording.filename] = recording
+        self._by_key[key] = recording
+
+        videos = self._by_participant.setdefault(key[:2], {})
+        videos[recording.video] = recording
+        self._by_session.setdefault(recording.session, set()).add(recording.participant)
+
+    def _remove(self, recording):
+        key = (recording.session, recording.participant, recording.video)
+        del self._by_name[recording.filename]
+        if self._by_key.get(key) is recording:
+            del self._by_key[key]
+            videos = self._by_participant[key[:2]]
+            del videos[recording.video]
+            if not videos:
+                del self._by_participant[key[:2]]
+                self._by_session[recording.session].discard(recording.participant)
+                if not self._by_session[recording.session]:
+                    del self._by_session[recording.session]
+
+    def get(self, session, participant, video):
+        """
+        Look up a single recording.
+
+        Args:
+            session (int): Session number
+            participant (int): Participant number
+            video (int): Video number
+
+        Returns:
+            Recording: The recording, or None if it does not exist
+        """
+        return self._by_key.get((session, participant, video))
+
+    def videos(self, session, participant, max_videos=None):
+        """
+        Get the recordings of a participant in video order.
+
+        Args:
+            session (int): Session number
+            participant (int): Participant number
+            max_videos (int, optional): Maximum number of videos to include
+
+        Returns:
+            list: Recording tuples sorted by video number
+        """
+        videos = self._by_participant.get((session, participant), {})
+        recordings = [videos[video] for video in sorted(videos)]
+        if max_videos:
+            recordings = recordings[:max_videos]
+        return recordings
+
+    def participants(self, session):
+        """
+        Get the participants that have at least one recording in a session.
+
+        Args:
+            session (int): Session number
+
+        Returns:
+            list: Sorted participant numbers
+        """
+        return sorted(self._by_session.get(session, ()))
+
+    def sessions(self):
+        """
+        Get the sessions present in the dataset.
+
+        Returns:
+            list: Sorted session numbers
+        """
+        return sorted(self._by_session)
+
+    def recordings(self):
+        """
+        Get every recording in the dataset.
+
+        Returns:
+            list: Recording tuples sorted by (session, participant, video)
+        """
+        return [self._by_key[key] for key in sorted(self._by_key)]
+
+    def __len__(self):
+        return len(self._by_key)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(base_path=config.BASE_PATH):
+    """
+    Get the shared catalog for a dataset, refreshing it if the directory changed.
+
+    Args:
+        base_path (str): Base path to the dataset
+
+    Returns:
+        DatasetCatalog: Catalog for the dataset
+    """
+    key = os.path.abspath(base_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = DatasetCatalog(base_path)
+            return catalog
+    catalog.refresh()
+    return catalog
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Binary cache of the ECG dataset.
+
+The text .dat recordings are converted once into a single contiguous float32
+blob plus a JSON index mapping (session, participant, video) to an offset and
+length inside the blob. Recordings are stored sorted by session, participant
+and video so that every participant occupies one contiguous range and can be
+returned as a zero-copy np.memmap view.
+
+Every build writes a new blob file under a unique name and the index names
+the blob it describes, so replacing the index switches both at once and a
+reader never pairs a new blob with old offsets.
+"""
+import os
+import json
+import threading
+import time
+import numpy as np
+import config
+from dataset_catalog import get_catalog
+from ecg_processor import read_ecg_file
+
+CACHE_VERSION = 2
+BLOB_PREFIX = "ecg_samples"
+INDEX_FILENAME = "ecg_index.json"
+# Blob of version 1 caches, removed by the first build that replaces one
+LEGACY_BLOB_FILENAME = "ecg_samples.f32"
+# Attempts to open the cache when a concurrent build removes the blob between reading the index and mapping it
+OPEN_ATTEMPTS = 3
+
+
+class ECGCache:
+    def __init__(self, base_path=config.BASE_PATH, cache_dir=None):
+        """
+        Initialize the dataset cache.
+
+        Args:
+            base_path (str): Base path to the dataset
+            cache_dir (str, optional): Directory for the cache files. Defaults to config.CACHE_PATH
+        """
+        self.base_path = base_path
+        self.catalog = get_catalog(base_path)
+        self.cache_dir = cache_dir if cache_dir is not None else config.CACHE_PATH
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+        self.blob_path = None
+
+        self.samples = None
+        self.index = None
+        self.recordings = {}
+        self.participants = {}
+        self._open_lock = threading.Lock()
+
+    def _read_index(self):
+        """
+        Read the index file if present.
+
+        Returns:
+            dict: Parsed index, or None if missing or unreadable
+        """
+        try:
+            with open(self.index_path, 'r') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != CACHE_VERSION or not os.path.exists(self._blob_path(index)):
+            return None
+        return index
+
+    def _blob_path(self, index):
+        """Get the path of the blob an index describes."""
+        return os.path.join(self.cache_dir, index.get("blob", LEGACY_BLOB_FILENAME))
+
+    def is_stale(self, index=None, sources=None):
+        """
+        Check whether the cache is missing or out of date with the source files.
+
+        Args:
+            index (dict, optional): Already parsed index
+            sources (list, optional): Recording tuples from the dataset catalog
+
+        Returns:
+            bool: True if the cache needs to be rebuilt
+        """
+        if index is None:
+            index = self._read_index()
+        if index is None:
+            return True
+        if sources is None:
+            self.catalog.refresh(force=True)
+            sources = self.catalog.recordings()
+        current = {recording.filename: recording.mtime_ns for recording in sources}
+        return current != index.get("sources")
+
+    def build(self, sources=None):
+        """
+        Convert every .dat file into a new binary blob and write the index.
+
+        The blob gets a name no other build uses and the index is written to a
+        temporary path and moved into place, so a reader never sees a
+        half-written cache and always maps the blob its index describes. The
+        blob of the replaced index is removed afterwards; readers that already
+        mapped it keep their mapping where the platform allows removing it.
+
+        Args:
+            sources (list, optional): Recording tuples from the dataset catalog
+
+        Returns:
+            dict: The written index
+        """
+        if sources is None:
+            self.catalog.refresh(force=True)
+            sources = self.catalog.recordings()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        recordings = []
+        offset = 0
+        blob_name = f"{BLOB_PREFIX}.{os.getpid()}.{time.time_ns()}.f32"
+        with open(os.path.join(self.cache_dir, blob_name), 'wb') as blob:
+            for recording in sources:
+                data = read_ecg_file(recording.path)
+                blob.write(data.astype('<f4', copy=False).tobytes())
+                recordings.append({
+                    "session": recording.session,
+                    "participant": recording.participant,
+                    "video": recording.video,
+                    "file": recording.filename,
+                    "offset": offset,
+                    "length": len(data)
+                })
+                offset += len(data)
+
+        index = {
+            "version": CACHE_VERSION,
+            "blob": blob_name,
+            "dtype": "<f4",
+            "total_samples": offset,
+            "sources": {recording.filename: recording.mtime_ns for recording in sources},
+            "recordings": recordings
+        }
+        previous = None
+        try:
+            with open(self.index_path, 'r') as file:
+                previous = self._blob_path(json.load(file))
+        except (OSError, ValueError, AttributeError):
+            pass
+        index_tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(index_tmp, 'w') as file:
+            json.dump(index, file)
+        os.replace(index_tmp, self.index_path)
+        if previous is not None and os.path.basename(previous) != blob_name:
+            try:
+                os.remove(previous)
+            except OSError:
+                pass
+        return index
+
+    def open(self, rebuild=False):
+        """
+        Open the cache, rebuilding it first if it is missing or stale.
+
+        Args:
+            rebuild (bool): Force a rebuild even if the cache is current
+
+        Returns:
+            bool: True if the cache is ready, False if the dataset has no recordings
+        """
+        self.catalog.refresh(force=True)
+        sources = self.catalog.recordings()
+        index = None if rebuild else self._read_index()
+        for attempt in range(OPEN_ATTEMPTS):
+            if index is None or self.is_stale(index, sources):
+                print(f"Building ECG cache in {self.cache_dir} from {len(sources)} files")
+                index = self.build(sources)
+            try:
+                samples = self._map(index)
+                break
+            except FileNotFoundError:
+                # Another process rebuilt the cache and removed this blob; its index names the new one
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+                index = self._read_index()
+
+        self.index = index
+        self.blob_path = self._blob_path(index)
+        self.samples = samples
+        self.recordings = {}
+        self.participants = {}
+        for entry in index["recordings"]:
+            key = (entry["session"], entry["participant"], entry["video"])
+            self.recordings[key] = entry
+            self.participants.setdefault(key[:2], []).append(entry)
+
+        return index["total_samples"] > 0
+
+    def _map(self, index):
+        if index["total_samples"] == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(self._blob_path(index), dtype=np.dtype(index["dtype"]), mode='r',
+                         shape=(index["total_samples"],))
+
+    def _ensure_open(self):
+        # Source files can change while the simulator runs, so every lookup checks them again
+        with self._open_lock:
+            if self.samples is None or self.is_stale(self.index):
+                self.open()
+
+    def get_recording(self, session, participant, video):
+        """
+        Get a single recording as a read-only memory-mapped view.
+
+        Args:
+            session (int): Session number
+            participant (int): Participant number
+            video (int): Video number
+
+        Returns:
+            np.ndarray: View into the cache, or None if the recording does not exist
+        """
+        self._ensure_open()
+        entry = self.recordings.get((session, participant, video))
+        if entry is None:
+            return None
+        return self.samples[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def get_participant(self, session, participant, max_videos=None):
+        """
+        Get all recordings of a participant stitched in video order.
+
+        Because recordings are stored sorted by video, the result is a single
+        contiguous view and nothing is copied.
+
+        Args:
+            session (int): Session number
+            participant (int): Participant number
+            max_videos (int, optional): Maximum number of videos to include
+
+        Returns:
+            tuple: (np.ndarray view, list of source filenames, list of video start offsets
+                   within the view), or (None, [], []) if not found
+        """
+        self._ensure_open()
+        entries = self.participants.get((session, participant), [])
+        if max_videos:
+            entries = entries[:max_videos]
+        if not entries:
+            return None, [], []
+        start = entries[0]["offset"]
+        end = entries[-1]["offset"] + entries[-1]["length"]
+        return (self.samples[start:end],
+                [entry["file"] for entry in entries],
+                [entry["offset"] - start for entry in entries])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary ECG dataset cache")
+    parser.add_argument("--base-path", default=config.BASE_PATH, help="Path to the dataset")
+    parser.add_argument("--cache-dir", default=config.CACHE_PATH, help="Directory for the cache files")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the cache is up to date")
+    args = parser.parse_args()
+
+    cache = ECGCache(args.base_path, args.cache_dir)
+    cache.open(rebuild=args.force)
+    print(f"Cache holds {len(cache.recordings)} recordings, {len(cache.samples)} samples "
+          f"({os.path.getsize(cache.blob_path) / 1e6:.1f} MB)")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+ECG preprocessing filters.
+
+A Butterworth band-pass removes baseline wander and high-frequency noise, and
+an optional IIR notch removes power-line interference. Filters are built as
+second-order sections, which stay numerically stable at the low cutoff
+frequencies used here. Coefficients are designed once per parameter set and
+reused.
+
+filter_ecg runs the filter forward and backward for a zero-phase result over
+a complete recording. StreamingFilter runs it causally over consecutive chunks
+and carries the filter state between them, so the output equals filtering
+the whole stream at once.
+"""
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, iirnotch, tf2sos, sosfilt, sosfilt_zi, sosfiltfilt
+import config
+
+
+@lru_cache(maxsize=32)
+def design_filter(sampling_rate, low_hz=config.ECG_FILTER_LOW_HZ, high_hz=config.ECG_FILTER_HIGH_HZ,
+                  order=config.ECG_FILTER_ORDER, notch_hz=config.ECG_NOTCH_HZ, notch_q=30.0):
+    """
+    Design the preprocessing filter as second-order sections.
+
+    Args:
+        sampling_rate (int): Sampling rate of the signal in Hz
+        low_hz (float): Lower band-pass cutoff in Hz
+        high_hz (float): Upper band-pass cutoff in Hz, clipped below the Nyquist frequency
+        order (int): Band-pass filter order
+        notch_hz (float, optional): Power-line frequency to remove, None for no notch
+        notch_q (float): Quality factor of the notch
+
+    Returns:
+        np.ndarray: SOS coefficients, shape (sections, 6), shared by all callers and not to be modified
+    """
+    nyquist = sampling_rate / 2
+    sos = butter(order, [low_hz / nyquist, min(high_hz / nyquist, 0.99)], btype='band', output='sos')
+    if notch_hz is not None and notch_hz < nyquist:
+        b, a = iirnotch(notch_hz, notch_q, fs=sampling_rate)
+        sos = np.vstack((sos, tf2sos(b, a)))
+    return sos
+
+
+def filter_ecg(data, sampling_rate, **filter_args):
+    """
+    Zero-phase filter a complete recording.
+
+    Args:
+        data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the signal in Hz
+        **filter_args: Filter parameters passed to design_filter
+
+    Returns:
+        np.ndarray: Filtered samples as float64
+    """
+    data = np.asarray(data, dtype=np.float64)
+    sos = design_filter(sampling_rate, **filter_args)
+    # sosfiltfilt pads the signal; recordings shorter than the padding are returned unfiltered
+    if len(data) <= 3 * (2 * len(sos) + 1):
+        return data.copy()
+    return sosfiltfilt(sos, data)
+
+
+class StreamingFilter:
+    def __init__(self, sampling_rate=config.SAMPLING_RATE, **filter_args):
+        """
+        Initialize a causal filter for a chunked stream.
+
+        Args:
+            sampling_rate (int): Sampling rate of the signal in Hz
+            **filter_args: Filter parameters passed to design_filter
+        """
+        self.sos = design_filter(sampling_rate, **filter_args)
+        self.reset()
+
+    def reset(self):
+        """Discard the filter state and start a new stream."""
+        self._zi = None
+
+    def process(self, chunk):
+        """
+        Filter the next chunk of the stream.
+
+        Args:
+            chunk (np.ndarray): Consecutive raw samples
+
+        Returns:
+            np.ndarray: Filtered samples as float64
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return chunk
+        if self._zi is None:
+            # Start in steady state for the first sample so the DC offset causes no step response
+            self._zi = sosfilt_zi(self.sos) * chunk[0]
+        filtered, self._zi = sosfilt(self.sos, chunk, zi=self._zi)
+        return filtered
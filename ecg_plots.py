@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Plotting for ECGProcessor.
+
+Kept out of ecg_processor so that processing, the simulators and the batch
+tools only import NumPy and SciPy; ECGProcessor imports this module on first
+use. Static figures are drawn with the Agg canvas through the object-oriented
+API, so they work headless, never open a window and leave no pyplot state
+behind. They are written to a file or returned as PNG bytes. The style is
+applied per figure with a style context instead of changing the global
+rcParams. Only the live monitor imports pyplot, because it needs an
+interactive window.
+"""
+import io
+import numpy as np
+from scipy.signal import find_peaks
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.gridspec import GridSpec
+
+STYLE = ['seaborn-v0_8-whitegrid', {
+    'font.family': 'sans-serif',
+    'font.sans-serif': ['Arial', 'Helvetica', 'DejaVu Sans'],
+    'axes.labelsize': 12,
+    'axes.titlesize': 14,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10
+}]
+
+
+def _detect_peaks(normalized, sampling_rate):
+    peaks, _ = find_peaks(normalized, height=0.5, distance=sampling_rate // 4, prominence=0.2)
+    return peaks
+
+
+def peaks_figure(ecg_data, sampling_rate, seconds=10):
+    """
+    Draw the first seconds of a recording, raw and normalized with detected R peaks.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the signal in Hz
+        seconds (int): Number of seconds to plot
+
+    Returns:
+        Figure: Figure attached to an Agg canvas
+    """
+    data_segment = ecg_data[:seconds * sampling_rate]
+    time = np.linspace(0, seconds, len(data_segment))
+    normalized = (data_segment - np.mean(data_segment)) / np.std(data_segment)
+    peaks = _detect_peaks(normalized, sampling_rate)
+
+    with matplotlib.style.context(STYLE):
+        fig = Figure(figsize=(15, 10))
+        FigureCanvasAgg(fig)
+        ax1, ax2 = fig.subplots(2, 1, sharex=True)
+
+        ax1.plot(time, data_segment, linewidth=0.5)
+        ax1.set_title('Raw ECG Signal')
+        ax1.set_ylabel('Amplitude')
+        ax1.grid(True)
+
+        ax2.plot(time, normalized, linewidth=0.5)
+        ax2.plot(time[peaks], normalized[peaks], 'ro', markersize=5)
+        ax2.set_ylabel('Normalized Amplitude')
+
+        if len(peaks) > 2:
+            instant_hrs = 60 * sampling_rate / np.diff(peaks)
+            valid_hrs = instant_hrs[(instant_hrs >= 40) & (instant_hrs <= 200)]
+            if len(valid_hrs) >= 1:
+                ax2.set_title(f'ECG Signal with Detected R Peaks - Heart Rate: {int(np.mean(valid_hrs))} BPM')
+            else:
+                ax2.set_title('ECG Signal with Detected R Peaks - Heart Rate: Unable to calculate')
+        else:
+            ax2.set_title('ECG Signal with Detected R Peaks - Not enough peaks detected')
+
+        ax2.set_xlabel('Time (seconds)')
+        fig.tight_layout()
+    return fig
+
+
+def render_figure(fig, path=None, dpi=100):
+    """
+    Render a figure to a file or to PNG bytes.
+
+    Args:
+        fig (Figure): Figure to render
+        path (str, optional): Image file to write, format from its extension
+        dpi (int): Resolution of the image
+
+    Returns:
+        bytes: PNG image when no path is given, None otherwise
+    """
+    with matplotlib.style.context(STYLE):
+        if path is not None:
+            fig.savefig(path, dpi=dpi)
+            return None
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        return buffer.getvalue()
+
+
+def render_peaks(ecg_data, sampling_rate, seconds=10, path=None, dpi=100):
+    """
+    Render peaks_figure to a file or to PNG bytes.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the signal in Hz
+        seconds (int): Number of seconds to plot
+        path (str, optional): Image file to write, format from its extension
+        dpi (int): Resolution of the image
+
+    Returns:
+        bytes: PNG image when no path is given, None otherwise
+    """
+    return render_figure(peaks_figure(ecg_data, sampling_rate, seconds), path, dpi)
+
+
+def live_monitor(processor, duration_seconds=60, window_size=10):
+    """
+    Display a live ECG visualization with heart rate measurements.
+
+    Args:
+        processor (ECGProcessor): Processor with loaded data and calculated heart rates
+        duration_seconds (int): Duration of the monitoring in seconds
+        window_size (int): Size of the sliding window in seconds to display
+
+    Returns:
+        FuncAnimation: The animation, once the window is closed
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    ecg_data = processor.ecg_data
+    sampling_rate = processor.sampling_rate
+    heart_rates = processor.heart_rates
+    source_files = processor.source_files
+
+    with matplotlib.style.context(STYLE):
+        fig = plt.figure(figsize=(14, 9), facecolor='#f8f9fa')
+        gs = GridSpec(3, 1, height_ratios=[1, 2, 1], hspace=0.3)
+
+        if len(source_files) == 1:
+            source_info = f"Source: {source_files[0]}"
+        else:
+            source_info = f"Sources: {len(source_files)} files stitched"
+
+        fig.suptitle(f'ECG Monitoring - {source_info}', fontsize=16, fontweight='bold', y=0.98)
+
+        ax_info = fig.add_subplot(gs[0])
+        ax_info.axis('off')
+        hr_text = ax_info.text(0.5, 0.5, "Heart Rate: -- BPM",
+                               ha='center', va='center', fontsize=24, fontweight='bold')
+        time_text = ax_info.text(0.85, 0.2, "Time: 0s", ha='right', fontsize=14)
+
+        ax_ecg = fig.add_subplot(gs[1])
+        window_samples = window_size * sampling_rate
+        ecg_line, = ax_ecg.plot([], [], 'b-', linewidth=1.5)
+        peak_scatter = ax_ecg.scatter([], [], color='red', s=60, marker='o')
+
+        ax_ecg.set_xlim(0, window_samples)
+
+        amplitude_range = np.max(ecg_data) - np.min(ecg_data)
+        ax_ecg.set_ylim(np.min(ecg_data) - 0.1 * amplitude_range, np.max(ecg_data) + 0.1 * amplitude_range)
+
+        ax_ecg.grid(True, which='major', linestyle='-', linewidth=0.5, color='r', alpha=0.3)
+        ax_ecg.grid(True, which='minor', linestyle='-', linewidth=0.2, color='r', alpha=0.2)
+        ax_ecg.minorticks_on()
+
+        ax_ecg.set_ylabel('Amplitude', fontweight='bold')
+        ax_ecg.set_title('ECG Signal', fontsize=14, fontweight='bold')
+        ax_ecg.set_xticklabels([])
+
+        ax_hr = fig.add_subplot(gs[2])
+        hr_x = np.arange(duration_seconds)
+        hr_y = np.zeros(duration_seconds)
+        hr_line, = ax_hr.plot(hr_x, hr_y, 'g-', linewidth=2, marker='o', markersize=4)
+        ax_hr.set_xlim(0, duration_seconds)
+
+        if len(heart_rates) > 0:
+            ax_hr.set_ylim(max(40, min(heart_rates) - 10), min(180, max(heart_rates) + 10))
+        else:
+            ax_hr.set_ylim(40, 180)
+        ax_hr.set_xlabel('Time (s)', fontweight='bold')
+        ax_hr.set_ylabel('Heart Rate (BPM)', fontweight='bold')
+        ax_hr.set_title('Heart Rate Trend', fontsize=14, fontweight='bold')
+        ax_hr.grid(True, linestyle='--', alpha=0.7)
+
+        fig.tight_layout(rect=[0.02, 0.02, 0.98, 0.95])
+
+    def update(frame):
+        """
+        Animation update function for live ECG plotting.
+
+        Args:
+            frame (int): Current frame number
+
+        Returns:
+            tuple: Updated artists
+        """
+        if frame >= len(heart_rates) or frame >= duration_seconds:
+            return ecg_line, peak_scatter, hr_line, hr_text, time_text
+
+        hr_y[frame] = heart_rates[frame]
+        hr_line.set_data(hr_x[:frame+1], hr_y[:frame+1])
+
+        hr_text.set_text(f"Heart Rate: {heart_rates[frame]} BPM")
+        time_text.set_text(f"Time: {frame}s")
+
+        start_idx = frame * sampling_rate
+        end_idx = start_idx + window_samples
+
+        if end_idx <= len(ecg_data):
+            segment = ecg_data[start_idx:end_idx]
+            normalized = (segment - np.mean(segment)) / np.std(segment)
+            peaks = _detect_peaks(normalized, sampling_rate)
+
+            ecg_line.set_data(np.arange(len(segment)), segment)
+
+            if len(peaks) > 0:
+                peak_scatter.set_offsets(np.column_stack((peaks, segment[peaks])))
+
+        return ecg_line, peak_scatter, hr_line, hr_text, time_text
+
+    # Keep a reference, otherwise the animation is garbage collected before the window shows
+    animation = FuncAnimation(fig, update, frames=min(duration_seconds, len(heart_rates)),
+                              interval=1000, blit=True)
+    with matplotlib.style.context(STYLE):
+        plt.show()
+    return animation
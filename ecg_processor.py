@@ -1,36 +1,127 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks, butter, filtfilt
+from scipy.signal import find_peaks
 import time
 import random
-import re
-from matplotlib.animation import FuncAnimation
-from matplotlib.gridspec import GridSpec
-import matplotlib as mpl
 import config
-plt.style.use('seaborn-v0_8-whitegrid')
-mpl.rcParams['font.family'] = 'sans-serif'
-mpl.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
-mpl.rcParams['axes.labelsize'] = 12
-mpl.rcParams['axes.titlesize'] = 14
-mpl.rcParams['xtick.labelsize'] = 10
-mpl.rcParams['ytick.labelsize'] = 10
+from dataset_catalog import get_catalog
+from peak_detection import detect_heart_rates
+from gap_filling import fill_heart_rate_gaps
+from hr_cache import ecg_content_hash
+from ecg_filters import filter_ecg, StreamingFilter
+from signal_quality import signal_quality, window_quality
+
+HEART_RATE_METHODS = ("window", "streaming", "global")
+# Bump whenever a change to detection or gap filling alters heart rate output,
+# so results cached by HeartRateCache are recomputed.
+HEART_RATE_ALGORITHM_VERSION = 4
+
+
+def read_ecg_file(file_path, dtype=np.float32):
+    """
+    Read a comma-separated ECG .dat file straight into a NumPy array.
+    
+    Parsing is done by NumPy's C text reader, so no per-sample Python
+    float objects are created.
+    
+    Args:
+        file_path (str): Path to the ECG data file
+        dtype (np.dtype): Element type of the returned array
+        
+    Returns:
+        np.ndarray: 1-D array of ECG samples
+    """
+    return np.loadtxt(file_path, delimiter=',', dtype=dtype, ndmin=1).ravel()
+
+
+def stitch_recordings(arrays, dtype=np.float32):
+    """
+    Join recordings end to end into a single array allocated once.
+    
+    Args:
+        arrays (list): 1-D arrays to join, in playback order
+        dtype (np.dtype): Element type of the returned array
+        
+    Returns:
+        tuple: (np.ndarray of stitched samples, list of start offsets of each recording)
+    """
+    lengths = [len(array) for array in arrays]
+    offsets = [0]
+    for length in lengths[:-1]:
+        offsets.append(offsets[-1] + length)
+    
+    stitched = np.empty(sum(lengths), dtype=dtype)
+    for array, offset, length in zip(arrays, offsets, lengths):
+        stitched[offset:offset + length] = array
+    return stitched, offsets
+
+
+def windowed_mean_heart_rate(peaks, sampling_rate, num_samples, window_seconds):
+    """
+    Per-second heart rate from beat positions, without a Python loop.
+    
+    Second k covers samples [k * sampling_rate, k * sampling_rate + window_size) and
+    its heart rate is the mean of the valid instantaneous rates between consecutive
+    beats inside it. Window boundaries are located with searchsorted and the
+    per-window sums are differences of a cumulative sum over the RR series.
+    
+    Args:
+        peaks (np.ndarray): Sorted beat sample indices
+        sampling_rate (int): Sampling rate of the signal in Hz
+        num_samples (int): Length of the recording in samples
+        window_seconds (int): Size of the window in seconds
+        
+    Returns:
+        np.ndarray: Heart rate per second as float, NaN where fewer than three beats
+            or fewer than two valid intervals fall in the window
+    """
+    window_size = window_seconds * sampling_rate
+    starts = np.arange(0, max(num_samples - window_size, 0), sampling_rate)
+    if len(starts) == 0:
+        return np.zeros(0)
+    
+    instant_hrs = 60 * sampling_rate / np.diff(peaks) if len(peaks) > 1 else np.zeros(0)
+    valid = (instant_hrs >= 40) & (instant_hrs <= 200)
+    hr_cumsum = np.concatenate(([0.0], np.cumsum(np.where(valid, instant_hrs, 0.0))))
+    count_cumsum = np.concatenate(([0], np.cumsum(valid)))
+    
+    first = np.searchsorted(peaks, starts, side='left')
+    last = np.searchsorted(peaks, starts + window_size, side='left')
+    # Intervals j with both beats inside the window are j in [first, last - 1)
+    pair_start = np.minimum(first, len(instant_hrs))
+    pair_end = np.clip(last - 1, pair_start, len(instant_hrs))
+    hr_sum = hr_cumsum[pair_end] - hr_cumsum[pair_start]
+    hr_count = count_cumsum[pair_end] - count_cumsum[pair_start]
+    
+    heart_rates = np.full(len(starts), np.nan)
+    measured = (last - first > 2) & (hr_count >= 2)
+    heart_rates[measured] = hr_sum[measured] / hr_count[measured]
+    return heart_rates
+
 
 class ECGProcessor:
-    def __init__(self, data_path=None, sampling_rate=config.SAMPLING_RATE):
+    def __init__(self, data_path=None, sampling_rate=config.SAMPLING_RATE, cache=None, hr_cache=None):
         """
         Initialize the ECG processor.
         
         Args:
             data_path (str): Path to the ECG data file
             sampling_rate (int): Sampling rate of the ECG signal in Hz
+            cache (ECGCache, optional): Binary dataset cache used by load_participant_data
+            hr_cache (HeartRateCache, optional): Cache of computed heart rate series
         """
         self.data_path = data_path
         self.sampling_rate = sampling_rate
+        self.cache = cache
+        self.hr_cache = hr_cache
         self.ecg_data = None
         self.heart_rates = []
+        self.hr_measured = []
+        self.hr_quality = np.zeros(0, dtype=np.float32)
+        self.r_peaks = np.zeros(0, dtype=np.int64)
         self.source_files = []
+        self.video_offsets = []
+        self.stream_filter = None
         
     def load_data(self, data_path=None):
         """
@@ -44,15 +135,15 @@ class ECGProcessor:
         """
         if data_path is not None:
             self.data_path = data_path
+        self.stream_filter = None
             
         if self.data_path is None or not os.path.exists(self.data_path):
             return False
             
         try:
-            with open(self.data_path, 'r') as file:
-                data = file.read()
-            self.ecg_data = np.array([float(x) for x in data.split(',')])
+            self.ecg_data = read_ecg_file(self.data_path)
             self.source_files = [os.path.basename(self.data_path)]
+            self.video_offsets = [0]
             return True
         except Exception as e:
             return False
@@ -61,6 +152,10 @@ class ECGProcessor:
         """
         Load and stitch together all ECG data for a specific participant in a session.
         
+        The sample index at which each video starts is stored in self.video_offsets,
+        aligned with self.source_files. When a cache is attached, the data is returned
+        as a read-only memory-mapped view and the text files are not touched.
+        
         Args:
             base_path (str): Base path to the dataset
             session (int): Session number (1, 2, or 3)
@@ -70,84 +165,150 @@ class ECGProcessor:
         Returns:
             bool: True if data loaded successfully, False otherwise
         """
-        ecg_path = os.path.join(base_path, "Raw Data", "Multimodal", "ECG")
-        
-        participant_files = []
-        patterns = [f"ECGdata_s{session}p{participant}v", f"ECGdata_S{session}p{participant}v"]
-        
-        for filename in os.listdir(ecg_path):
-            for pattern in patterns:
-                if pattern.lower() in filename.lower():
-                    participant_files.append(filename)
-                    break
-        
-        if not participant_files:
+        self.stream_filter = None
+        if self.cache is not None and self.cache.base_path == base_path:
+            data, source_files, video_offsets = self.cache.get_participant(session, participant, max_videos=max_videos)
+            if data is None:
+                return False
+            self.ecg_data = data
+            self.source_files = source_files
+            self.video_offsets = video_offsets
+            return len(self.ecg_data) > 0
+        
+        recordings = get_catalog(base_path).videos(session, participant, max_videos=max_videos)
+        if not recordings:
             return False
-        
-        def get_video_number(filename):
-            match = re.search(r'v(\d+)', filename.lower())
-            if match:
-                return int(match.group(1))
-            return 0
-            
-        participant_files.sort(key=get_video_number)
-        
-        if max_videos:
-            participant_files = participant_files[:max_videos]
             
-        self.ecg_data = np.array([], dtype=np.float32)
+        arrays = []
         self.source_files = []
         
-        for filename in participant_files:
-            file_path = os.path.join(ecg_path, filename)
+        for recording in recordings:
             try:
-                with open(file_path, 'r') as file:
-                    data = file.read()
-                data_array = np.array([float(x) for x in data.split(',')])
-                self.ecg_data = np.concatenate((self.ecg_data, data_array))
-                self.source_files.append(filename)
+                arrays.append(read_ecg_file(recording.path))
+                self.source_files.append(recording.filename)
             except Exception as e:
                 pass
         
+        self.ecg_data, self.video_offsets = stitch_recordings(arrays)
         return len(self.ecg_data) > 0
             
-    def preprocess_ecg(self, data=None):
+    def preprocess_ecg(self, data=None, streaming=False):
         """
-        Simply returns the original ECG data without any preprocessing
+        Band-pass filter the ECG, plus a power-line notch if ECG_NOTCH_HZ is set.
+        
+        The offline mode filters forward and backward, so R-peaks keep their
+        positions. The streaming mode is causal and keeps the filter state in
+        the processor, so consecutive chunks passed in separate calls come out
+        as one continuous filtered signal; loading new data resets it.
         
         Args:
             data (np.ndarray): ECG data to use. If None, use self.ecg_data
+            streaming (bool): Filter data as the next chunk of a stream instead of a whole recording
             
         Returns:
-            np.ndarray: The original ECG data
+            np.ndarray: Filtered ECG data as float64
         """
         if data is None:
             if self.ecg_data is None:
                 return None
             data = self.ecg_data
         
-        return data
+        if streaming:
+            if self.stream_filter is None:
+                self.stream_filter = StreamingFilter(self.sampling_rate)
+            return self.stream_filter.process(data)
+        return filter_ecg(data, self.sampling_rate)
     
-    def calculate_heart_rate(self, window_seconds=5):
+    def calculate_heart_rate(self, window_seconds=5, method="window", gap_fill=config.GAP_FILL_STRATEGY,
+                             seed=config.GAP_FILL_SEED, quality_threshold=config.SQI_THRESHOLD):
         """
         Calculate heart rate from ECG data using peak detection.
         
+        All methods detect peaks on the output of preprocess_ecg. Windows
+        whose mean signal quality (signal_quality.signal_quality) is below
+        quality_threshold are not measured; the window method skips their
+        peak detection entirely. Seconds without enough valid beats are left
+        unmeasured by the detection step and filled afterwards in one pass by
+        fill_heart_rate_gaps. Which values were measured is stored in
+        self.hr_measured, the window quality in self.hr_quality and the
+        detected beat positions in self.r_peaks. With an hr_cache attached,
+        results for identical samples and parameters are served from the cache.
+        
         Args:
             window_seconds (int): Size of the sliding window in seconds
+            method (str): "window" re-runs peak detection on every sliding window,
+                "streaming" feeds the recording through StreamingPeakDetector once,
+                "global" filters and searches the whole recording in one pass
+            gap_fill (str): Gap fill strategy, one of "hold", "interpolate" or "jitter"
+            seed (int, optional): Seed for the "jitter" strategy
+            quality_threshold (float): Minimum mean signal quality of a window, 0 measures every window
             
         Returns:
-            list: Heart rates calculated for each second
+            np.ndarray: Heart rates (int) calculated for each second
         """
+        if method not in HEART_RATE_METHODS:
+            raise ValueError(f"Unknown heart rate method: {method}")
+        
         if self.ecg_data is None or len(self.ecg_data) == 0:
-            return []
+            self.heart_rates = np.zeros(0, dtype=int)
+            self.hr_measured = np.zeros(0, dtype=bool)
+            self.hr_quality = np.zeros(0, dtype=np.float32)
+            self.r_peaks = np.zeros(0, dtype=np.int64)
+            return self.heart_rates
+        
+        # Unseeded jitter is random by design, so its output is never cached
+        cache_key = None
+        if self.hr_cache is not None and not (gap_fill == "jitter" and seed is None):
+            # The filter settings change the output as much as the algorithm does
+            algorithm_version = (f"{HEART_RATE_ALGORITHM_VERSION}:{config.ECG_FILTER_LOW_HZ}-{config.ECG_FILTER_HIGH_HZ}"
+                                 f"/{config.ECG_FILTER_ORDER}/{config.ECG_NOTCH_HZ}/{quality_threshold}")
+            cache_key = self.hr_cache.make_key(ecg_content_hash(self.ecg_data), window_seconds, self.sampling_rate,
+                                               method, gap_fill, seed, algorithm_version)
+            cached = self.hr_cache.get(cache_key)
+            if cached is not None:
+                self.heart_rates = cached["heart_rates"]
+                self.hr_measured = cached["hr_measured"]
+                self.hr_quality = cached["hr_quality"]
+                self.r_peaks = cached["r_peaks"]
+                return self.heart_rates
+        
+        filtered = self.preprocess_ecg()
+        quality = signal_quality(self.ecg_data, self.sampling_rate)
+        if method == "global":
+            measured_hrs, self.r_peaks = self._measure_heart_rate_global(filtered, window_seconds)
+        elif method == "streaming":
+            self.r_peaks, measured_hrs = detect_heart_rates(filtered, self.sampling_rate, window_seconds)
+            measured_hrs = np.array([np.nan if hr is None else hr for hr in measured_hrs], dtype=np.float64)
+        else:
+            measured_hrs, self.r_peaks = self._measure_heart_rate_window(filtered, window_seconds, quality,
+                                                                         quality_threshold)
+        self.hr_quality = window_quality(quality, window_seconds, len(measured_hrs)).astype(np.float32)
+        measured_hrs[self.hr_quality < quality_threshold] = np.nan
+        
+        self.heart_rates, self.hr_measured = fill_heart_rate_gaps(
+            measured_hrs, strategy=gap_fill, baseline_hr=self._baseline_heart_rate(filtered, window_seconds),
+            seed=seed)
+        
+        if cache_key is not None:
+            self.hr_cache.put(cache_key, self.heart_rates, self.hr_measured, self.r_peaks, self.hr_quality)
+        return self.heart_rates
+    
+    def _baseline_heart_rate(self, filtered, window_seconds):
+        """
+        Estimate a starting heart rate from the first two windows of the recording.
+        
+        Args:
+            filtered (np.ndarray): Preprocessed ECG data
+            window_seconds (int): Size of the sliding window in seconds
             
-        ecg_data = self.ecg_data
+        Returns:
+            float: Estimated heart rate, or 70 if too few peaks are found
+        """
         window_size = window_seconds * self.sampling_rate
-        self.heart_rates = []
-        
-        initial_window = ecg_data[:window_size*2 if len(ecg_data) > window_size*2 else len(ecg_data)]
+        initial_window = filtered[:window_size*2]
         
-        normalized = (initial_window - np.mean(initial_window)) / np.std(initial_window)
+        std = np.std(initial_window)
+        normalized = (initial_window - np.mean(initial_window)) / (std if std > 0 else 1.0)
         
         initial_peaks, _ = find_peaks(normalized, 
                                     height=0.5,
@@ -156,11 +317,36 @@ class ECGProcessor:
         
         if len(initial_peaks) > 2:
             avg_peak_distance = np.mean(np.diff(initial_peaks))
-            baseline_hr = 60 * self.sampling_rate / avg_peak_distance
-        else:
-            baseline_hr = 70
+            return 60 * self.sampling_rate / avg_peak_distance
+        return 70
+    
+    def _measure_heart_rate_window(self, filtered, window_seconds, quality=None, quality_threshold=0.0):
+        """
+        Run peak detection on every sliding window, one second apart.
+        
+        Args:
+            filtered (np.ndarray): Preprocessed ECG data
+            window_seconds (int): Size of the sliding window in seconds
+            quality (np.ndarray, optional): Signal quality per second
+            quality_threshold (float): Windows with a lower mean quality are skipped without detection
             
-        for i in range(0, len(ecg_data) - window_size, self.sampling_rate):
+        Returns:
+            tuple: (np.ndarray of heart rate per second, NaN where not measured,
+                    np.ndarray of beat sample indices found in any window)
+        """
+        ecg_data = filtered
+        window_size = window_seconds * self.sampling_rate
+        heart_rates = []
+        window_peaks = []
+        starts = range(0, len(ecg_data) - window_size, self.sampling_rate)
+        usable = np.ones(len(starts), dtype=bool)
+        if quality is not None and quality_threshold > 0:
+            usable = window_quality(quality, window_seconds, len(starts)) >= quality_threshold
+        
+        for i, ok in zip(starts, usable):
+            if not ok:
+                heart_rates.append(np.nan)
+                continue
             window = ecg_data[i:i+window_size]
             
             normalized = (window - np.mean(window)) / np.std(window)
@@ -169,7 +355,9 @@ class ECGProcessor:
                                  height=0.5,
                                  distance=self.sampling_rate//4,
                                  prominence=0.2)
+            window_peaks.append(peaks + i)
             
+            heart_rate = np.nan
             if len(peaks) > 2:
                 intervals = np.diff(peaks)
                 instant_hrs = 60 * self.sampling_rate / intervals
@@ -178,81 +366,56 @@ class ECGProcessor:
                 
                 if len(valid_hrs) >= 2:
                     heart_rate = int(np.mean(valid_hrs))
-                    self.heart_rates.append(heart_rate)
-                else:
-                    last_hr = self.heart_rates[-1] if self.heart_rates else baseline_hr
-                    variation = np.random.normal(0, 2)
-                    self.heart_rates.append(int(last_hr + variation))
-            else:
-                last_hr = self.heart_rates[-1] if self.heart_rates else baseline_hr
-                variation = np.random.normal(0, 1)
-                self.heart_rates.append(int(last_hr + variation))
-                
-        return self.heart_rates
+            heart_rates.append(heart_rate)
         
-    def plot_data_with_peaks(self, seconds=10):
+        r_peaks = np.unique(np.concatenate(window_peaks)) if window_peaks else np.zeros(0, dtype=np.int64)
+        return np.array(heart_rates, dtype=np.float64), r_peaks
+    
+    def _measure_heart_rate_global(self, filtered, window_seconds):
         """
-        Plot a segment of the ECG data with detected peaks.
+        Measure per-second heart rate from a single detection over the whole recording.
+        
+        The filtered recording is normalized once, all R-peaks are found with one
+        find_peaks call, and the per-second rates are a rolling aggregate over
+        the RR-interval series.
         
         Args:
-            seconds (int): Number of seconds of data to plot
-        """
-        if self.ecg_data is None:
-            return
+            filtered (np.ndarray): Preprocessed ECG data
+            window_seconds (int): Size of the aggregation window in seconds
             
-        samples = seconds * self.sampling_rate
-        data_segment = self.ecg_data[:samples]
-        
-        time = np.linspace(0, seconds, len(data_segment))
-        
-        normalized = (data_segment - np.mean(data_segment)) / np.std(data_segment)
-        
-        peaks, _ = find_peaks(normalized, 
-                             height=0.5, 
-                             distance=self.sampling_rate//4,
-                             prominence=0.2)
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10), sharex=True)
+        Returns:
+            tuple: (np.ndarray of heart rate per second, NaN where not measured,
+                    np.ndarray of beat sample indices)
+        """
+        std = np.std(filtered)
+        normalized = (filtered - np.mean(filtered)) / (std if std > 0 else 1.0)
         
-        ax1.plot(time, data_segment, linewidth=0.5)
-        ax1.set_title('Raw ECG Signal')
-        ax1.set_ylabel('Amplitude')
-        ax1.grid(True)
+        peaks, _ = find_peaks(normalized,
+                              height=0.5,
+                              distance=self.sampling_rate//4,
+                              prominence=0.2)
         
-        ax2.plot(time, normalized, linewidth=0.5)
-        ax2.plot(time[peaks], normalized[peaks], 'ro', markersize=5)
-        ax2.set_ylabel('Normalized Amplitude')
+        return windowed_mean_heart_rate(peaks, self.sampling_rate, len(normalized), window_seconds), peaks
         
-        if len(peaks) > 2:
-            intervals = np.diff(peaks)
-            instant_hrs = 60 * self.sampling_rate / intervals
-            
-            valid_hrs = instant_hrs[(instant_hrs >= 40) & (instant_hrs <= 200)]
-            
-            if len(valid_hrs) >= 1:
-                heart_rate = int(np.mean(valid_hrs))
-                ax2.set_title(f'ECG Signal with Detected R Peaks - Heart Rate: {heart_rate} BPM')
-            else:
-                ax2.set_title('ECG Signal with Detected R Peaks - Heart Rate: Unable to calculate')
-        else:
-            ax2.set_title('ECG Signal with Detected R Peaks - Not enough peaks detected')
+    def plot_data_with_peaks(self, seconds=10, path=None, dpi=100):
+        """
+        Render a segment of the ECG data with detected peaks.
         
-        ax2.set_xlabel('Time (seconds)')
-        plt.tight_layout()
-        plt.close()
+        Drawn off-screen by ecg_plots, which is imported on first use so the
+        processor itself does not depend on matplotlib.
         
-        if len(peaks) > 1:
-            avg_peak_distance = np.mean(np.diff(peaks))
-            heart_rate = 60 * self.sampling_rate / avg_peak_distance
-            plt.title(f'ECG Data with Detected R Peaks - Heart Rate: {int(heart_rate)} BPM')
-        else:
-            plt.title('ECG Data with Detected R Peaks')
+        Args:
+            seconds (int): Number of seconds of data to plot
+            path (str, optional): Image file to write, format from its extension
+            dpi (int): Resolution of the image
             
-        plt.xlabel('Sample')
-        plt.ylabel('Amplitude (normalized)')
-        plt.grid(True)
-        plt.tight_layout()
-        plt.close()
+        Returns:
+            bytes: PNG image when no path is given, None otherwise or without data
+        """
+        if self.ecg_data is None:
+            return None
+        from ecg_plots import render_peaks
+        return render_peaks(self.ecg_data, self.sampling_rate, seconds, path=path, dpi=dpi)
         
     def simulate_real_time_monitoring(self, duration_seconds=60):
         """
@@ -261,10 +424,10 @@ class ECGProcessor:
         Args:
             duration_seconds (int): Duration of the simulation in seconds
         """
-        if not self.heart_rates:
+        if len(self.heart_rates) == 0:
             self.calculate_heart_rate()
             
-        if not self.heart_rates:
+        if len(self.heart_rates) == 0:
             return
             
         for i in range(min(duration_seconds, len(self.heart_rates))):
@@ -281,110 +444,11 @@ class ECGProcessor:
         if self.ecg_data is None:
             return
             
-        ecg_data = self.ecg_data
-            
-        if not self.heart_rates:
+        if len(self.heart_rates) == 0:
             self.calculate_heart_rate()
         
-        fig = plt.figure(figsize=(14, 9), facecolor='#f8f9fa')
-        gs = GridSpec(3, 1, height_ratios=[1, 2, 1], hspace=0.3)
-        
-        if len(self.source_files) == 1:
-            source_info = f"Source: {self.source_files[0]}"
-        else:
-            source_info = f"Sources: {len(self.source_files)} files stitched"
-        
-        fig.suptitle(f'ECG Monitoring - {source_info}', fontsize=16, fontweight='bold', y=0.98)
-        
-        ax_info = fig.add_subplot(gs[0])
-        ax_info.axis('off')
-        hr_text = ax_info.text(0.5, 0.5, "Heart Rate: -- BPM", 
-                            ha='center', va='center', fontsize=24, fontweight='bold')
-        time_text = ax_info.text(0.85, 0.2, "Time: 0s", ha='right', fontsize=14)
-        
-        ax_ecg = fig.add_subplot(gs[1])
-        window_samples = window_size * self.sampling_rate
-        ecg_line, = ax_ecg.plot([], [], 'b-', linewidth=1.5)
-        peak_scatter = ax_ecg.scatter([], [], color='red', s=60, marker='o')
-        
-        ax_ecg.set_xlim(0, window_samples)
-        
-        amplitude_range = np.max(ecg_data) - np.min(ecg_data)
-        y_min = np.min(ecg_data) - 0.1 * amplitude_range
-        y_max = np.max(ecg_data) + 0.1 * amplitude_range
-        ax_ecg.set_ylim(y_min, y_max)
-        
-        ax_ecg.grid(True, which='major', linestyle='-', linewidth=0.5, color='r', alpha=0.3)
-        ax_ecg.grid(True, which='minor', linestyle='-', linewidth=0.2, color='r', alpha=0.2)
-        ax_ecg.minorticks_on()
-        
-        ax_ecg.set_ylabel('Amplitude', fontweight='bold')
-        ax_ecg.set_title('ECG Signal', fontsize=14, fontweight='bold')
-        ax_ecg.set_xticklabels([])
-        
-        ax_hr = fig.add_subplot(gs[2])
-        hr_x = np.arange(duration_seconds)
-        hr_y = np.zeros(duration_seconds)
-        hr_line, = ax_hr.plot(hr_x, hr_y, 'g-', linewidth=2, marker='o', markersize=4)
-        ax_hr.set_xlim(0, duration_seconds)
-        
-        if self.heart_rates:
-            min_hr = max(40, min(self.heart_rates) - 10)
-            max_hr = min(180, max(self.heart_rates) + 10)
-        else:
-            min_hr = 40
-            max_hr = 180
-            
-        ax_hr.set_ylim(min_hr, max_hr)
-        ax_hr.set_xlabel('Time (s)', fontweight='bold')
-        ax_hr.set_ylabel('Heart Rate (BPM)', fontweight='bold')
-        ax_hr.set_title('Heart Rate Trend', fontsize=14, fontweight='bold')
-        ax_hr.grid(True, linestyle='--', alpha=0.7)
-        
-        plt.tight_layout(rect=[0.02, 0.02, 0.98, 0.95])
-        
-        def update(frame):
-            """
-            Animation update function for live ECG plotting.
-            
-            Args:
-                frame (int): Current frame number
-                
-            Returns:
-                tuple: Updated artists
-            """
-            if frame >= len(self.heart_rates) or frame >= duration_seconds:
-                return ecg_line, peak_scatter, hr_line, hr_text, time_text
-                
-            hr_y[frame] = self.heart_rates[frame]
-            hr_line.set_data(hr_x[:frame+1], hr_y[:frame+1])
-            
-            hr_text.set_text(f"Heart Rate: {self.heart_rates[frame]} BPM")
-            time_text.set_text(f"Time: {frame}s")
-            
-            start_idx = frame * self.sampling_rate
-            end_idx = start_idx + window_samples
-            
-            if end_idx <= len(ecg_data):
-                segment = ecg_data[start_idx:end_idx]
-                
-                normalized = (segment - np.mean(segment)) / np.std(segment)
-                
-                peaks, _ = find_peaks(normalized, 
-                                    height=0.5, 
-                                    distance=self.sampling_rate//4,
-                                    prominence=0.2)
-                
-                ecg_line.set_data(np.arange(len(segment)), segment)
-                
-                if len(peaks) > 0:
-                    peak_scatter.set_offsets(np.column_stack((peaks, segment[peaks])))
-            
-            return ecg_line, peak_scatter, hr_line, hr_text, time_text
-        
-        ani = FuncAnimation(fig, update, frames=min(duration_seconds, len(self.heart_rates)), 
-                          interval=1000, blit=True)
-        plt.show()
+        from ecg_plots import live_monitor
+        live_monitor(self, duration_seconds, window_size)
 
 
 def main():
@@ -403,7 +467,7 @@ def main():
         if success:
             heart_rates = processor.calculate_heart_rate(window_seconds=5)
             
-            if heart_rates:
+            if len(heart_rates) > 0:
                 processor.plot_data_with_peaks(seconds=10)
                 processor.live_ecg_monitoring(duration_seconds=30, window_size=5)
     else:
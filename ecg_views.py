@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Reduced representations of the per-second smartwatch messages.
+
+Every data message carries all raw samples of its second. A view republishes
+the same second in a form sized for a particular consumer on its own subtopic,
+<data topic>/<view>, so a dashboard subscribes to the representation it
+renders and a broker only carries the views that are configured. The views
+are published next to the full-rate data message unless the simulator runs
+with --views-only:
+
+- "minmax": the minimum and maximum of equal buckets, in time order, so
+  spikes such as QRS complexes survive decimation as on a min/max plot
+- "lttb": Largest-Triangle-Three-Buckets decimation, which keeps the points
+  that preserve the visual shape of the trace
+- "varint": the full second losslessly as a payload_codec "varint" frame
+- "peaks": no samples, only the timestamps of the beats in the second
+
+"minmax" and "lttb" take a point budget ("minmax:32") and send the kept sample
+values with their positions in the second as a payload_codec "decimated" frame,
+so they share the binary header of the data frames. "peaks" is JSON with the
+other message fields (heart rate, zone, quality, ...) copied unchanged.
+"""
+import json
+import numpy as np
+import config
+from payload_codec import encode_payload, encode_decimated
+
+VIEWS = ("minmax", "lttb", "varint", "peaks")
+DECIMATED_VIEWS = ("minmax", "lttb")
+DEFAULT_VIEW_POINTS = 32
+
+
+def parse_views(spec):
+    """
+    Parse a comma-separated view list such as "minmax:32,peaks".
+
+    Args:
+        spec (str or list): View names, each optionally followed by ":<points>" for a decimated view
+
+    Returns:
+        dict: Point budget by view name, None for views without one
+
+    Raises:
+        ValueError: For an unknown view or an invalid point budget
+    """
+    items = spec.split(",") if isinstance(spec, str) else spec
+    views = {}
+    for item in (item.strip() for item in items):
+        if not item:
+            continue
+        name, _, points = item.partition(":")
+        if name not in VIEWS:
+            raise ValueError(f"Unknown view: {name}")
+        if name in DECIMATED_VIEWS:
+            views[name] = int(points) if points else DEFAULT_VIEW_POINTS
+            if views[name] < 2:
+                raise ValueError(f"View {name} needs at least 2 points")
+        elif points:
+            raise ValueError(f"View {name} takes no point budget")
+        else:
+            views[name] = None
+    return views
+
+
+def view_topic(topic, view):
+    """Get the subtopic of a view of a data topic."""
+    return f"{topic}/{view}"
+
+
+def minmax_indices(samples, points):
+    """
+    Select the minimum and maximum of points // 2 equal buckets.
+
+    Args:
+        samples (np.ndarray): Samples of one message
+        points (int): Maximum number of samples kept
+
+    Returns:
+        np.ndarray: Sorted indices of the kept samples; all indices if there are no more than points samples
+    """
+    n = len(samples)
+    buckets = points // 2
+    if n <= points:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    # Sorting by (bucket, value) puts each bucket's minimum first and its maximum last
+    order = np.lexsort((samples, bucket))
+    bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+    pairs = np.sort(np.stack((order[bounds[:-1]], order[bounds[1:] - 1]), axis=1), axis=1)
+    return np.unique(pairs.ravel())
+
+
+def lttb_indices(samples, points):
+    """
+    Select points samples with Largest-Triangle-Three-Buckets.
+
+    The first and last samples are always kept. Every bucket in between keeps
+    the sample forming the largest triangle with the sample kept in the
+    previous bucket and the mean of the next bucket.
+
+    Args:
+        samples (np.ndarray): Samples of one message
+        points (int): Number of samples kept
+
+    Returns:
+        np.ndarray: Sorted indices of the kept samples; all indices if there are no more than points samples
+    """
+    n = len(samples)
+    if n <= points:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1])[:points]
+    values = np.asarray(samples, dtype=np.float64)
+    edges = 1 + np.arange(points - 1) * (n - 2) // (points - 2)
+    # Mean of every bucket and of the fixed last point, the third corner of each triangle
+    means_y = np.append(np.add.reduceat(values[:-1], edges[:-1]) / np.diff(edges), values[-1]).tolist()
+    means_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1).tolist()
+    # Buckets hold a few samples each, so plain floats beat NumPy calls in the sequential loop
+    values, edges = values.tolist(), edges.tolist()
+    indices = [0]
+    previous = 0
+    for k in range(points - 2):
+        ax, ay = previous, values[previous]
+        dx, dy = ax - means_x[k + 1], means_y[k + 1] - ay
+        best_area = -1.0
+        for x in range(edges[k], edges[k + 1]):
+            area = abs(dx * (values[x] - ay) - (ax - x) * dy)
+            if area > best_area:
+                best_area, previous = area, x
+        indices.append(previous)
+    indices.append(n - 1)
+    return np.array(indices)
+
+
+def beat_times(r_peaks, second, timestamp, sampling_rate=config.SAMPLING_RATE):
+    """
+    Get the timestamps of the beats in one second.
+
+    Args:
+        r_peaks (np.ndarray): Sorted beat sample indices of the stream
+        second (int): Index of the second
+        timestamp (float): Timestamp of the start of the second
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+
+    Returns:
+        list: Beat timestamps in seconds, rounded to the millisecond
+    """
+    start = second * sampling_rate
+    lo, hi = np.searchsorted(r_peaks, [start, start + sampling_rate])
+    return np.round(timestamp + (np.asarray(r_peaks[lo:hi]) - start) / sampling_rate, 3).tolist()
+
+
+def build_view(payload, view, points=None, r_peaks=None, second=None, sampling_rate=config.SAMPLING_RATE,
+               resolution=config.PAYLOAD_DELTA_RESOLUTION):
+    """
+    Encode one view of a data message.
+
+    Args:
+        payload (dict): Message built by SmartWatchSimulator.build_payload
+        view (str): One of VIEWS
+        points (int, optional): Point budget of a decimated view
+        r_peaks (np.ndarray, optional): Beat sample indices of the stream, needed by "peaks"
+        second (int, optional): Index of the message's second in the stream, needed by "peaks"
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+        resolution (float): Quantization step of the "varint" samples
+
+    Returns:
+        str or bytes: Encoded view, or None for "peaks" without beat positions
+    """
+    if view == "varint":
+        return encode_payload(payload, "varint", resolution)
+    if view == "peaks":
+        if r_peaks is None or second is None:
+            return None
+        message = {key: value for key, value in payload.items() if key != "ecg_samples"}
+        message["beats"] = beat_times(r_peaks, second, payload["timestamp"], sampling_rate)
+        return json.dumps(message)
+    if view not in DECIMATED_VIEWS:
+        raise ValueError(f"Unknown view: {view}")
+    samples = np.asarray(payload["ecg_samples"], dtype=np.float64)
+    select = minmax_indices if view == "minmax" else lttb_indices
+    indices = select(samples, points or DEFAULT_VIEW_POINTS)
+    return encode_decimated(dict(payload, ecg_samples=samples[indices]), indices, len(samples))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Fleet mode: many virtual smartwatches streaming from one process.
+
+Each device is a coroutine on a single asyncio event loop. Devices keep only
+a participant reference and a position; the ECG samples and heart rate series
+come from the shared ParticipantPool and are read-only, so per-device memory
+is a few hundred bytes. All devices publish through one MQTT client on their
+own topic, <topic_prefix>/<device_id>/data, with staggered start times so the
+fleet's messages are spread evenly over each interval.
+"""
+import time
+import json
+import random
+import asyncio
+import config
+from smartwatch_simulator import SmartWatchSimulator
+from publish_scheduler import PublishScheduler, format_speed
+
+
+class FleetSimulator(SmartWatchSimulator):
+    def __init__(self, devices=config.DEFAULT_FLEET_DEVICES, stagger=None, report_interval=10.0, **kwargs):
+        """
+        Initialize the fleet simulator.
+
+        Args:
+            devices (int): Number of virtual smartwatches
+            stagger (float, optional): Delay between consecutive device starts in seconds.
+                Defaults to data_interval / devices
+            report_interval (float): Seconds between fleet throughput reports
+            **kwargs: Arguments passed to SmartWatchSimulator
+        """
+        super().__init__(**kwargs)
+        self.devices = devices
+        self.stagger = stagger if stagger is not None else self.data_interval / max(devices, 1)
+        self.report_interval = report_interval
+        self.messages_published = 0
+        self.schedulers = []
+
+    def device_id(self, index):
+        """
+        Get the identifier of a device.
+
+        Args:
+            index (int): Device number
+
+        Returns:
+            str: Device identifier used in topics and payloads
+        """
+        return f"watch-{index:04d}"
+
+    def device_topic(self, device_id):
+        """
+        Get the data topic of a device.
+
+        Args:
+            device_id (str): Device identifier
+
+        Returns:
+            str: MQTT topic
+        """
+        return f"{self.topic_prefix}/{device_id}/data"
+
+    def device_hrv_topic(self, device_id):
+        """
+        Get the HRV topic of a device.
+
+        Args:
+            device_id (str): Device identifier
+
+        Returns:
+            str: MQTT topic
+        """
+        return f"{self.topic_prefix}/{device_id}/hrv"
+
+    def get_status(self):
+        status = super().get_status()
+        status["devices"] = self.devices
+        status["data_topic"] = self.device_topic("+")
+        return status
+
+    def start(self):
+        """
+        Start the fleet and run until stopped (or until every device finished once without --loop).
+
+        Returns:
+            bool: True if the fleet ran, False if it could not start
+        """
+        if not self.connect():
+            return False
+
+        self.running = True
+        try:
+            asyncio.run(self._run_fleet())
+            print("Fleet simulation completed")
+        except KeyboardInterrupt:
+            print("\nFleet simulation interrupted by user")
+        finally:
+            self.stop()
+        return True
+
+    async def _run_fleet(self):
+        participants = self.get_available_participants()
+        if not participants:
+            print(f"No participants found for session {self.session}")
+            return
+
+        loop = asyncio.get_running_loop()
+        self.pool = self.create_pool()
+        # Prepare every participant up front so devices only ever share pooled arrays
+        await loop.run_in_executor(None, lambda: [self.pool.get(p) for p in participants])
+        print(f"Starting {self.devices} devices at speed {format_speed(self.speed)} over participants "
+              f"{participants}, pool holds {self.pool.memory_used / 1e6:.1f} MB")
+
+        now, wall = time.monotonic(), time.time()
+        self.schedulers = [PublishScheduler(self.data_interval, self.speed, start=now + i * self.stagger / self.speed,
+                                            timestamp=wall + i * self.stagger)
+                           for i in range(self.devices)]
+        devices = [asyncio.create_task(self._run_device(self.device_id(i), self.schedulers[i], participants))
+                   for i in range(self.devices)]
+        background = [asyncio.create_task(self._report())]
+        if self.batcher is not None:
+            background.append(asyncio.create_task(self._flush_batches()))
+        try:
+            await asyncio.gather(*devices)
+        finally:
+            for task in background:
+                task.cancel()
+
+    async def _run_device(self, device_id, scheduler, participants):
+        """
+        Stream random participants for one device until the fleet stops.
+
+        Args:
+            device_id (str): Device identifier
+            scheduler (PublishScheduler): Schedule of the device, starting at its staggered start time
+            participants (list): Participants to choose from
+        """
+        loop = asyncio.get_running_loop()
+        topic = self.device_topic(device_id)
+        hrv = self.create_hrv()
+
+        while self.running:
+            participant = random.choice(participants)
+            # Off the event loop: a participant evicted from the pool is prepared again on a worker thread
+            prepared = await loop.run_in_executor(None, self.pool.get, participant)
+            if prepared is None:
+                await asyncio.sleep(self.data_interval)
+                continue
+            if hrv is not None:
+                hrv.reset()
+
+            for second in range(len(prepared.heart_rates)):
+                if not self.running:
+                    return
+                payload = self.build_payload(prepared.ecg_data, prepared.heart_rates, prepared.hr_measured,
+                                             second, prepared.source_files, participant,
+                                             timestamp=scheduler.timestamp(), hr_quality=prepared.hr_quality)
+                if payload is None:
+                    continue
+                payload["device_id"] = device_id
+                await scheduler.wait_async()
+                for message_topic, message in self.encode_messages(payload, topic, prepared.r_peaks, second):
+                    await self.pipeline.submit_async(message_topic, message)
+                self.messages_published += 1
+                if hrv is not None:
+                    hrv_payload = self.update_hrv(hrv, prepared.r_peaks, second, payload["timestamp"], participant)
+                    if hrv_payload is not None:
+                        hrv_payload["device_id"] = device_id
+                        await self.pipeline.submit_async(self.device_hrv_topic(device_id), json.dumps(hrv_payload))
+
+            if not self.loop_forever:
+                return
+
+    async def _flush_batches(self):
+        """Publish batches of devices whose oldest buffered second has waited batch_delay."""
+        while True:
+            await asyncio.sleep(self.batcher.max_delay / 2)
+            for topic, batch in self.due_batches():
+                await self.pipeline.submit_async(topic, batch)
+
+    async def _report(self):
+        """Print the fleet's publish rate every report_interval seconds."""
+        last_count = self.messages_published
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            rate = (self.messages_published - last_count) / (now - last_time)
+            stats = [scheduler.stats() for scheduler in self.schedulers]
+            sent = sum(s["sent"] for s in stats) or 1
+            lag_mean = sum(s["lag_mean_ms"] * s["sent"] for s in stats) / sent
+            lag_max = max(s["lag_max_ms"] for s in stats)
+            print(f"Fleet: {self.devices} devices, {self.messages_published} messages, {rate:.1f} msg/s, "
+                  f"lag mean {lag_mean:.2f} ms max {lag_max:.2f} ms"
+                  + (f", {self.batcher.stats()['batches']} batches" if self.batcher is not None else ""))
+            print(f"Publish pipeline: {self.pipeline.summary()}")
+            last_count, last_time = self.messages_published, now
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Gap filling for per-second heart rate series.
+
+Heart rate detection marks seconds it could not measure with NaN. The
+strategies here replace those gaps in a single vectorized pass and return a
+mask telling measured values apart from imputed ones. Randomized filling uses
+a local, seedable np.random.Generator so results are reproducible.
+"""
+import numpy as np
+import config
+
+GAP_FILL_STRATEGIES = ("hold", "interpolate", "jitter")
+
+
+def _last_measured_index(measured):
+    """
+    Index of the most recent measured value at or before each position (-1 if none).
+
+    Args:
+        measured (np.ndarray): Boolean mask of measured positions
+
+    Returns:
+        np.ndarray: Forward-filled indices
+    """
+    return np.maximum.accumulate(np.where(measured, np.arange(len(measured)), -1))
+
+
+def fill_heart_rate_gaps(heart_rates, strategy=config.GAP_FILL_STRATEGY, baseline_hr=70,
+                         jitter_std=1.0, seed=config.GAP_FILL_SEED):
+    """
+    Replace unmeasured (NaN) seconds of a heart rate series.
+
+    Strategies:
+    hold: repeat the last measured value (baseline_hr before the first one)
+    interpolate: linear interpolation between the measured values on either side,
+        holding the nearest measured value at the ends
+    jitter: hold the last measured value plus a random walk of N(0, jitter_std)
+        steps, mimicking natural beat-to-beat variation
+
+    Args:
+        heart_rates (np.ndarray): Heart rate per second, NaN where not measured
+        strategy (str): One of GAP_FILL_STRATEGIES
+        baseline_hr (float): Value used before the first measurement
+        jitter_std (float): Standard deviation of each jitter step in BPM
+        seed (int, optional): Seed for the jitter generator. None draws fresh entropy
+
+    Returns:
+        tuple: (np.ndarray of int heart rates, np.ndarray of bool, True where measured)
+    """
+    if strategy not in GAP_FILL_STRATEGIES:
+        raise ValueError(f"Unknown gap fill strategy: {strategy}")
+
+    heart_rates = np.asarray(heart_rates, dtype=np.float64)
+    measured = ~np.isnan(heart_rates)
+    if measured.all():
+        return heart_rates.astype(int), measured
+
+    if strategy == "interpolate" and measured.any():
+        positions = np.arange(len(heart_rates))
+        filled = np.interp(positions, positions[measured], heart_rates[measured])
+        return filled.astype(int), measured
+
+    last = _last_measured_index(measured)
+    held = np.where(last >= 0, heart_rates[np.maximum(last, 0)], baseline_hr)
+
+    if strategy == "jitter":
+        rng = np.random.default_rng(seed)
+        steps = np.where(measured, 0.0, rng.normal(0, jitter_std, size=len(heart_rates)))
+        walk = np.cumsum(steps)
+        # Restart the walk from zero at every measured value
+        walk -= np.where(last >= 0, walk[np.maximum(last, 0)], 0.0)
+        held = held + walk
+
+    filled = np.where(measured, heart_rates, held)
+    return filled.astype(int), measured
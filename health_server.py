@@ -2,22 +2,209 @@
 """
 Simple health check server for Railway deployment
 Also serves static files from the current directory
+
+Requests are handled by a bounded pool of worker threads, so a slow Node-RED
+proxy call no longer blocks the health probe or other clients. Connections
+use HTTP/1.1 keep-alive; idle connections are closed after
+HTTP_KEEPALIVE_TIMEOUT seconds, or as soon as a new connection needs their
+worker, so idle clients never hold up the health probe.
+SIGTERM and SIGINT stop accepting connections and let running requests finish.
+
+/api/stream pushes every new frame from MQTT as Server-Sent Events. Stream
+connections are handed over to live_stream.LiveStream after the response
+headers, so viewers do not occupy worker threads. When the aggregator runs,
+the stream is fed from its MQTT subscription, so every frame is received and
+decoded once.
+
+/api/heartrate is answered from the ring buffers of aggregator.Aggregator
+once it has received data, and from Node-RED otherwise. /api/window serves
+windowed heart rate queries from the same buffers.
 """
 import http.server
-import socketserver
 import json
 import os
-import urllib.request
-import urllib.error
-from urllib.parse import urlparse
+import select
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from upstream_proxy import NodeRedProxy, UpstreamError, PATH_VARIANTS, api_path
+from live_stream import LiveStream
+from aggregator import Aggregator
+
+HTTP_WORKERS = int(os.environ.get('HTTP_WORKERS', 32))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 15))
+PROXY_CACHE_TTL = float(os.environ.get('PROXY_CACHE_TTL', 0.5))
+PROXY_POOL_SIZE = int(os.environ.get('PROXY_POOL_SIZE', 8))
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', 1000))
+HEARTRATE_SOURCE = os.environ.get('HEARTRATE_SOURCE', 'aggregator')  # "aggregator" or "node-red"
+DEBUG = os.environ.get('HEALTH_SERVER_DEBUG', '') not in ('', '0')
+
+
+def log_debug(message):
+    """Print a per-request diagnostic when HEALTH_SERVER_DEBUG is set."""
+    if DEBUG:
+        print(message)
+
+
+class BoundedThreadingHTTPServer(http.server.HTTPServer):
+    """
+    HTTP server that handles connections on a fixed-size thread pool.
+
+    At most max_workers connections are served at once. When all workers are
+    taken, the longest idle keep-alive connection is closed to free one;
+    further connections wait in the listen backlog until a worker is free.
+    """
+    request_queue_size = 128
+    # Seconds between attempts to free a worker from an idle connection while all workers are busy
+    slot_poll_interval = 0.1
+
+    def __init__(self, server_address, handler_class, max_workers=HTTP_WORKERS, proxy=None, stream=None,
+                 aggregator=None):
+        super().__init__(server_address, handler_class)
+        self.max_workers = max_workers
+        self.proxy = proxy
+        self.stream = stream
+        self.aggregator = aggregator
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._detached = set()
+        self._idle = {}
+        self.stopping = False
+
+    def process_request(self, request, client_address):
+        # Block the accept loop while all workers are busy instead of queueing without bound,
+        # but take over the worker of an idle keep-alive connection instead of waiting for its timeout
+        acquired = self._slots.acquire(blocking=False)
+        while not acquired:
+            self._close_idle_connection()
+            acquired = self._slots.acquire(timeout=self.slot_poll_interval)
+        with self._connections_lock:
+            self._connections.add(request)
+        self._executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._connections.discard(request)
+                self._idle.pop(request, None)
+                detached = request in self._detached
+                self._detached.discard(request)
+            if not detached:
+                self.shutdown_request(request)
+            self._slots.release()
+
+    def mark_idle(self, request, idle=True):
+        """
+        Record whether a keep-alive connection is waiting for its next request.
+
+        Args:
+            request (socket.socket): Connection being served by the calling handler
+            idle (bool): True after a response, False once the next request arrives
+        """
+        with self._connections_lock:
+            if idle:
+                self._idle[request] = time.monotonic()
+            else:
+                self._idle.pop(request, None)
+
+    def _close_idle_connection(self):
+        """
+        Close the longest idle keep-alive connection that has no request waiting.
+
+        Its handler sees end of stream and returns, which frees its worker.
+        Clients reopen closed keep-alive connections on their next request.
+
+        Returns:
+            bool: Whether a connection was closed
+        """
+        with self._connections_lock:
+            idle = sorted(self._idle, key=self._idle.get)
+        for connection in idle:
+            try:
+                readable, _, _ = select.select([connection], [], [], 0)
+            except (OSError, ValueError):
+                continue
+            if readable:
+                continue
+            with self._connections_lock:
+                if self._idle.pop(connection, None) is None:
+                    continue
+            try:
+                connection.shutdown(socket.SHUT_RD)
+            except OSError:
+                continue
+            return True
+        return False
+
+    def detach(self, request):
+        """
+        Keep a connection open after its handler returns; the caller now owns it.
+
+        Args:
+            request (socket.socket): Connection being served by the calling handler
+        """
+        with self._connections_lock:
+            self._detached.add(request)
+
+    def graceful_shutdown(self, timeout=10.0):
+        """
+        Stop accepting connections and wait for running requests to finish.
+
+        Must not be called from the thread running serve_forever().
+
+        Args:
+            timeout (float): Seconds to wait for running requests
+        """
+        self.stopping = True
+        self.shutdown()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            # Idle keep-alive connections see end of stream; a response being written is unaffected
+            try:
+                connection.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        waiter = threading.Thread(target=self._executor.shutdown, kwargs={"wait": True})
+        waiter.start()
+        waiter.join(timeout)
+        self.server_close()
+        if self.proxy is not None:
+            self.proxy.pool.close()
+        if self.stream is not None:
+            self.stream.stop()
+        if self.aggregator is not None:
+            self.aggregator.stop()
+
 
 class HealthHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = HTTP_KEEPALIVE_TIMEOUT
+    # Headers and body are written separately; with Nagle each keep-alive response would wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if not self.close_connection:
+            # Waiting for the next request; the server may close the connection to reuse this worker
+            self.server.mark_idle(self.connection)
+
+    def parse_request(self):
+        self.server.mark_idle(self.connection, False)
+        return super().parse_request()
+
     def do_GET(self):
-        print(f"Received request for: {self.path}")
+        log_debug(f"Received request for: {self.path}")
         if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
             health_data = {
                 'status': 'healthy',
                 'services': {
@@ -32,104 +219,226 @@ class HealthHandler(http.server.SimpleHTTPRequestHandler):
                     'health_check': '/health',
                     'heartrate_api': '/api/heartrate',
                     'status_api': '/api/status',
+                    'live_stream': '/api/stream',
+                    'window_api': '/api/window',
                     'note': 'Node-RED admin interface is internal only (no authentication required)'
-                }
+                },
+                'http_server': {
+                    'workers': self.server.max_workers,
+                    'keepalive_timeout': HTTP_KEEPALIVE_TIMEOUT
+                },
+                'proxy': self.server.proxy.stats(),
+                'stream': self.server.stream.stats() if self.server.stream is not None else None,
+                'aggregator': self.server.aggregator.stats() if self.server.aggregator is not None else None
             }
-            self.wfile.write(json.dumps(health_data).encode())
+            self.send_json(200, health_data, cors=False)
+        elif self.path == '/api/stream':
+            self.start_stream()
+        elif urlparse(self.path).path == '/api/window':
+            self.serve_window()
         elif self.path.startswith('/api/'):
-            # Proxy API calls to Node-RED
-            self.proxy_to_nodered()
+            # Heart rate from the aggregator when it has data, everything else is proxied to Node-RED
+            if not self.serve_heartrate():
+                self.proxy_to_nodered()
         elif self.path == '/' or self.path == '/index.html':
             # Serve the main dashboard
             super().do_GET()
         else:
             # Serve static files normally
             super().do_GET()
-    
-    def proxy_to_nodered(self):
-        """Proxy API calls to the internal Node-RED server"""
-        node_red_port = os.environ.get('NODE_RED_PORT', '1880')
-        
-        print(f"DEBUG: Incoming path: {self.path}")
-        
-        # Try both with and without /api prefix since there might be a config issue
-        possible_paths = []
-        
-        if self.path == '/api/heartrate':
-            possible_paths = ['/api/heartrate', '/heartrate']
-        elif self.path == '/api/status':
-            possible_paths = ['/api/status', '/status']
+
+    def end_headers(self):
+        if self.server.stopping:
+            # Tell keep-alive clients to reconnect elsewhere while the server shuts down
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        super().end_headers()
+
+    def send_json(self, status, data, cors=True):
+        """
+        Send a complete JSON response with a Content-Length, as keep-alive requires.
+
+        Args:
+            status (int): HTTP status code
+            data (dict): Response body
+            cors (bool): Whether to allow cross-origin access
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cors:
+            self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self):
+        """Send the Server-Sent Events headers and hand the connection over to the live stream"""
+        stream = self.server.stream
+        if stream is None or self.server.stopping:
+            self.send_json(503, {'error': 'Live stream unavailable', 'endpoint': self.path})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        # No Content-Length: the body lasts until the connection closes
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        if stream.add_client(self.connection):
+            self.server.detach(self.connection)
         else:
-            print(f"WARNING: Unknown API path {self.path}")
-            possible_paths = [self.path]
-        
-        # Try each possible path until one works
-        for internal_path in possible_paths:
-            node_red_url = f'http://localhost:{node_red_port}{internal_path}'
-            print(f"DEBUG: Trying {self.path} -> {node_red_url}")
-            
-            try:
-                # Forward the request to Node-RED
-                with urllib.request.urlopen(node_red_url, timeout=5) as response:
-                    # Copy response status and headers
-                    self.send_response(response.status)
-                    
-                    # Copy content type if available
-                    content_type = response.headers.get('Content-Type', 'application/json')
-                    self.send_header('Content-Type', content_type)
-                    
-                    # Add CORS headers for web browser access
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-                    self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-                    
-                    self.end_headers()
-                    
-                    # Forward the response body
-                    data = response.read()
-                    self.wfile.write(data)
-                    print(f"SUCCESS: {self.path} -> {node_red_url} (response size: {len(data)} bytes)")
-                    return  # Success, exit function
-                    
-            except urllib.error.HTTPError as e:
-                if e.code == 404:
-                    print(f"DEBUG: 404 for {node_red_url}, trying next path...")
-                    continue  # Try next path
-                else:
-                    # Other HTTP error, don't continue trying
-                    break
-            except urllib.error.URLError as e:
-                print(f"DEBUG: Connection error for {node_red_url}: {e}")
-                break  # Connection problem, don't continue trying
-            except Exception as e:
-                print(f"DEBUG: Unexpected error for {node_red_url}: {e}")
-                break
-        
-        # If we get here, all paths failed
-        self.send_response(503)
+            self.wfile.write(b"retry: 5000\n\n")
+            log_debug(f"Live stream full ({stream.max_clients} clients), closing {self.address_string()}")
+
+    def query_params(self):
+        """Get the query string parameters, one value per name"""
+        return {name: values[-1] for name, values in parse_qs(urlparse(self.path).query).items()}
+
+    def serve_heartrate(self):
+        """
+        Answer /api/heartrate from the aggregator.
+
+        Returns:
+            bool: False if the request should go to Node-RED instead
+        """
+        aggregator = self.server.aggregator
+        if aggregator is None or urlparse(self.path).path != '/api/heartrate':
+            return False
+        device = self.query_params().get('device')
+        body = aggregator.heartrate_response(device)
+        if body is None:
+            if device is None:
+                return False
+            self.send_json(404, {'error': 'Unknown device', 'device': device})
+            return True
+
+        self.send_response(200)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        
-        error_data = {
-            'error': 'Node-RED Service Unavailable',
-            'endpoint': self.path,
-            'tried_urls': [f'http://localhost:{node_red_port}{p}' for p in possible_paths],
-            'details': 'All endpoint variations returned 404 or connection error',
-            'timestamp': __import__('datetime').datetime.now().isoformat(),
-            'debug_info': {
-                'node_red_port': node_red_port,
-                'possible_paths': possible_paths
+        self.wfile.write(body)
+        return True
+
+    def serve_window(self):
+        """Answer /api/window?device=&seconds=&start=&end= with heart rate history and min/max/mean"""
+        aggregator = self.server.aggregator
+        if aggregator is None:
+            self.send_json(503, {'error': 'Aggregator unavailable', 'endpoint': self.path})
+            return
+        params = self.query_params()
+        try:
+            bounds = {name: float(params[name]) for name in ('seconds', 'start', 'end') if name in params}
+        except ValueError:
+            self.send_json(400, {'error': 'seconds, start and end must be numbers', 'endpoint': self.path})
+            return
+        result = aggregator.window(params.get('device'), **bounds)
+        if result is None:
+            self.send_json(404, {'error': 'Unknown device', 'device': params.get('device')})
+            return
+        self.send_json(200, result)
+
+    def proxy_to_nodered(self):
+        """Proxy API calls to the internal Node-RED server"""
+        proxy = self.server.proxy
+        log_debug(f"DEBUG: Incoming path: {self.path}")
+        if api_path(self.path) not in PATH_VARIANTS:
+            print(f"WARNING: Unknown API path {self.path}")
+
+        try:
+            # Served from the short-lived cache, a fetch already in progress or a pooled connection
+            status, content_type, data = proxy.fetch(self.path)
+        except UpstreamError as e:
+            print(f"ERROR: All paths failed for {self.path}: {e}")
+            error_data = {
+                'error': 'Node-RED Service Unavailable',
+                'endpoint': self.path,
+                'tried_urls': [f'http://{proxy.pool.host}:{proxy.pool.port}{p}' for p in e.tried_paths],
+                'details': str(e),
+                'timestamp': __import__('datetime').datetime.now().isoformat(),
+                'debug_info': {
+                    'node_red_port': str(proxy.pool.port),
+                    'possible_paths': proxy.candidate_paths(self.path)
+                }
             }
-        }
-        self.wfile.write(json.dumps(error_data).encode())
-        print(f"ERROR: All paths failed for {self.path}: {possible_paths}")
+            self.send_json(503, error_data)
+            return
+
+        # Copy response status and headers
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+
+        # Add CORS headers for web browser access
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+
+        self.end_headers()
+
+        # Forward the response body
+        self.wfile.write(data)
+        log_debug(f"SUCCESS: {self.path} (response size: {len(data)} bytes)")
+
+    def log_message(self, format, *args):
+        log_debug(f"{self.address_string()} - {format % args}")
+
+
+def create_server(port, workers=HTTP_WORKERS, node_red_port=None, cache_ttl=PROXY_CACHE_TTL, mqtt_port=None,
+                  heartrate_source=HEARTRATE_SOURCE):
+    """
+    Create the dashboard server.
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        workers (int): Maximum number of connections served at once
+        node_red_port (int, optional): Node-RED port. Defaults to the NODE_RED_PORT environment variable
+        cache_ttl (float): Seconds a Node-RED response is reused, 0 disables the cache
+        mqtt_port (int, optional): MQTT broker port for /api/stream and the aggregator. Both are disabled if not given
+        heartrate_source (str): "aggregator" to answer /api/heartrate from the aggregator, "node-red" to always proxy
+
+    Returns:
+        BoundedThreadingHTTPServer: Server ready for serve_forever()
+    """
+    if node_red_port is None:
+        node_red_port = int(os.environ.get('NODE_RED_PORT', '1880'))
+    proxy = NodeRedProxy('localhost', node_red_port, cache_ttl=cache_ttl, pool_size=PROXY_POOL_SIZE)
+    stream = aggregator = None
+    if mqtt_port is not None:
+        shared = heartrate_source == 'aggregator'
+        stream = LiveStream('localhost', mqtt_port, max_clients=STREAM_MAX_CLIENTS, subscribe=not shared)
+        stream.start()
+        if shared:
+            aggregator = Aggregator('localhost', mqtt_port)
+            aggregator.add_listener(stream.topic, stream.feed)
+            aggregator.start()
+    return BoundedThreadingHTTPServer(("", port), HealthHandler, max_workers=workers, proxy=proxy, stream=stream,
+                                      aggregator=aggregator)
+
 
 if __name__ == "__main__":
     PORT = int(os.environ.get('PORT', 8000))  # Use Railway's main PORT
     # For local testing, stay in current directory; for deployment, use /app
     if os.path.exists('/app'):
         os.chdir('/app')  # Change to app directory to serve static files
-    with socketserver.TCPServer(("", PORT), HealthHandler) as httpd:
-        print(f"Health check server running on port {PORT}")
-        httpd.serve_forever()
+    httpd = create_server(PORT, mqtt_port=int(os.environ.get('MQTT_PORT', '1883')))
+
+    def handle_signal(sig, frame):
+        print("Shutting down health check server...")
+        httpd.stopping = True
+        # shutdown() waits for serve_forever() to return, so it cannot run in this thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"Health check server running on port {PORT} with {HTTP_WORKERS} workers")
+    httpd.serve_forever()
+    # serve_forever returns as soon as shutdown() is requested; wait for running requests
+    httpd.graceful_shutdown()
+    print("Health check server stopped")
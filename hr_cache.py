@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of computed heart rate series.
+
+Entries are keyed by a hash of the raw ECG samples together with every
+parameter that affects the result (window size, sampling rate, method, gap
+fill strategy, seed and the algorithm version), so a cached series can never be
+served for different input. Recently used entries are kept in an in-memory
+LRU; all entries are also written to disk as .npz files and survive restarts.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import config
+
+HR_CACHE_FIELDS = ("heart_rates", "hr_measured", "r_peaks", "hr_quality")
+
+
+def ecg_content_hash(ecg_data):
+    """
+    Hash the samples of an ECG recording.
+
+    Args:
+        ecg_data (np.ndarray): ECG samples
+
+    Returns:
+        str: Hex digest of the float32 sample bytes
+    """
+    data = np.ascontiguousarray(ecg_data, dtype=np.float32)
+    return hashlib.blake2b(memoryview(data).cast('B'), digest_size=16).hexdigest()
+
+
+class HeartRateCache:
+    def __init__(self, cache_dir=config.HR_CACHE_PATH, max_entries=config.HR_CACHE_MEMORY_ENTRIES):
+        """
+        Initialize the heart rate cache.
+
+        Args:
+            cache_dir (str, optional): Directory for the on-disk entries. None keeps the cache in memory only
+            max_entries (int): Number of entries kept in the in-memory LRU
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content_hash, window_seconds, sampling_rate, method, gap_fill, seed, algorithm_version):
+        """
+        Build the cache key for a heart rate computation.
+
+        Args:
+            content_hash (str): Result of ecg_content_hash() for the input samples
+            window_seconds (int): Heart rate window in seconds
+            sampling_rate (int): Sampling rate of the ECG signal in Hz
+            method (str): Heart rate method
+            gap_fill (str): Gap fill strategy
+            seed (int, optional): Gap fill seed
+            algorithm_version (int): Version of the heart rate algorithm
+
+        Returns:
+            str: Cache key usable as a filename
+        """
+        params = f"{window_seconds}|{sampling_rate}|{method}|{gap_fill}|{seed}|{algorithm_version}"
+        return f"{content_hash}-{hashlib.blake2b(params.encode(), digest_size=8).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            dict: Arrays keyed by HR_CACHE_FIELDS, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        if self.cache_dir is not None:
+            try:
+                with np.load(self._path(key)) as data:
+                    entry = {field: data[field] for field in HR_CACHE_FIELDS}
+            except (OSError, KeyError, ValueError):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, entry)
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, heart_rates, hr_measured, r_peaks, hr_quality):
+        """
+        Store a result in memory and on disk.
+
+        Args:
+            key (str): Key from make_key()
+            heart_rates (np.ndarray): Heart rate per second
+            hr_measured (np.ndarray): Measured flag per second
+            r_peaks (np.ndarray): Detected beat sample indices
+            hr_quality (np.ndarray): Signal quality per heart rate window
+        """
+        entry = {
+            "heart_rates": np.asarray(heart_rates),
+            "hr_measured": np.asarray(hr_measured, dtype=bool),
+            "r_peaks": np.asarray(r_peaks, dtype=np.int64),
+            "hr_quality": np.asarray(hr_quality, dtype=np.float32)
+        }
+        with self._lock:
+            self._remember(key, entry)
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # np.savez appends .npz unless the name already ends with it
+            tmp_path = self._path(key) + ".tmp.npz"
+            np.savez(tmp_path, **entry)
+            os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Get hit and miss counters.
+
+        Returns:
+            dict: memory_hits, disk_hits, misses, hit_rate and in-memory entry count
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Heart rate variability from detected beats.
+
+RollingHRV keeps the RR intervals of a sliding time window and updates the
+time-domain metrics incrementally: each interval and each successive
+difference enters and leaves running sums once, so SDNN, RMSSD and pNN50
+cost O(1) per beat however long the window is. Frequency-domain power
+(LF 0.04-0.15 Hz, HF 0.15-0.4 Hz) comes from a Lomb-Scargle periodogram of
+the unevenly spaced RR series. It needs the whole window, so it is only
+computed when metrics are requested. Power is scaled so that the periodogram
+integrates to the variance of the window's RR intervals, making LF and HF
+comparable in ms^2.
+
+An interval is an artifact if it lies outside the heart rate range accepted by
+peak_detection, or if it is more than RR_MAX_DEVIATION off the running median
+of the previous RR_MEDIAN_INTERVALS intervals in that range. Missed or extra beats
+produce such intervals, and they are frequent enough in detected beats to
+make SDNN, RMSSD and pNN50 meaningless. Artifacts are excluded, no successive
+difference is taken across them, and their share of the window is published.
+A window with fewer than MIN_CLEAN_INTERVALS clean intervals, or with more than
+MAX_ARTIFACT_FRACTION artifacts, gets None metrics instead of numbers.
+"""
+from collections import deque
+import numpy as np
+from scipy.signal import lombscargle
+import config
+from peak_detection import MIN_VALID_HR, MAX_VALID_HR
+
+MIN_RR_MS = 60000 / MAX_VALID_HR
+MAX_RR_MS = 60000 / MIN_VALID_HR
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.4)
+# From the lowest frequency a few minutes of data can resolve up to above the HF band
+FREQUENCIES = np.arange(0.0033, 0.5, 0.0025)
+MIN_SPECTRUM_INTERVALS = 16
+RR_MEDIAN_INTERVALS = 9
+MIN_MEDIAN_INTERVALS = 3
+RR_MAX_DEVIATION = 0.2
+MIN_CLEAN_INTERVALS = 10
+MAX_ARTIFACT_FRACTION = 0.2
+
+
+def _band_mask(band):
+    return (FREQUENCIES >= band[0]) & (FREQUENCIES < band[1])
+
+
+LF_MASK = _band_mask(LF_BAND)
+HF_MASK = _band_mask(HF_BAND)
+
+
+class ArtifactFilter:
+    def __init__(self, median_intervals=RR_MEDIAN_INTERVALS, max_deviation=RR_MAX_DEVIATION):
+        """
+        Initialize the filter with an empty interval history.
+
+        Args:
+            median_intervals (int): Number of recent intervals of the running median
+            max_deviation (float): Largest accepted relative deviation from the running median
+        """
+        self.max_deviation = max_deviation
+        self._recent = deque(maxlen=median_intervals)
+
+    def accept(self, rr):
+        """
+        Classify the next RR interval of a beat sequence.
+
+        Args:
+            rr (float): RR interval in milliseconds
+
+        Returns:
+            bool: True for a clean interval, False for an artifact
+        """
+        if not MIN_RR_MS <= rr <= MAX_RR_MS:
+            return False
+        # The first intervals of a sequence have no reference and are accepted
+        clean = True
+        if len(self._recent) >= MIN_MEDIAN_INTERVALS:
+            median = float(np.median(self._recent))
+            clean = abs(rr - median) <= self.max_deviation * median
+        # Rejected intervals stay in the history, so the median follows a real change of rhythm
+        self._recent.append(rr)
+        return clean
+
+
+def frequency_metrics(times, rr_ms):
+    """
+    Compute LF and HF power of an RR series with a Lomb-Scargle periodogram.
+
+    Args:
+        times (np.ndarray): Time of each interval's closing beat in seconds
+        rr_ms (np.ndarray): RR intervals in milliseconds
+
+    Returns:
+        dict: lf_ms2, hf_ms2 and lf_hf; None values with fewer than MIN_SPECTRUM_INTERVALS intervals
+    """
+    if len(rr_ms) < MIN_SPECTRUM_INTERVALS:
+        return {"lf_ms2": None, "hf_ms2": None, "lf_hf": None}
+    centered = rr_ms - rr_ms.mean()
+    power = lombscargle(times, centered, 2 * np.pi * FREQUENCIES)
+    total = power.sum()
+    if total <= 0:
+        return {"lf_ms2": 0.0, "hf_ms2": 0.0, "lf_hf": None}
+    power *= np.var(rr_ms) / total
+    lf = float(power[LF_MASK].sum())
+    hf = float(power[HF_MASK].sum())
+    return {"lf_ms2": lf, "hf_ms2": hf, "lf_hf": lf / hf if hf > 0 else None}
+
+
+def hrv_metrics(beats, sampling_rate=config.SAMPLING_RATE, frequency=True, context=0):
+    """
+    Compute HRV metrics of a complete beat sequence in one pass.
+
+    Args:
+        beats (np.ndarray): Sorted beat sample indices
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+        frequency (bool): Whether to compute LF/HF power
+        context (int): Number of leading intervals that only feed the artifact filter's running median
+
+    Returns:
+        dict: Same fields as RollingHRV.metrics()
+    """
+    beats = np.asarray(beats, dtype=np.float64)
+    rr = np.diff(beats) * 1000.0 / sampling_rate
+    artifact_filter = ArtifactFilter()
+    valid = np.array([artifact_filter.accept(interval) for interval in rr.tolist()], dtype=bool)
+    rr, valid, beats = rr[context:], valid[context:], beats[context:]
+    both = valid[1:] & valid[:-1]
+    diffs = np.diff(rr)[both]
+    metrics = _time_metrics(int(valid.sum()), len(rr) - int(valid.sum()), rr[valid].sum(), (rr[valid] ** 2).sum(),
+                            len(diffs), (diffs ** 2).sum(), int((np.abs(diffs) > 50).sum()))
+    if frequency:
+        metrics.update(_frequency_metrics(metrics, beats[1:][valid] / sampling_rate, rr[valid]))
+    return metrics
+
+
+def _time_metrics(count, artifacts, rr_sum, rr_sq_sum, diff_count, diff_sq_sum, nn50):
+    total = count + artifacts
+    artifact_fraction = artifacts / total if total else None
+    if count < max(MIN_CLEAN_INTERVALS, 2) or artifact_fraction > MAX_ARTIFACT_FRACTION:
+        return {"intervals": count, "artifact_fraction": artifact_fraction, "mean_rr_ms": None, "sdnn_ms": None,
+                "rmssd_ms": None, "pnn50": None}
+    mean = rr_sum / count
+    variance = max(rr_sq_sum - count * mean * mean, 0.0) / (count - 1)
+    return {
+        "intervals": count,
+        "artifact_fraction": artifact_fraction,
+        "mean_rr_ms": float(mean),
+        "sdnn_ms": float(np.sqrt(variance)),
+        "rmssd_ms": float(np.sqrt(diff_sq_sum / diff_count)) if diff_count else None,
+        "pnn50": float(100.0 * nn50 / diff_count) if diff_count else None
+    }
+
+
+def _frequency_metrics(time_metrics, times, rr_ms):
+    if time_metrics["mean_rr_ms"] is None:
+        # Too few clean intervals for the time-domain metrics are too few for a spectrum as well
+        return {"lf_ms2": None, "hf_ms2": None, "lf_hf": None}
+    return frequency_metrics(times, rr_ms)
+
+
+class RollingHRV:
+    def __init__(self, window_seconds=config.HRV_WINDOW_SECONDS, sampling_rate=config.SAMPLING_RATE):
+        """
+        Initialize an empty rolling window.
+
+        Args:
+            window_seconds (float): Length of the window in seconds
+            sampling_rate (int): Sampling rate of the beat positions in Hz
+        """
+        self.window_size = window_seconds * sampling_rate
+        self.sampling_rate = sampling_rate
+        self.reset()
+
+    def reset(self):
+        """Discard all beats and start a new stream."""
+        self._last_beat = None
+        self._last_rr = None
+        self._filter = ArtifactFilter()
+        # (closing beat, RR ms) of clean intervals, closing beats of artifacts, and (closing beat of the earlier
+        # interval, squared difference, > 50 ms) of successive ones, so a difference leaves the window together
+        # with its first interval
+        self._intervals = deque()
+        self._artifacts = deque()
+        self._diffs = deque()
+        self._rr_sum = 0.0
+        self._rr_sq_sum = 0.0
+        self._diff_sq_sum = 0.0
+        self._nn50 = 0
+
+    def add_beats(self, beats):
+        """
+        Add newly detected beats.
+
+        Args:
+            beats (array-like): Beat sample indices, increasing and after any beat added before
+        """
+        for beat in np.asarray(beats, dtype=np.int64).tolist():
+            if self._last_beat is not None:
+                rr = (beat - self._last_beat) * 1000.0 / self.sampling_rate
+                if self._filter.accept(rr):
+                    self._intervals.append((beat, rr))
+                    self._rr_sum += rr
+                    self._rr_sq_sum += rr * rr
+                    if self._last_rr is not None:
+                        difference = rr - self._last_rr
+                        nn50 = abs(difference) > 50
+                        self._diffs.append((self._last_beat, difference * difference, nn50))
+                        self._diff_sq_sum += difference * difference
+                        self._nn50 += nn50
+                    self._last_rr = rr
+                else:
+                    self._artifacts.append(beat)
+                    self._last_rr = None
+            self._last_beat = beat
+
+    def advance(self, position):
+        """
+        Move the end of the window and drop intervals that left it.
+
+        Args:
+            position (int): Sample index of the window end
+        """
+        start = position - self.window_size
+        while self._intervals and self._intervals[0][0] < start:
+            _, rr = self._intervals.popleft()
+            self._rr_sum -= rr
+            self._rr_sq_sum -= rr * rr
+        while self._artifacts and self._artifacts[0] < start:
+            self._artifacts.popleft()
+        while self._diffs and self._diffs[0][0] < start:
+            _, squared, nn50 = self._diffs.popleft()
+            self._diff_sq_sum -= squared
+            self._nn50 -= nn50
+        if not self._intervals:
+            # Clear the rounding error the running sums pick up
+            self._rr_sum = self._rr_sq_sum = 0.0
+        if not self._diffs:
+            self._diff_sq_sum = 0.0
+
+    def metrics(self, frequency=True):
+        """
+        Get the HRV metrics of the current window.
+
+        Args:
+            frequency (bool): Whether to compute LF/HF power
+
+        Returns:
+            dict: intervals (clean), artifact_fraction, mean_rr_ms, sdnn_ms, rmssd_ms, pnn50 (percent) and,
+                with frequency, lf_ms2, hf_ms2 and lf_hf; None where the window holds too few clean intervals
+        """
+        metrics = _time_metrics(len(self._intervals), len(self._artifacts), self._rr_sum, self._rr_sq_sum,
+                                len(self._diffs), self._diff_sq_sum, self._nn50)
+        if frequency:
+            intervals = np.array(self._intervals, dtype=np.float64).reshape(-1, 2)
+            metrics.update(_frequency_metrics(metrics, intervals[:, 0] / self.sampling_rate, intervals[:, 1]))
+        return metrics
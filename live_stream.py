@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out of the smartwatch MQTT stream.
+
+One MQTT subscription feeds every viewer. Each incoming frame is serialized
+once into an SSE event and appended to the output buffer of every connected
+client. All client sockets are non-blocking and written by a single
+broadcaster thread, so a viewer costs a socket and a small buffer rather than
+an HTTP worker thread. A client whose buffer grows past max_buffer because it
+cannot keep up is disconnected; EventSource reconnects by itself and receives
+the latest frame again.
+
+With subscribe=False the stream has no MQTT client of its own and is fed
+decoded messages through feed(), so a process that already subscribes to the
+data topic (aggregator.Aggregator) decodes every frame only once.
+"""
+import json
+import time
+import socket
+import selectors
+import threading
+import numpy as np
+import paho.mqtt.client as mqtt
+import config
+from payload_codec import decode_messages
+
+ZONE_TEXT = {
+    0: 'Below Normal',
+    1: 'Rest',
+    2: 'Light Activity',
+    3: 'Moderate Activity',
+    4: 'Intense Activity',
+    5: 'Maximum Effort'
+}
+
+
+def format_event(message, event_id):
+    """
+    Serialize a decoded smartwatch message as an SSE event.
+
+    Args:
+        message (dict): Message returned by payload_codec.decode_messages
+        event_id (int): Sequence number sent as the event id
+
+    Returns:
+        bytes: Complete SSE event
+    """
+    zone = int(message.get("zone", 0))
+    data = {
+        "timestamp": message.get("timestamp"),
+        "heart_rate": int(message.get("heart_rate", 0)),
+        "measured": bool(message.get("measured", True)),
+        "quality": message.get("quality"),
+        "zone": zone,
+        "zone_text": ZONE_TEXT.get(zone, 'Unknown'),
+        # Four decimals is the precision of the dataset and keeps events small
+        "ecg_samples": np.round(np.asarray(message["ecg_samples"], dtype=np.float64), 4).tolist()
+    }
+    return f"id: {event_id}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class LiveStream:
+    def __init__(self, broker=config.MQTT_BROKER, port=config.MQTT_PORT,
+                 topic=f"{config.MQTT_TOPIC_PREFIX}/data", max_clients=1000, max_buffer=256 * 1024,
+                 heartbeat_interval=15.0, subscribe=True):
+        """
+        Initialize the stream. Call start() to subscribe and start the broadcaster.
+
+        Args:
+            broker (str): MQTT broker address
+            port (int): MQTT broker port
+            topic (str): Topic with the smartwatch data messages
+            max_clients (int): Maximum number of connected viewers
+            max_buffer (int): Unsent bytes after which a slow viewer is disconnected
+            heartbeat_interval (float): Seconds between SSE comments that detect dead connections
+            subscribe (bool): Subscribe to topic with an own MQTT client; if False, messages arrive through feed()
+        """
+        self.broker = broker
+        self.port = port
+        self.topic = topic
+        self.max_clients = max_clients
+        self.max_buffer = max_buffer
+        self.heartbeat_interval = heartbeat_interval
+
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ)
+        self._running = False
+        self._thread = None
+
+        self.latest_event = None
+        self.events = 0
+        self.clients_dropped = 0
+        self.connected = False
+
+        self.client = None
+        if subscribe:
+            self.client = mqtt.Client()
+            self.client.on_connect = self.on_connect
+            self.client.on_disconnect = self.on_disconnect
+            self.client.on_message = self.on_message
+
+    def start(self):
+        """Connect to the broker in the background, if subscribing, and start the broadcaster thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._broadcast_loop, name="sse-broadcast", daemon=True)
+        self._thread.start()
+        if self.client is not None:
+            self.client.connect_async(self.broker, self.port)
+            self.client.loop_start()
+
+    def stop(self):
+        """Disconnect from the broker and close every viewer connection."""
+        self._running = False
+        if self.client is not None:
+            self.client.loop_stop()
+            self.client.disconnect()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(5)
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for sock in clients:
+            sock.close()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connected = True
+            client.subscribe(self.topic)
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+
+    def on_message(self, client, userdata, msg):
+        try:
+            messages = decode_messages(msg.payload)
+        except (ValueError, KeyError):
+            return
+        self.feed(messages)
+
+    def feed(self, messages):
+        """
+        Send decoded messages to every viewer.
+
+        Args:
+            messages (list): Messages returned by payload_codec.decode_messages
+        """
+        with self._lock:
+            for message in messages:
+                self.events += 1
+                self.latest_event = format_event(message, self.events)
+                for buffer in self._clients.values():
+                    buffer += self.latest_event
+        self._wake()
+
+    def add_client(self, sock):
+        """
+        Take over a connection whose SSE response headers have been sent.
+
+        Args:
+            sock (socket.socket): Client connection, owned by the stream from now on
+
+        Returns:
+            bool: False if the stream is full; the caller keeps the connection
+        """
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return False
+            sock.setblocking(False)
+            # Reconnect quickly after a disconnect, and show the latest frame right away
+            self._clients[sock] = bytearray(b"retry: 2000\n\n" + (self.latest_event or b""))
+        self._wake()
+        return True
+
+    @property
+    def client_count(self):
+        """int: Number of connected viewers."""
+        with self._lock:
+            return len(self._clients)
+
+    def _wake(self):
+        try:
+            self._wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _broadcast_loop(self):
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+        while self._running:
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.fileobj is self._wake_reader:
+                    try:
+                        while self._wake_reader.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+
+            now = time.monotonic()
+            with self._lock:
+                if now >= next_heartbeat:
+                    for buffer in self._clients.values():
+                        buffer += b": keepalive\n\n"
+                    next_heartbeat = now + self.heartbeat_interval
+                for sock, buffer in list(self._clients.items()):
+                    self._flush(sock, buffer)
+
+    def _flush(self, sock, buffer):
+        """Write as much of a client's buffer as the socket accepts. Called with the lock held."""
+        try:
+            if buffer:
+                sent = sock.send(buffer)
+                del buffer[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sock)
+            return
+
+        if len(buffer) > self.max_buffer:
+            self._drop(sock)
+            return
+
+        try:
+            self._selector.modify(sock, selectors.EVENT_WRITE) if buffer else self._selector.unregister(sock)
+        except KeyError:
+            if buffer:
+                self._selector.register(sock, selectors.EVENT_WRITE)
+        except ValueError:
+            self._drop(sock)
+
+    def _drop(self, sock):
+        self._clients.pop(sock, None)
+        self.clients_dropped += 1
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def stats(self):
+        """
+        Get stream counters.
+
+        Returns:
+            dict: MQTT connection state (None when fed by another subscriber), topic, events received,
+                connected and dropped viewers
+        """
+        with self._lock:
+            return {
+                "mqtt_connected": self.connected if self.client is not None else None,
+                "topic": self.topic,
+                "events": self.events,
+                "clients": len(self._clients),
+                "clients_dropped": self.clients_dropped
+            }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Publisher-side batching of encoded messages.
+
+Messages are buffered per topic and combined with payload_codec.encode_batch
+once a topic holds max_messages messages or max_bytes bytes, or once its oldest
+message has waited max_delay seconds. Bulk replays and fleets then publish one
+MQTT message per batch instead of one per second of data.
+"""
+import time
+import config
+from payload_codec import encode_batch
+
+
+class MessageBatcher:
+    def __init__(self, max_messages=config.BATCH_SECONDS, max_bytes=config.BATCH_MAX_BYTES,
+                 max_delay=config.BATCH_MAX_DELAY):
+        """
+        Initialize the batcher.
+
+        Args:
+            max_messages (int): Messages per batch, i.e. seconds of data for the simulator
+            max_bytes (int): Flush a topic once its buffered messages reach this size
+            max_delay (float): Flush a topic once its oldest message is this many seconds old
+        """
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        # topic -> [messages, buffered bytes, monotonic time of the oldest message]
+        self._buffers = {}
+
+        self.messages_in = 0
+        self.batches_out = 0
+
+    def add(self, topic, message, now=None):
+        """
+        Buffer an encoded message.
+
+        Args:
+            topic (str): Topic the message belongs to
+            message (str or bytes): Message returned by encode_payload
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            list: (topic, batch) pairs that are ready to publish
+        """
+        now = time.monotonic() if now is None else now
+        buffer = self._buffers.get(topic)
+        if buffer is None:
+            buffer = self._buffers[topic] = [[], 0, now]
+        buffer[0].append(message)
+        buffer[1] += len(message)
+        self.messages_in += 1
+
+        if (len(buffer[0]) >= self.max_messages or buffer[1] >= self.max_bytes
+                or now - buffer[2] >= self.max_delay):
+            return [self._take(topic)]
+        return []
+
+    def due(self, now=None):
+        """
+        Flush the topics whose oldest message has waited max_delay seconds.
+
+        Args:
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            list: (topic, batch) pairs that are ready to publish
+        """
+        now = time.monotonic() if now is None else now
+        expired = [topic for topic, buffer in self._buffers.items() if now - buffer[2] >= self.max_delay]
+        return [self._take(topic) for topic in expired]
+
+    def flush(self):
+        """
+        Flush every buffered topic.
+
+        Returns:
+            list: (topic, batch) pairs that are ready to publish
+        """
+        return [self._take(topic) for topic in list(self._buffers)]
+
+    def _take(self, topic):
+        messages = self._buffers.pop(topic)[0]
+        self.batches_out += 1
+        return topic, encode_batch(messages)
+
+    def stats(self):
+        """
+        Get batching counters.
+
+        Returns:
+            dict: messages buffered in total, batches published and mean messages per batch
+        """
+        return {
+            "messages": self.messages_in,
+            "batches": self.batches_out,
+            "messages_per_batch": self.messages_in / self.batches_out if self.batches_out else 0.0
+        }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Size-bounded on-disk spool of MQTT messages.
+
+Messages published while the broker is unreachable are appended to a
+preallocated, memory-mapped file and read back in order once the connection is
+restored, so an outage costs disk space instead of memory. The file starts
+with a header holding the read and write offsets and the record count, which
+lets a spool left over from an earlier run be drained after a restart. Each
+record is a uint32 payload length, a uint16 topic length, the UTF-8 topic and
+the payload. Space freed by reading is reclaimed by moving the unread records
+to the front of the file when an append would not fit otherwise.
+"""
+import os
+import mmap
+import struct
+import threading
+import config
+
+SPOOL_MAGIC = b"SPL1"
+SPOOL_HEADER = struct.Struct("<4sQQQ")
+RECORD_HEADER = struct.Struct("<IH")
+
+
+class MessageSpool:
+    def __init__(self, path, max_bytes=int(config.SPOOL_MAX_MB * 1024 * 1024)):
+        """
+        Open a spool file, creating it if needed.
+
+        Args:
+            path (str): Spool file
+            max_bytes (int): Size of the spool file including its header
+        """
+        self.path = path
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        if os.path.getsize(path) < max_bytes:
+            self._file.truncate(max_bytes)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.capacity = len(self._map)
+
+        magic, read_offset, write_offset, count = SPOOL_HEADER.unpack_from(self._map)
+        if magic == SPOOL_MAGIC and SPOOL_HEADER.size <= read_offset <= write_offset <= self.capacity:
+            self._read, self._write, self._count = read_offset, write_offset, count
+        else:
+            self._read = self._write = SPOOL_HEADER.size
+            self._count = 0
+            self._store_header()
+
+    def _store_header(self):
+        SPOOL_HEADER.pack_into(self._map, 0, SPOOL_MAGIC, self._read, self._write, self._count)
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    @property
+    def used_bytes(self):
+        """int: Bytes held by unread records."""
+        with self._lock:
+            return self._write - self._read
+
+    def append(self, topic, payload):
+        """
+        Append a message.
+
+        Args:
+            topic (str): MQTT topic
+            payload (str or bytes): Message payload
+
+        Returns:
+            bool: True if the message was stored, False if the spool is full
+        """
+        topic_bytes = topic.encode("utf-8")
+        payload_bytes = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload)
+        size = RECORD_HEADER.size + len(topic_bytes) + len(payload_bytes)
+
+        with self._lock:
+            if self._write + size > self.capacity and self._read > SPOOL_HEADER.size:
+                # Reclaim the space of records already read
+                unread = self._write - self._read
+                self._map.move(SPOOL_HEADER.size, self._read, unread)
+                self._read = SPOOL_HEADER.size
+                self._write = self._read + unread
+            if self._write + size > self.capacity:
+                self.dropped += 1
+                return False
+
+            offset = self._write
+            RECORD_HEADER.pack_into(self._map, offset, len(payload_bytes), len(topic_bytes))
+            offset += RECORD_HEADER.size
+            self._map[offset:offset + len(topic_bytes)] = topic_bytes
+            offset += len(topic_bytes)
+            self._map[offset:offset + len(payload_bytes)] = payload_bytes
+            self._write = offset + len(payload_bytes)
+            self._count += 1
+            self._store_header()
+            return True
+
+    def pop(self):
+        """
+        Remove and return the oldest message.
+
+        Returns:
+            tuple: (topic, payload bytes), or None if the spool is empty
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            offset = self._read
+            payload_length, topic_length = RECORD_HEADER.unpack_from(self._map, offset)
+            offset += RECORD_HEADER.size
+            topic = self._map[offset:offset + topic_length].decode("utf-8")
+            offset += topic_length
+            payload = self._map[offset:offset + payload_length]
+            self._read = offset + payload_length
+            self._count -= 1
+            if self._count == 0:
+                self._read = self._write = SPOOL_HEADER.size
+            self._store_header()
+            return topic, payload
+
+    def close(self):
+        """Write the spool to disk and close it. Closing a closed spool does nothing."""
+        with self._lock:
+            if self._map.closed:
+                return
+            self._map.flush()
+            self._map.close()
+            self._file.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+In-memory pool of participants prepared for streaming.
+
+A prepared participant holds its stitched ECG samples, computed heart rate
+series and detected beats. The pool keeps recently used participants within a memory budget,
+evicting the least recently used ones, and prepares upcoming participants on a
+background thread so switching between streams has no loading gap.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import config
+from ecg_processor import ECGProcessor
+
+PreparedParticipant = namedtuple('PreparedParticipant', [
+    'session', 'participant', 'ecg_data', 'heart_rates', 'hr_measured', 'hr_quality', 'r_peaks', 'source_files',
+    'video_offsets', 'nbytes'
+])
+
+
+class ParticipantPool:
+    def __init__(self, base_path=config.BASE_PATH, session=config.DEFAULT_SESSION, max_videos=config.DEFAULT_MAX_VIDEOS,
+                 window_seconds=3, method=config.HEART_RATE_METHOD, gap_fill=config.GAP_FILL_STRATEGY,
+                 sampling_rate=config.SAMPLING_RATE, memory_budget_mb=config.POOL_MEMORY_BUDGET_MB,
+                 cache=None, hr_cache=None):
+        """
+        Initialize the participant pool.
+
+        Args:
+            base_path (str): Base path to the dataset
+            session (int): Session the participants belong to
+            max_videos (int, optional): Maximum number of videos per participant
+            window_seconds (int): Heart rate window in seconds
+            method (str): Heart rate method
+            gap_fill (str): Gap fill strategy
+            sampling_rate (int): Sampling rate of the ECG signal in Hz
+            memory_budget_mb (float): Upper bound for the ECG and heart rate arrays held by the pool
+            cache (ECGCache, optional): Binary dataset cache to load from
+            hr_cache (HeartRateCache, optional): Heart rate cache to compute through
+        """
+        self.base_path = base_path
+        self.session = session
+        self.max_videos = max_videos
+        self.window_seconds = window_seconds
+        self.method = method
+        self.gap_fill = gap_fill
+        self.sampling_rate = sampling_rate
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.cache = cache
+        self.hr_cache = hr_cache
+
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="participant-prefetch")
+
+        self.hits = 0
+        self.prefetch_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def memory_used(self):
+        """int: Bytes held by the prepared participants in the pool."""
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def _prepare(self, participant):
+        """
+        Load and compute a participant with a private processor.
+
+        Args:
+            participant (int): Participant number
+
+        Returns:
+            PreparedParticipant: The prepared participant, or None if it has no data
+        """
+        processor = ECGProcessor(sampling_rate=self.sampling_rate, cache=self.cache, hr_cache=self.hr_cache)
+        if not processor.load_participant_data(self.base_path, self.session, participant, max_videos=self.max_videos):
+            return None
+        heart_rates = processor.calculate_heart_rate(window_seconds=self.window_seconds, method=self.method,
+                                                     gap_fill=self.gap_fill)
+        if len(heart_rates) == 0:
+            return None
+        hr_measured = np.asarray(processor.hr_measured, dtype=bool)
+        hr_quality = np.asarray(processor.hr_quality, dtype=np.float32)
+        r_peaks = np.asarray(processor.r_peaks, dtype=np.int64)
+        nbytes = (processor.ecg_data.nbytes + heart_rates.nbytes + hr_measured.nbytes + hr_quality.nbytes +
+                  r_peaks.nbytes)
+        return PreparedParticipant(self.session, participant, processor.ecg_data, heart_rates, hr_measured,
+                                   hr_quality, r_peaks, list(processor.source_files), list(processor.video_offsets),
+                                   nbytes)
+
+    def _store(self, prepared):
+        """Insert a prepared participant and evict least recently used ones over budget."""
+        with self._lock:
+            self._entries[prepared.participant] = prepared
+            self._entries.move_to_end(prepared.participant)
+            used = sum(entry.nbytes for entry in self._entries.values())
+            while used > self.memory_budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                used -= evicted.nbytes
+                self.evictions += 1
+
+    def _prefetch_task(self, participant):
+        try:
+            prepared = self._prepare(participant)
+            if prepared is not None:
+                self._store(prepared)
+            return prepared
+        finally:
+            with self._lock:
+                self._pending.pop(participant, None)
+
+    def prefetch(self, participant):
+        """
+        Prepare a participant on the background thread if it is not pooled yet.
+
+        Args:
+            participant (int): Participant number
+        """
+        with self._lock:
+            if participant in self._entries or participant in self._pending:
+                return
+            self._pending[participant] = self._executor.submit(self._prefetch_task, participant)
+
+    def get(self, participant):
+        """
+        Get a prepared participant, waiting for a running prefetch or preparing it now.
+
+        Args:
+            participant (int): Participant number
+
+        Returns:
+            PreparedParticipant: The prepared participant, or None if it has no data
+        """
+        with self._lock:
+            prepared = self._entries.get(participant)
+            if prepared is not None:
+                self._entries.move_to_end(participant)
+                self.hits += 1
+                return prepared
+            future = self._pending.get(participant)
+
+        if future is not None:
+            prepared = future.result()
+            with self._lock:
+                self.prefetch_hits += 1
+            return prepared
+
+        with self._lock:
+            self.misses += 1
+        prepared = self._prepare(participant)
+        if prepared is not None:
+            self._store(prepared)
+        return prepared
+
+    def stats(self):
+        """
+        Get pool counters.
+
+        Returns:
+            dict: hits, prefetch_hits, misses, evictions, participants held and memory use in bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "prefetch_hits": self.prefetch_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "participants": len(self._entries),
+                "memory_used": sum(entry.nbytes for entry in self._entries.values()),
+                "memory_budget": self.memory_budget
+            }
+
+    def close(self):
+        """Stop the prefetch thread, abandoning prefetches that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Encoding of the per-second smartwatch messages.
+
+"json" is the original text format read by the Node-RED flow. The binary
+formats start with a fixed little-endian header followed by the ECG samples:
+
+    offset  size  field
+    0       2     magic b"EC"
+    2       1     format version (PAYLOAD_VERSION)
+    3       1     sample encoding: 1 = float32, 2 = delta int16, 3 = delta varint,
+                  4 = decimated
+    4       8     timestamp (float64, Unix seconds)
+    12      2     heart rate (uint16, BPM)
+    14      1     zone (uint8)
+    15      1     flags (bit 0: heart rate measured)
+    16      2     participant (uint16)
+    18      2     sample count n (uint16)
+    20      4     resolution of delta samples (float32, 0 for float32 samples)
+    24      4     first sample in resolution units (int32, 0 for float32 samples),
+                  or the sample count of the whole second for decimated samples
+    28      1     signal quality in percent (uint8, 255 if unknown)
+    29      ...   n float32 samples, or the n - 1 differences between
+                  consecutive samples in resolution units, as int16 or as
+                  zigzag LEB128 varints, or the n positions of the kept samples
+                  within the second (uint8) followed by their n float32 values
+
+Version 1 frames have no quality byte and a 28-byte header; they are still
+decoded, with a quality of None.
+
+"f32" always sends float32 samples. "delta16" quantizes the samples to the
+resolution and sends their differences as int16, falling back to float32 for a
+frame whose differences do not fit. "varint" sends the differences as
+variable-length integers, one byte for a difference below 64 units. It is
+lossless: a frame whose samples do not survive quantization exactly is sent
+as float32. Decimated frames carry a subset of the samples of a second of at
+most 256 samples (ecg_views.py). The string fields of the JSON format
+(source, device_id) are not part of the binary frame; fleet devices are
+identified by their topic.
+
+Several encoded messages can be combined into one batch message. A JSON batch
+is {"batch": [message, ...]}; a binary batch is an 8-byte header (magic b"EB",
+version, reserved byte, uint32 message count) followed by each frame prefixed
+with its uint32 length. Every message keeps its own timestamp.
+"""
+import json
+import struct
+import numpy as np
+import config
+
+PAYLOAD_FORMATS = ("json", "f32", "delta16", "varint")
+PAYLOAD_VERSION = 2
+PAYLOAD_MAGIC = b"EC"
+HEADER = struct.Struct("<2sBBdHBBHHfiB")
+HEADER_V1 = struct.Struct("<2sBBdHBBHHfi")
+SUPPORTED_VERSIONS = (1, PAYLOAD_VERSION)
+QUALITY_UNKNOWN = 255
+BATCH_MAGIC = b"EB"
+BATCH_HEADER = struct.Struct("<2sBBI")
+FRAME_LENGTH = struct.Struct("<I")
+
+ENCODING_FLOAT32 = 1
+ENCODING_DELTA16 = 2
+ENCODING_VARINT = 3
+ENCODING_DECIMATED = 4
+FLAG_MEASURED = 0x01
+# Decimals of the JSON samples: the dataset's precision, so float32 samples print as short decimals
+JSON_SAMPLE_DECIMALS = 4
+# Samples per second addressable by the uint8 positions of a decimated frame
+MAX_DECIMATED_SAMPLES = 256
+# Smallest zigzag value needing 2, 3, ... varint bytes
+VARINT_LIMITS = 2 ** (7 * np.arange(1, 9, dtype=np.int64))
+
+
+def encode_payload(payload, payload_format="json", resolution=config.PAYLOAD_DELTA_RESOLUTION):
+    """
+    Encode a message built by SmartWatchSimulator.build_payload.
+
+    Args:
+        payload (dict): Message with timestamp, heart_rate, measured, zone, participant and ecg_samples, and
+            optionally quality
+        payload_format (str): One of PAYLOAD_FORMATS
+        resolution (float): Quantization step of the "delta16" and "varint" samples
+
+    Returns:
+        str or bytes: JSON text for "json", a binary frame otherwise
+    """
+    if payload_format == "json":
+        samples = payload["ecg_samples"]
+        if isinstance(samples, np.ndarray):
+            samples = np.round(samples.astype(np.float64), JSON_SAMPLE_DECIMALS).tolist()
+        message = dict(payload, ecg_samples=samples)
+        return json.dumps(message)
+    if payload_format not in PAYLOAD_FORMATS:
+        raise ValueError(f"Unknown payload format: {payload_format}")
+
+    samples = np.asarray(payload["ecg_samples"], dtype=np.float32)
+    encoding, scale, base, body = ENCODING_FLOAT32, 0.0, 0, samples.astype("<f4").tobytes()
+    if payload_format in ("delta16", "varint") and len(samples):
+        quantized = np.round(samples.astype(np.float64) / resolution).astype(np.int64)
+        deltas = np.diff(quantized)
+        fits = -2**31 <= quantized[0] < 2**31
+        if payload_format == "delta16":
+            fits = fits and (len(deltas) == 0 or (deltas.min() >= -32768 and deltas.max() <= 32767))
+            if fits:
+                encoding, scale, base = ENCODING_DELTA16, resolution, int(quantized[0])
+                body = deltas.astype("<i2").tobytes()
+        elif fits and np.array_equal(dequantize(quantized, np.float32(resolution)), samples):
+            encoding, scale, base = ENCODING_VARINT, resolution, int(quantized[0])
+            body = encode_varints(deltas)
+
+    return _pack_header(payload, encoding, len(samples), scale, base) + body
+
+
+def encode_decimated(payload, positions, sample_count):
+    """
+    Encode a message whose ecg_samples are a subset of the samples of its second.
+
+    Args:
+        payload (dict): Message as for encode_payload, with the kept samples in ecg_samples
+        positions (np.ndarray): Sorted positions of the kept samples within the second
+        sample_count (int): Number of samples of the whole second
+
+    Returns:
+        bytes: Binary frame with the "decimated" sample encoding
+
+    Raises:
+        ValueError: If the second has more samples than uint8 positions can address
+    """
+    if sample_count > MAX_DECIMATED_SAMPLES:
+        raise ValueError(f"Decimated frames hold seconds of at most {MAX_DECIMATED_SAMPLES} samples")
+    positions = np.asarray(positions, dtype=np.uint8)
+    samples = np.asarray(payload["ecg_samples"], dtype="<f4")
+    header = _pack_header(payload, ENCODING_DECIMATED, len(samples), 0.0, sample_count)
+    return header + positions.tobytes() + samples.tobytes()
+
+
+def _pack_header(payload, encoding, count, scale, base):
+    flags = FLAG_MEASURED if payload.get("measured", True) else 0
+    quality = payload.get("quality")
+    quality = QUALITY_UNKNOWN if quality is None else int(round(min(max(quality, 0.0), 1.0) * 100))
+    return HEADER.pack(PAYLOAD_MAGIC, PAYLOAD_VERSION, encoding, payload["timestamp"], payload["heart_rate"],
+                       payload["zone"], flags, payload["participant"], count, scale, base, quality)
+
+
+def decode_payload(data):
+    """
+    Decode a message in any of PAYLOAD_FORMATS.
+
+    Args:
+        data (bytes or str): MQTT message payload
+
+    Returns:
+        dict: Message with the JSON field names; ecg_samples is a float32 np.ndarray. A decimated
+            frame also has ecg_positions (np.ndarray) and sample_count
+
+    Raises:
+        ValueError: If the message is neither JSON nor a supported binary frame
+    """
+    if isinstance(data, str) or not data[:2] == PAYLOAD_MAGIC:
+        return _json_message(json.loads(data))
+
+    version = data[2] if len(data) > 2 else None
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported payload version: {version}")
+    header = HEADER if version == PAYLOAD_VERSION else HEADER_V1
+    if len(data) < header.size:
+        raise ValueError("Truncated payload header")
+    _, _, encoding, timestamp, heart_rate, zone, flags, participant, count, scale, base, *rest = \
+        header.unpack_from(data)
+    quality = rest[0] / 100 if rest and rest[0] != QUALITY_UNKNOWN else None
+    decimation = {}
+
+    if encoding == ENCODING_FLOAT32:
+        samples = np.frombuffer(data, dtype="<f4", count=count, offset=header.size).astype(np.float32)
+    elif encoding == ENCODING_DELTA16:
+        deltas = np.frombuffer(data, dtype="<i2", count=max(count - 1, 0), offset=header.size)
+        quantized = base + np.concatenate(([0], np.cumsum(deltas, dtype=np.int64)))[:count]
+        samples = dequantize(quantized, scale)
+    elif encoding == ENCODING_VARINT:
+        deltas = decode_varints(data[header.size:], max(count - 1, 0))
+        quantized = base + np.concatenate(([0], np.cumsum(deltas, dtype=np.int64)))[:count]
+        samples = dequantize(quantized, scale)
+    elif encoding == ENCODING_DECIMATED:
+        samples = np.frombuffer(data, dtype="<f4", count=count, offset=header.size + count).astype(np.float32)
+        positions = np.frombuffer(data, dtype=np.uint8, count=count, offset=header.size).astype(np.int64)
+        decimation = {"ecg_positions": positions, "sample_count": base}
+    else:
+        raise ValueError(f"Unknown sample encoding: {encoding}")
+
+    return {
+        "timestamp": timestamp,
+        "heart_rate": heart_rate,
+        "measured": bool(flags & FLAG_MEASURED),
+        "quality": quality,
+        "zone": zone,
+        "ecg_samples": samples,
+        "participant": participant,
+        **decimation
+    }
+
+
+def dequantize(quantized, scale):
+    """
+    Convert samples in resolution units back to float32.
+
+    Args:
+        quantized (np.ndarray): Samples in resolution units
+        scale (float): Resolution as stored in the frame header (float32)
+
+    Returns:
+        np.ndarray: float32 samples
+    """
+    # A decimal resolution such as 1e-4 is inexact in float32; dividing by the whole number of steps
+    # per unit restores decimal samples exactly
+    steps = round(1.0 / float(scale))
+    if steps and abs(steps * float(scale) - 1.0) < 1e-6:
+        return (quantized / steps).astype(np.float32)
+    return (quantized * float(scale)).astype(np.float32)
+
+
+def encode_varints(values):
+    """
+    Encode signed integers as zigzag LEB128 varints.
+
+    Args:
+        values (np.ndarray): Integers in [-2**62, 2**62)
+
+    Returns:
+        bytes: Seven bits per byte, least significant group first, high bit set on all but the last byte of a value
+    """
+    values = np.asarray(values, dtype=np.int64)
+    zigzag = (values << 1) ^ (values >> 63)
+    lengths = 1 + np.searchsorted(VARINT_LIMITS, zigzag, side='right')
+    width = int(lengths.max(initial=1))
+    if width == 1:
+        return zigzag.astype(np.uint8).tobytes()
+    groups = (zigzag[:, None] >> (7 * np.arange(width))) & 0x7F
+    position = np.arange(width)
+    groups |= (position < (lengths - 1)[:, None]) << 7
+    return groups[position < lengths[:, None]].astype(np.uint8).tobytes()
+
+
+def decode_varints(data, count):
+    """
+    Decode the first count zigzag LEB128 varints of a buffer.
+
+    Args:
+        data (bytes): Encoded values, as written by encode_varints
+        count (int): Number of values
+
+    Returns:
+        np.ndarray: Decoded int64 values
+
+    Raises:
+        ValueError: If the buffer holds fewer than count values
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("Truncated varint samples")
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+    if ends[-1] == count - 1:
+        zigzag = raw[:count].astype(np.int64)
+    else:
+        raw = raw[:ends[-1] + 1]
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        # Position of every byte within its value, giving the shift of its 7-bit group
+        shifts = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+        zigzag = np.add.reduceat((raw & 0x7F).astype(np.int64) << shifts, starts)
+    return (zigzag >> 1) ^ -(zigzag & 1)
+
+
+def encode_batch(messages):
+    """
+    Combine messages returned by encode_payload into one batch message.
+
+    Args:
+        messages (list): Encoded messages, all JSON text or all binary frames
+
+    Returns:
+        str or bytes: JSON batch for text messages, binary batch otherwise
+    """
+    if messages and isinstance(messages[0], str):
+        return '{"batch": [' + ", ".join(messages) + ']}'
+    parts = [BATCH_HEADER.pack(BATCH_MAGIC, PAYLOAD_VERSION, 0, len(messages))]
+    for frame in messages:
+        parts.append(FRAME_LENGTH.pack(len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+
+def decode_messages(data):
+    """
+    Decode a single or batch message into its messages.
+
+    Args:
+        data (bytes or str): MQTT message payload
+
+    Returns:
+        list: Messages as returned by decode_payload, in publish order
+
+    Raises:
+        ValueError: If the message is not a supported single or batch message
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:2]) == BATCH_MAGIC:
+        data = bytes(data)
+        if len(data) < BATCH_HEADER.size:
+            raise ValueError("Truncated batch header")
+        _, version, _, count = BATCH_HEADER.unpack_from(data)
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported payload version: {version}")
+        messages = []
+        offset = BATCH_HEADER.size
+        for _ in range(count):
+            if offset + FRAME_LENGTH.size > len(data):
+                raise ValueError("Truncated batch")
+            (length,) = FRAME_LENGTH.unpack_from(data, offset)
+            offset += FRAME_LENGTH.size
+            messages.append(decode_payload(data[offset:offset + length]))
+            offset += length
+        return messages
+
+    if isinstance(data, (bytes, bytearray)) and data[:2] != PAYLOAD_MAGIC:
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        message = json.loads(data)
+        if isinstance(message, dict) and "batch" in message:
+            return [_json_message(item) for item in message["batch"]]
+        return [_json_message(message)]
+    return [decode_payload(data)]
+
+
+def _json_message(message):
+    message["ecg_samples"] = np.asarray(message.get("ecg_samples", []), dtype=np.float32)
+    return message
+
+
+def payload_format_status(payload_format, resolution=config.PAYLOAD_DELTA_RESOLUTION):
+    """
+    Describe a payload format for the status topic.
+
+    Args:
+        payload_format (str): One of PAYLOAD_FORMATS
+        resolution (float): Quantization step of the "delta16" and "varint" samples
+
+    Returns:
+        dict: Format name, binary frame version and, for "delta16" and "varint", the resolution
+    """
+    status = {"payload_format": payload_format}
+    if payload_format != "json":
+        status["payload_version"] = PAYLOAD_VERSION
+    if payload_format in ("delta16", "varint"):
+        status["payload_resolution"] = resolution
+    return status
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Online R-peak detection for ECG streams.
+
+StreamingPeakDetector consumes samples in chunks of any size and emits beat
+positions and per-second heart rates as soon as they are final. Each chunk is
+searched once for local maxima and their prominences, with a fixed guard of
+already searched samples as context. Every heart rate window then z-scores its
+candidates with its own mean and standard deviation, taken from running sums
+carried from chunk to chunk, and applies the same height, distance and
+prominence criteria as the sliding-window method. A sample is therefore searched
+a bounded number of times and each candidate is examined once per window that
+contains it. The results do not depend on the chunk size; with chunks of about
+a second the per-call overhead of find_peaks dominates.
+"""
+import math
+import numpy as np
+from scipy.signal import find_peaks
+import config
+from ecg_filters import StreamingFilter
+
+MIN_VALID_HR = 40
+MAX_VALID_HR = 200
+
+# Offline callers already hold the whole recording, so feed it in large chunks
+# to amortize per-call overhead; results do not depend on the chunk size.
+DEFAULT_CHUNK_SECONDS = 30
+
+
+class _SampleBuffer:
+    def __init__(self, capacity=1024):
+        """
+        Initialize an empty buffer of the most recent values of a stream.
+
+        Values are appended at the end and discarded from the front. The
+        retained values are moved to the front of the array only when it is
+        full, and the array doubles when they fill more than half of it, so
+        appending costs O(1) amortized per value.
+
+        Args:
+            capacity (int): Initial array size
+        """
+        self._data = np.zeros(capacity)
+        self.start = 0
+        self.end = 0
+        self._offset = 0
+
+    def append(self, values):
+        """Append values after the last one."""
+        n = len(values)
+        used = self.end - self.start
+        if self._offset + used + n > len(self._data):
+            data = self._data if 2 * (used + n) <= len(self._data) else np.zeros(2 * (used + n))
+            data[:used] = self._data[self._offset:self._offset + used]
+            self._data, self._offset = data, 0
+        self._data[self._offset + used:self._offset + used + n] = values
+        self.end += n
+
+    def last(self):
+        """Get the newest value."""
+        return self._data[self._offset + self.end - self.start - 1]
+
+    def view(self, start, end):
+        """Get the values at stream positions [start, end) without copying."""
+        return self._data[self._offset + start - self.start:self._offset + end - self.start]
+
+    def take(self, positions):
+        """Get the values at an array of stream positions."""
+        return self._data[self._offset + positions - self.start]
+
+    def discard_before(self, position):
+        """Drop the values before a stream position."""
+        if position > self.start:
+            self._offset += position - self.start
+            self.start = position
+
+
+class StreamingPeakDetector:
+    def __init__(self, sampling_rate=config.SAMPLING_RATE, window_seconds=5,
+                 height=0.5, prominence=0.2, distance=None, prefilter=False):
+        """
+        Initialize the streaming detector.
+
+        The peak criteria are the ones used by ECGProcessor.calculate_heart_rate:
+        within each heart rate window the samples are z-scored with the window's
+        mean and standard deviation, and peaks must reach the given height and
+        prominence at least distance samples apart. A window is evaluated once
+        the stream has passed its end, which delays output by one window.
+
+        Args:
+            sampling_rate (int): Sampling rate of the ECG signal in Hz
+            window_seconds (int): Length of the heart rate window in seconds
+            height (float): Minimum normalized peak height
+            prominence (float): Minimum normalized peak prominence
+            distance (int, optional): Minimum samples between peaks. Defaults to a quarter second
+            prefilter (bool): Run raw chunks through a causal ecg_filters.StreamingFilter first. Leave
+                off for input that is already filtered; the causal filter delays beats by a few samples
+        """
+        self.sampling_rate = sampling_rate
+        self.window_size = window_seconds * sampling_rate
+        self.height = height
+        self.prominence = prominence
+        self.distance = distance if distance is not None else sampling_rate // 4
+        self.filter = StreamingFilter(sampling_rate) if prefilter else None
+
+        # Candidate prominence is measured within one second around the peak, so
+        # a candidate is final once half a second past it has been seen.
+        self.wlen = sampling_rate
+        self.guard = self.wlen // 2 + 1
+
+        self.reset()
+
+    def reset(self):
+        """Discard all state and start a new stream at sample index 0."""
+        self.samples_seen = 0
+        if self.filter is not None:
+            self.filter.reset()
+        self.beats = []
+        self.heart_rates = []
+
+        # Raw samples, and running sums of the samples and their squares from the start of the stream:
+        # entry i of a sum buffer is the sum over samples [0, i)
+        self._raw = _SampleBuffer()
+        self._sum = _SampleBuffer()
+        self._sum_sq = _SampleBuffer()
+        self._sum.append([0.0])
+        self._sum_sq.append([0.0])
+
+        # Local maxima of the raw signal before _searched_until, with their raw heights and prominences
+        self._candidates = np.zeros(0, dtype=np.int64)
+        self._heights = np.zeros(0)
+        self._prominences = np.zeros(0)
+        self._searched_until = 0
+
+        self._selected = set()
+        self._next_window = 0
+
+    def process(self, chunk):
+        """
+        Feed the next chunk of raw ECG samples.
+
+        Args:
+            chunk (np.ndarray): Consecutive raw samples
+
+        Returns:
+            tuple: (np.ndarray of newly detected beat sample indices,
+                    list of heart rates for newly completed seconds, None where
+                    too few valid beats were found)
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.filter is not None:
+            chunk = self.filter.process(chunk)
+        self.samples_seen += len(chunk)
+        self._raw.append(chunk)
+        self._sum.append(self._sum.last() + np.cumsum(chunk))
+        self._sum_sq.append(self._sum_sq.last() + np.cumsum(chunk * chunk))
+        self._search(final=False)
+        return self._evaluate_windows(final=False)
+
+    def finish(self):
+        """
+        Flush the detector at the end of the stream.
+
+        Returns:
+            tuple: Same as process() for the remaining beats and seconds
+        """
+        self._search(final=True)
+        return self._evaluate_windows(final=True)
+
+    def _search(self, final):
+        """
+        Find the local maxima among the samples not searched yet.
+
+        The search covers the new samples plus half a prominence window of
+        already searched context, and the last half window is left for the next
+        chunk, so each sample is searched a bounded number of times.
+        """
+        limit = self.samples_seen if final else self.samples_seen - self.guard
+        if limit <= self._searched_until:
+            return
+
+        start = max(self._searched_until - self.guard, self._raw.start)
+        peaks, properties = find_peaks(self._raw.view(start, self.samples_seen), prominence=0, wlen=self.wlen)
+        peaks = peaks + start
+        keep = (peaks >= self._searched_until) & (peaks < limit)
+        self._candidates = np.concatenate((self._candidates, peaks[keep]))
+        self._heights = np.concatenate((self._heights, self._raw.take(peaks[keep])))
+        self._prominences = np.concatenate((self._prominences, properties["prominences"][keep]))
+        self._searched_until = limit
+
+    def _evaluate_windows(self, final):
+        """
+        Produce the beats and heart rate of every window that is now fully searched.
+
+        Window k covers samples [k * sampling_rate, k * sampling_rate + window_size).
+        Its mean and standard deviation are differences of the running sums, and
+        its peaks are the candidates that pass the normalized height, distance and
+        prominence criteria, so each window costs O(1) work plus O(1) per
+        candidate inside it. Its heart rate is the mean of the valid
+        instantaneous rates between consecutive peaks. The beats are the union of
+        the peaks of all windows, emitted once no later window can contain them.
+        """
+        heart_rates = []
+        while True:
+            window_start = self._next_window * self.sampling_rate
+            window_end = window_start + self.window_size
+            if final:
+                if window_start >= self.samples_seen - self.window_size:
+                    break
+            elif window_end - 1 > self._searched_until:
+                break
+
+            peaks = self._window_peaks(window_start, window_end)
+            self._selected.update(peaks)
+            instant_hrs = [60 * self.sampling_rate / (beat - previous) for previous, beat in zip(peaks, peaks[1:])]
+            valid_hrs = [hr for hr in instant_hrs if MIN_VALID_HR <= hr <= MAX_VALID_HR]
+            heart_rates.append(int(sum(valid_hrs) / len(valid_hrs)) if len(peaks) > 2 and len(valid_hrs) >= 2 else None)
+            self._next_window += 1
+
+        # Samples at or before the start of the next window are interior to no later window
+        final_before = self.samples_seen if final else self._next_window * self.sampling_rate + 1
+        beats = sorted(beat for beat in self._selected if beat < final_before)
+        self._selected.difference_update(beats)
+        self.beats.extend(beats)
+        self.heart_rates.extend(heart_rates)
+
+        next_start = self._next_window * self.sampling_rate
+        first = np.searchsorted(self._candidates, next_start + 1)
+        self._candidates = self._candidates[first:]
+        self._heights = self._heights[first:]
+        self._prominences = self._prominences[first:]
+        self._sum.discard_before(min(next_start, self.samples_seen))
+        self._sum_sq.discard_before(min(next_start, self.samples_seen))
+        self._raw.discard_before(max(self._searched_until - self.guard, 0))
+        return np.array(beats, dtype=np.int64), heart_rates
+
+    def _window_peaks(self, window_start, window_end):
+        """
+        Select the peaks of one window among the candidates.
+
+        Mirrors find_peaks on the z-scored window: the first and last samples
+        cannot be peaks, the height filter applies first, then the distance
+        filter keeps the highest of nearby peaks, then the prominence filter.
+
+        Returns:
+            list: Peak sample indices
+        """
+        mean = (self._sum.take(window_end) - self._sum.take(window_start)) / self.window_size
+        var = (self._sum_sq.take(window_end) - self._sum_sq.take(window_start)) / self.window_size - mean * mean
+        std = math.sqrt(max(var, 0.0))
+        if std == 0:
+            return []
+
+        lo, hi = self._candidates.searchsorted((window_start + 1, window_end - 1))
+        heights = (self._heights[lo:hi] - mean) / std
+        passed = np.flatnonzero(heights >= self.height) + lo
+        peaks = self._candidates[passed].tolist()
+        heights = heights[passed - lo].tolist()
+        prominences = (self._prominences[passed] / std).tolist()
+
+        keep = [True] * len(peaks)
+        if any(beat - previous < self.distance for previous, beat in zip(peaks, peaks[1:])):
+            for i in sorted(range(len(peaks)), key=heights.__getitem__)[::-1]:
+                if not keep[i]:
+                    continue
+                j = i - 1
+                while j >= 0 and peaks[i] - peaks[j] < self.distance:
+                    keep[j] = False
+                    j -= 1
+                j = i + 1
+                while j < len(peaks) and peaks[j] - peaks[i] < self.distance:
+                    keep[j] = False
+                    j += 1
+        return [peak for peak, kept, prominence in zip(peaks, keep, prominences)
+                if kept and prominence >= self.prominence]
+
+
+def detect_heart_rates(ecg_data, sampling_rate=config.SAMPLING_RATE, window_seconds=5, chunk_size=None):
+    """
+    Run the streaming detector over a complete recording.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the ECG signal in Hz
+        window_seconds (int): Size of the heart rate window in seconds
+        chunk_size (int, optional): Samples fed per call. Defaults to DEFAULT_CHUNK_SECONDS
+
+    Returns:
+        tuple: (np.ndarray of beat sample indices, list of per-second heart rates or None)
+    """
+    detector = StreamingPeakDetector(sampling_rate, window_seconds)
+    chunk_size = chunk_size or DEFAULT_CHUNK_SECONDS * sampling_rate
+    for start in range(0, len(ecg_data), chunk_size):
+        detector.process(ecg_data[start:start + chunk_size])
+    detector.finish()
+    return np.array(detector.beats, dtype=np.int64), detector.heart_rates
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Bounded, acknowledged MQTT publishing.
+
+client.publish never blocks: with QoS 1/2 and a slow broker paho keeps every
+unacknowledged message in memory. The pipeline puts a bounded queue in front
+of the client and a sender thread that keeps at most max_in_flight messages
+waiting for their on_publish callback (PUBACK/PUBCOMP for QoS 1/2, the socket
+write for QoS 0). When the queue is full, producers wait for room, which
+pushes back on the publish scheduler, and messages that still find no room
+after queue_timeout seconds are dropped and counted.
+
+With a MessageSpool attached, messages leaving the queue while the client is
+disconnected are written to the spool instead. After reconnecting, a drain
+thread publishes the spooled messages at catchup_rate messages per second
+through the same in-flight window, interleaved with the live messages.
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+import numpy as np
+import paho.mqtt.client as mqtt
+import config
+
+LATENCY_SAMPLES = 4096
+
+
+class PublishPipeline:
+    def __init__(self, client, qos=config.MQTT_QOS, max_in_flight=config.PUBLISH_MAX_IN_FLIGHT,
+                 queue_size=config.PUBLISH_QUEUE_SIZE, queue_timeout=config.PUBLISH_QUEUE_TIMEOUT,
+                 spool=None, catchup_rate=config.SPOOL_CATCHUP_RATE):
+        """
+        Initialize the pipeline and attach it to a client.
+
+        Args:
+            client (mqtt.Client): Client to publish with. Its on_publish callback is replaced
+            qos (int): MQTT QoS level of the published messages
+            max_in_flight (int): Messages handed to the client but not acknowledged yet
+            queue_size (int): Messages waiting for an in-flight slot
+            queue_timeout (float): Seconds a producer waits for room in a full queue before dropping
+            spool (MessageSpool, optional): Spool for messages published while disconnected
+            catchup_rate (float): Spooled messages published per second after reconnecting
+        """
+        self.client = client
+        self.qos = qos
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.spool = spool
+        self.catchup_rate = catchup_rate
+        self.connected = False
+
+        self._queue = deque()
+        self._in_flight = {}
+        # Acknowledgements that arrive while client.publish has not yet returned the mid
+        self._early_acks = set()
+        self._publishing = 0
+        self._condition = threading.Condition()
+        self._latencies = np.zeros(LATENCY_SAMPLES)
+        self._latency_count = 0
+        self._sending = False
+        self._closed = False
+
+        self.published = 0
+        self.acked = 0
+        self.dropped = 0
+        self.errors = 0
+        self.spooled = 0
+        self.drained = 0
+
+        client.max_inflight_messages_set(max_in_flight)
+        client.on_publish = self.on_publish
+        self._sender = threading.Thread(target=self._send_loop, name="mqtt-publish", daemon=True)
+        self._sender.start()
+        self._drainer = None
+        if spool is not None:
+            self._drainer = threading.Thread(target=self._drain_loop, name="mqtt-spool-drain", daemon=True)
+            self._drainer.start()
+
+    def set_connected(self, connected):
+        """
+        Record the connection state of the client.
+
+        Args:
+            connected (bool): Whether the client is connected to the broker
+        """
+        with self._condition:
+            self.connected = connected
+            if not connected:
+                self._early_acks.clear()
+                if self.qos == 0:
+                    # QoS 0 messages written before the connection dropped are never acknowledged
+                    self._in_flight.clear()
+            self._condition.notify_all()
+
+    def try_submit(self, topic, payload):
+        """
+        Queue a message if there is room.
+
+        Args:
+            topic (str): MQTT topic
+            payload (str or bytes): Encoded message
+
+        Returns:
+            bool: True if the message was queued
+        """
+        with self._condition:
+            if len(self._queue) >= self.queue_size or self._closed:
+                return False
+            self._queue.append((topic, payload))
+            self._condition.notify_all()
+            return True
+
+    def submit(self, topic, payload):
+        """
+        Queue a message, waiting up to queue_timeout for room in a full queue.
+
+        Args:
+            topic (str): MQTT topic
+            payload (str or bytes): Encoded message
+
+        Returns:
+            bool: True if the message was queued, False if it was dropped
+        """
+        with self._condition:
+            has_room = self._condition.wait_for(lambda: len(self._queue) < self.queue_size or self._closed,
+                                                timeout=self.queue_timeout)
+            if has_room and not self._closed:
+                self._queue.append((topic, payload))
+                self._condition.notify_all()
+                return True
+            self.dropped += 1
+            return False
+
+    async def submit_async(self, topic, payload, poll_interval=0.005):
+        """
+        Queue a message from a coroutine without blocking the event loop.
+
+        Args:
+            topic (str): MQTT topic
+            payload (str or bytes): Encoded message
+            poll_interval (float): Seconds between attempts while the queue is full
+
+        Returns:
+            bool: True if the message was queued, False if it was dropped
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        while not self.try_submit(topic, payload):
+            if self._closed or time.monotonic() >= deadline:
+                with self._condition:
+                    self.dropped += 1
+                return False
+            await asyncio.sleep(poll_interval)
+        return True
+
+    def _send_loop(self):
+        while True:
+            with self._condition:
+                # Messages bound for the spool do not wait for a slot in the acknowledgement window
+                self._condition.wait_for(lambda: self._closed or
+                                         (self._queue and ((self.spool is not None and not self.connected) or
+                                                           len(self._in_flight) < self.max_in_flight)))
+                if not self._queue:
+                    return
+                topic, payload = self._queue.popleft()
+                self._sending = True
+                self._condition.notify_all()
+                spool = self.spool is not None and not self.connected
+
+            if spool:
+                with self._condition:
+                    self._spool(topic, payload)
+                    self._sending = False
+                    self._condition.notify_all()
+            else:
+                self._publish(topic, payload)
+
+    def _drain_loop(self):
+        next_send = time.monotonic()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or (self.connected and len(self.spool) > 0 and
+                                                                  len(self._in_flight) < self.max_in_flight),
+                                         timeout=1.0)
+                if self._closed:
+                    return
+                if not (self.connected and len(self.spool) > 0 and len(self._in_flight) < self.max_in_flight):
+                    continue
+                record = self.spool.pop()
+                self._sending = True
+            if record is not None:
+                self._publish(*record)
+                with self._condition:
+                    self.drained += 1
+            else:
+                with self._condition:
+                    self._sending = False
+
+            # Catching up must not flood the broker that just came back
+            next_send = max(next_send + 1.0 / self.catchup_rate, time.monotonic())
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _publish(self, topic, payload):
+        """Hand a message to the client and track it until it is acknowledged. Called with _sending set."""
+        sent_at = time.monotonic()
+        with self._condition:
+            self._publishing += 1
+        # Publish outside the lock: paho may call on_publish before publish returns
+        info = self.client.publish(topic, payload, qos=self.qos)
+
+        with self._condition:
+            self._sending = False
+            self._publishing -= 1
+            acked_early = info.mid in self._early_acks
+            self._early_acks.discard(info.mid)
+            if not self._publishing:
+                # Anything left belongs to messages published around the pipeline, such as the status message
+                self._early_acks.clear()
+            self._condition.notify_all()
+            # While disconnected paho keeps QoS 1/2 messages for the next connection but discards QoS 0 ones
+            queued = info.rc == mqtt.MQTT_ERR_SUCCESS or (info.rc == mqtt.MQTT_ERR_NO_CONN and self.qos > 0)
+            if not queued:
+                if self.spool is not None and info.rc == mqtt.MQTT_ERR_NO_CONN:
+                    self._spool(topic, payload)
+                else:
+                    self.errors += 1
+                return
+            self.published += 1
+            if acked_early:
+                self._record_ack(time.monotonic() - sent_at)
+            else:
+                self._in_flight[info.mid] = sent_at
+
+    def _spool(self, topic, payload):
+        if self.spool.append(topic, payload):
+            self.spooled += 1
+        else:
+            self.dropped += 1
+
+    def on_publish(self, client, userdata, mid):
+        """
+        Callback for a message acknowledged by the broker (or written to the socket with QoS 0).
+
+        Args:
+            client: MQTT client instance
+            userdata: User data passed to client
+            mid (int): Message id returned by publish
+        """
+        with self._condition:
+            sent_at = self._in_flight.pop(mid, None)
+            if sent_at is None:
+                # Only a publish call still in progress can claim an unknown mid; any other is not ours
+                if self._publishing:
+                    self._early_acks.add(mid)
+                return
+            self._record_ack(time.monotonic() - sent_at)
+            self._condition.notify_all()
+
+    def _record_ack(self, latency):
+        self._latencies[self._latency_count % LATENCY_SAMPLES] = latency
+        self._latency_count += 1
+        self.acked += 1
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until every queued message has been acknowledged.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most
+
+        Returns:
+            bool: True if the pipeline is idle
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not (self._queue or self._sending or self._in_flight),
+                                            timeout=timeout)
+
+    def close(self, timeout=None):
+        """
+        Stop the sender thread after the queue has drained. Closing a closed pipeline does nothing.
+
+        Args:
+            timeout (float, optional): Seconds to wait for outstanding messages
+        """
+        if self._closed:
+            return
+        self.wait_idle(timeout)
+        with self._condition:
+            self._closed = True
+            self.dropped += len(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+        self._sender.join(timeout)
+        if self._drainer is not None:
+            # Messages still in the spool stay on disk for the next run
+            self._drainer.join(timeout)
+            self.spool.close()
+
+    def stats(self):
+        """
+        Get pipeline counters.
+
+        Returns:
+            dict: queue depth, in-flight messages, published, acknowledged, dropped and failed
+                messages, connection state, spooled, drained and pending spool messages and the
+                p50/p95/p99 acknowledgement latency of the recent messages in ms
+        """
+        with self._condition:
+            latencies = self._latencies[:min(self._latency_count, LATENCY_SAMPLES)]
+            p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) * 1000) if len(latencies) else (0.0, 0.0, 0.0)
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": len(self._in_flight),
+                "published": self.published,
+                "acked": self.acked,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "connected": self.connected,
+                "spooled": self.spooled,
+                "drained": self.drained,
+                "spool_pending": len(self.spool) if self.spool is not None else 0,
+                "ack_p50_ms": float(p50),
+                "ack_p95_ms": float(p95),
+                "ack_p99_ms": float(p99)
+            }
+
+    def summary(self):
+        """str: One line description of stats()."""
+        stats = self.stats()
+        return (f"queue {stats['queue_depth']}, in flight {stats['in_flight']}, acked {stats['acked']}/"
+                f"{stats['published']}, dropped {stats['dropped']}, spooled {stats['spooled']} "
+                f"(pending {stats['spool_pending']}), ack latency p50 {stats['ack_p50_ms']:.1f} ms "
+                f"p95 {stats['ack_p95_ms']:.1f} ms p99 {stats['ack_p99_ms']:.1f} ms")
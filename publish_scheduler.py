@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Drift-free publish scheduling on the monotonic clock.
+
+Message n is due at start + n * interval / speed. Deadlines are computed from
+the start time rather than by sleeping a fixed interval after each publish, so
+time spent building and publishing a message never accumulates as drift; a
+scheduler that falls behind sends immediately until it has caught up. The
+scheduler also keeps running statistics of the achieved rate, the lag behind
+each deadline and the jitter of the send intervals.
+"""
+import math
+import time
+import asyncio
+import argparse
+
+
+def parse_speed(value):
+    """
+    Parse a replay speed such as "1", "10x", "0.5x" or "max".
+
+    Args:
+        value (str or float): Speed multiplier, optionally suffixed with "x", or "max"
+
+    Returns:
+        float: Speed multiplier, math.inf for "max"
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive speed
+    """
+    if isinstance(value, (int, float)):
+        speed = float(value)
+    else:
+        text = value.strip().lower()
+        if text == "max":
+            return math.inf
+        try:
+            speed = float(text[:-1] if text.endswith("x") else text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid speed: {value!r} (use e.g. 1, 10x or max)")
+    if not speed > 0:
+        raise argparse.ArgumentTypeError(f"speed must be positive: {value!r}")
+    return speed
+
+
+def format_speed(speed):
+    """Format a speed multiplier the way parse_speed accepts it."""
+    return "max" if math.isinf(speed) else f"{speed:g}x"
+
+
+class PublishScheduler:
+    def __init__(self, interval, speed=1.0, start=None, timestamp=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            interval (float): Time between messages in the data, in seconds
+            speed (float): Replay speed multiplier. math.inf sends as fast as possible
+            start (float, optional): time.monotonic() value of the first deadline. Defaults to now
+            timestamp (float, optional): Wall clock time of the first message. Defaults to time.time()
+        """
+        self.interval = interval
+        self.speed = speed
+        self.period = 0.0 if math.isinf(speed) else interval / speed
+        self.start = time.monotonic() if start is None else start
+        self.start_timestamp = time.time() if timestamp is None else timestamp
+        self.sent = 0
+
+        self._last_send = None
+        self._first_send = None
+        self._lag_sum = 0.0
+        self._lag_max = 0.0
+        # Welford running mean and variance of the send interval deviation from the period
+        self._jitter_mean = 0.0
+        self._jitter_m2 = 0.0
+
+    def deadline(self):
+        """float: Monotonic time at which the next message is due."""
+        return self.start + self.sent * self.period
+
+    def timestamp(self):
+        """
+        Get the data timestamp of the next message.
+
+        Timestamps advance by interval per message whatever the replay speed, so
+        accelerated replays still carry one timestamp per second of data.
+
+        Returns:
+            float: Unix timestamp
+        """
+        return self.start_timestamp + self.sent * self.interval
+
+    def delay(self):
+        """float: Seconds until the next message is due, 0 if it is already due."""
+        return max(0.0, self.deadline() - time.monotonic())
+
+    def wait(self):
+        """Block until the next message is due, then record it as sent."""
+        delay = self.delay()
+        if delay > 0:
+            time.sleep(delay)
+        self.mark_sent()
+
+    async def wait_async(self):
+        """Wait on the running event loop until the next message is due, then record it as sent."""
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.mark_sent()
+
+    def mark_sent(self):
+        """Record that the message due at deadline() is being sent now."""
+        now = time.monotonic()
+        # Every deadline is the start time at max speed, so lag is only meaningful with a period
+        lag = max(0.0, now - self.deadline()) if self.period > 0 else 0.0
+        self._lag_sum += lag
+        self._lag_max = max(self._lag_max, lag)
+
+        if self._last_send is None:
+            self._first_send = now
+        else:
+            deviation = (now - self._last_send) - self.period
+            count = self.sent  # number of intervals including this one
+            delta = deviation - self._jitter_mean
+            self._jitter_mean += delta / count
+            self._jitter_m2 += delta * (deviation - self._jitter_mean)
+        self._last_send = now
+        self.sent += 1
+
+    def stats(self):
+        """
+        Get scheduling statistics.
+
+        Returns:
+            dict: sent, elapsed seconds, target and achieved rate in messages per second,
+                mean and max lag behind the deadlines and jitter (standard deviation
+                of the send intervals) in milliseconds
+        """
+        elapsed = (self._last_send - self._first_send) if self.sent > 1 else 0.0
+        return {
+            "sent": self.sent,
+            "elapsed": elapsed,
+            "target_rate": math.inf if self.period == 0 else 1.0 / self.period,
+            "rate": (self.sent - 1) / elapsed if elapsed > 0 else 0.0,
+            "lag_mean_ms": 1000 * self._lag_sum / self.sent if self.sent else 0.0,
+            "lag_max_ms": 1000 * self._lag_max,
+            "jitter_ms": 1000 * math.sqrt(self._jitter_m2 / (self.sent - 1)) if self.sent > 1 else 0.0
+        }
+
+    def summary(self):
+        """str: One line description of stats()."""
+        stats = self.stats()
+        return (f"{stats['sent']} messages in {stats['elapsed']:.2f} s at {stats['rate']:.1f} msg/s "
+                f"(speed {format_speed(self.speed)}), lag mean {stats['lag_mean_ms']:.2f} ms "
+                f"max {stats['lag_max_ms']:.2f} ms, jitter {stats['jitter_ms']:.2f} ms")
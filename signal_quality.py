@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Per-second ECG signal quality index.
+
+Every second of raw ECG gets a score between 0 (unusable) and 1 (clean),
+computed for all seconds at once from a (seconds, sampling_rate) view of the
+recording:
+
+- flat line: the second's standard deviation is below FLAT_RELATIVE_STD times
+  the recording's median, or most successive samples are identical (score 0)
+- clipping: share of samples at the recording's extreme values, scaling the
+  score down to 0 at CLIP_LIMIT
+- kurtosis: a QRS complex makes a second strongly peaked, while noise and
+  baseline wander are close to Gaussian or flatter. Excess kurtosis is mapped
+  linearly from -1 (0) to 5 (1)
+- out-of-band power: share of the spectrum at or below 1 Hz or above 40 Hz,
+  where an ECG has little power
+
+The kurtosis and out-of-band terms are averaged and multiplied by the flat
+line and clipping factors. window_quality averages the scores over heart rate
+windows. The score is published with every heart rate. It does not predict
+which windows the detector fails on (benchmarks/bench_sqi.py), so gating
+detection on it is off by default (config.SQI_THRESHOLD = 0).
+"""
+import numpy as np
+import config
+
+FLAT_RELATIVE_STD = 0.1
+FLAT_REPEAT_RATIO = 0.5
+CLIP_TOLERANCE = 0.002
+CLIP_LIMIT = 0.2
+KURTOSIS_RANGE = (-1.0, 5.0)
+IN_BAND_HZ = (1.0, 40.0)
+
+
+def quality_features(ecg_data, sampling_rate=config.SAMPLING_RATE):
+    """
+    Compute the quality features of every complete second.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the signal in Hz
+
+    Returns:
+        dict: Arrays with one value per second: relative_std, repeat_ratio, clip_ratio, kurtosis and
+            out_of_band_ratio
+    """
+    data = np.asarray(ecg_data, dtype=np.float64)
+    seconds = len(data) // sampling_rate
+    segments = data[:seconds * sampling_rate].reshape(seconds, sampling_rate)
+    if seconds == 0:
+        empty = np.zeros(0)
+        return {"relative_std": empty, "repeat_ratio": empty, "clip_ratio": empty, "kurtosis": empty,
+                "out_of_band_ratio": empty}
+
+    centered = segments - segments.mean(axis=1, keepdims=True)
+    variance = (centered ** 2).mean(axis=1)
+    std = np.sqrt(variance)
+    reference = np.median(std)
+
+    low, high = data.min(), data.max()
+    tolerance = (high - low) * CLIP_TOLERANCE
+    clipped = (segments <= low + tolerance) | (segments >= high - tolerance)
+
+    safe_variance = np.where(variance > 0, variance, 1.0)
+    kurtosis = np.where(variance > 0, (centered ** 4).mean(axis=1) / safe_variance ** 2 - 3.0, -3.0)
+
+    power = np.abs(np.fft.rfft(centered, axis=1)) ** 2
+    frequencies = np.fft.rfftfreq(sampling_rate, 1.0 / sampling_rate)
+    out_of_band = (frequencies <= IN_BAND_HZ[0]) | (frequencies > IN_BAND_HZ[1])
+    total = power.sum(axis=1)
+    out_of_band_ratio = np.where(total > 0, power[:, out_of_band].sum(axis=1) / np.where(total > 0, total, 1.0), 1.0)
+
+    return {
+        "relative_std": std / reference if reference > 0 else np.zeros(seconds),
+        "repeat_ratio": (np.diff(segments, axis=1) == 0).mean(axis=1),
+        "clip_ratio": clipped.mean(axis=1) if high > low else np.ones(seconds),
+        "kurtosis": kurtosis,
+        "out_of_band_ratio": out_of_band_ratio
+    }
+
+
+def signal_quality(ecg_data, sampling_rate=config.SAMPLING_RATE):
+    """
+    Score the quality of every complete second.
+
+    Args:
+        ecg_data (np.ndarray): Raw ECG samples
+        sampling_rate (int): Sampling rate of the signal in Hz
+
+    Returns:
+        np.ndarray: Quality between 0 and 1 per second
+    """
+    features = quality_features(ecg_data, sampling_rate)
+    flat = (features["relative_std"] < FLAT_RELATIVE_STD) | (features["repeat_ratio"] > FLAT_REPEAT_RATIO)
+    clip_factor = np.clip(1.0 - features["clip_ratio"] / CLIP_LIMIT, 0.0, 1.0)
+    kurtosis_score = np.clip((features["kurtosis"] - KURTOSIS_RANGE[0]) / (KURTOSIS_RANGE[1] - KURTOSIS_RANGE[0]),
+                             0.0, 1.0)
+    band_score = 1.0 - features["out_of_band_ratio"]
+    return np.where(flat, 0.0, clip_factor * (kurtosis_score + band_score) / 2)
+
+
+def window_quality(quality, window_seconds, count):
+    """
+    Average per-second quality over heart rate windows.
+
+    Window k covers seconds [k, k + window_seconds), like the windows of
+    ECGProcessor.calculate_heart_rate; seconds past the end of quality are ignored.
+
+    Args:
+        quality (np.ndarray): Quality per second
+        window_seconds (int): Window length in seconds
+        count (int): Number of windows
+
+    Returns:
+        np.ndarray: Mean quality per window, 0 for a window without complete seconds
+    """
+    cumsum = np.concatenate(([0.0], np.cumsum(quality)))
+    starts = np.minimum(np.arange(count), len(quality))
+    ends = np.minimum(starts + window_seconds, len(quality))
+    lengths = ends - starts
+    return np.where(lengths > 0, (cumsum[ends] - cumsum[starts]) / np.maximum(lengths, 1), 0.0)
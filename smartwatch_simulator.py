@@ -5,9 +5,19 @@ import json
 import numpy as np
 import paho.mqtt.client as mqtt
 from ecg_processor import ECGProcessor
+from ecg_cache import ECGCache
+from dataset_catalog import get_catalog
+from hr_cache import HeartRateCache
+from participant_pool import ParticipantPool
+from publish_scheduler import PublishScheduler, parse_speed, format_speed
+from payload_codec import PAYLOAD_FORMATS, encode_payload, payload_format_status
+from ecg_views import parse_views, view_topic, build_view
+from message_batcher import MessageBatcher
+from publish_pipeline import PublishPipeline
+from message_spool import MessageSpool
+from hrv import RollingHRV
 import argparse
 import signal
-import sys
 import random
 import config
 
@@ -16,7 +26,15 @@ class SmartWatchSimulator:
                  base_path=config.BASE_PATH, session=config.DEFAULT_SESSION, participant=config.DEFAULT_PARTICIPANT, 
                  topic_prefix=config.MQTT_TOPIC_PREFIX, data_interval=config.DEFAULT_DATA_INTERVAL, 
                  loop_forever=config.DEFAULT_LOOP_FOREVER, max_videos=config.DEFAULT_MAX_VIDEOS, 
-                 random_participants=config.DEFAULT_RANDOM_PARTICIPANTS):
+                 random_participants=config.DEFAULT_RANDOM_PARTICIPANTS, use_cache=config.USE_DATA_CACHE,
+                 gap_fill=config.GAP_FILL_STRATEGY, use_hr_cache=config.USE_HR_CACHE,
+                 pool_memory_mb=config.POOL_MEMORY_BUDGET_MB, speed=config.DEFAULT_REPLAY_SPEED,
+                 payload_format=config.PAYLOAD_FORMAT, batch_seconds=config.BATCH_SECONDS,
+                 batch_bytes=config.BATCH_MAX_BYTES, batch_delay=config.BATCH_MAX_DELAY,
+                 max_in_flight=config.PUBLISH_MAX_IN_FLIGHT, queue_size=config.PUBLISH_QUEUE_SIZE,
+                 spool_mb=config.SPOOL_MAX_MB, catchup_rate=config.SPOOL_CATCHUP_RATE,
+                 hrv_interval=config.HRV_PUBLISH_INTERVAL, hrv_window=config.HRV_WINDOW_SECONDS,
+                 views=config.ECG_VIEWS, views_only=config.ECG_VIEWS_ONLY):
         """
         Initialize the smartwatch simulator.
         
@@ -32,6 +50,23 @@ class SmartWatchSimulator:
             loop_forever (bool): Whether to loop the data continuously
             max_videos (int): Maximum number of videos to include from each participant
             random_participants (bool): Whether to randomly select participants for continuous data
+            use_cache (bool): Whether to read ECG data from the memory-mapped binary cache
+            gap_fill (str): Strategy for seconds without a heart rate measurement
+            use_hr_cache (bool): Whether to reuse heart rate series computed in earlier runs
+            pool_memory_mb (float): Memory budget of the prepared participant pool used in random mode
+            speed (float): Replay speed multiplier relative to data_interval, math.inf for as fast as possible
+            payload_format (str): Encoding of the data messages, "json", "f32", "delta16" or "varint"
+            batch_seconds (int): Seconds of data combined into one MQTT message, 1 disables batching
+            batch_bytes (int): Publish a batch early once it reaches this many bytes
+            batch_delay (float): Publish a batch once its oldest second has waited this long in seconds
+            max_in_flight (int): Messages published but not yet acknowledged by the broker
+            queue_size (int): Messages waiting for an in-flight slot before publishing blocks
+            spool_mb (float): Size of the on-disk spool for messages published while disconnected, 0 disables it
+            catchup_rate (float): Spooled messages published per second after reconnecting
+            hrv_interval (int): Seconds of data between HRV messages, 0 disables them
+            hrv_window (float): Length of the HRV window in seconds
+            views (str): Comma-separated ecg_views representations published next to the data messages
+            views_only (bool): Publish only the views, not the full-rate data messages
         """
         self.broker = broker
         self.port = port
@@ -44,12 +79,38 @@ class SmartWatchSimulator:
         self.loop_forever = loop_forever
         self.max_videos = max_videos
         self.random_participants = random_participants
+        self.gap_fill = gap_fill
+        self.pool_memory_mb = pool_memory_mb
+        self.speed = parse_speed(speed)
+        if payload_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"Unknown payload format: {payload_format}")
+        self.payload_format = payload_format
+        self.batcher = MessageBatcher(batch_seconds, batch_bytes, batch_delay) if batch_seconds > 1 else None
+        self.hrv_interval = hrv_interval
+        self.hrv_window = hrv_window
+        self.views = parse_views(views)
+        if views_only and not self.views:
+            raise ValueError("views_only needs at least one view")
+        self.views_only = views_only
+        self.pool = None
         
         self.client = mqtt.Client()
         self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.reconnect_delay_set(config.RECONNECT_MIN_DELAY, config.RECONNECT_MAX_DELAY)
+        spool = None
+        if spool_mb > 0:
+            spool = MessageSpool(os.path.join(config.SPOOL_PATH, f"{topic_prefix.replace('/', '_')}.spool"),
+                                 max_bytes=int(spool_mb * 1024 * 1024))
+        self.pipeline = PublishPipeline(self.client, qos, max_in_flight=max_in_flight, queue_size=queue_size,
+                                        spool=spool, catchup_rate=catchup_rate)
         
-        self.processor = ECGProcessor(sampling_rate=128)
+        self.cache = ECGCache(base_path) if use_cache else None
+        self.hr_cache = HeartRateCache() if use_hr_cache else None
+        self.processor = ECGProcessor(sampling_rate=128, cache=self.cache, hr_cache=self.hr_cache)
         
+        # Timestamp of the message after the last one sent, so consecutive streams never go back in time
+        self.next_timestamp = None
         self.running = False
         
     def on_connect(self, client, userdata, flags, rc):
@@ -64,14 +125,88 @@ class SmartWatchSimulator:
         """
         if rc == 0:
             print(f"Connected to MQTT broker at {self.broker}:{self.port}")
-            status = {
-                "status": "connected",
-                "timestamp": time.time()
-            }
-            self.client.publish(f"{self.topic_prefix}/status", json.dumps(status), qos=self.qos)
+            self.client.publish(f"{self.topic_prefix}/status", json.dumps(self.get_status()), qos=self.qos)
+            pending = self.pipeline.spool is not None and len(self.pipeline.spool)
+            if pending:
+                print(f"Draining {pending} spooled messages at {self.pipeline.catchup_rate:g} msg/s")
+            self.pipeline.set_connected(True)
         else:
             print(f"Failed to connect to MQTT broker, return code: {rc}")
     
+    def on_disconnect(self, client, userdata, rc):
+        """
+        Callback function for MQTT disconnection.
+        
+        paho reconnects by itself from the network loop, waiting between
+        RECONNECT_MIN_DELAY and RECONNECT_MAX_DELAY seconds with exponential backoff.
+        
+        Args:
+            client: MQTT client instance
+            userdata: User data passed to client
+            rc (int): Reason code, 0 for a disconnect requested by the simulator
+        """
+        self.pipeline.set_connected(False)
+        if rc != 0:
+            target = "spooling messages" if self.pipeline.spool is not None else "messages may be lost"
+            print(f"Lost connection to MQTT broker (code {rc}), reconnecting; {target}")
+    
+    def connect(self):
+        """
+        Connect to the MQTT broker and start the network loop.
+        
+        With a spool, an unreachable broker is not fatal: the network loop keeps
+        retrying in the background and messages are spooled until it succeeds.
+        
+        Returns:
+            bool: True if the simulation can start publishing
+        """
+        try:
+            self.client.connect(self.broker, self.port)
+        except Exception as e:
+            if self.pipeline.spool is None:
+                print(f"Error connecting to MQTT broker: {e}")
+                return False
+            print(f"Error connecting to MQTT broker: {e}; retrying in the background and spooling messages")
+            self.client.connect_async(self.broker, self.port)
+        self.client.loop_start()
+        return True
+    
+    def get_status(self):
+        """
+        Build the message published on the status topic after connecting.
+        
+        Returns:
+            dict: Status payload
+        """
+        status = {
+            "status": "connected",
+            "timestamp": time.time()
+        }
+        status.update(payload_format_status(self.payload_format))
+        if self.batcher is not None:
+            status["batch_seconds"] = self.batcher.max_messages
+        if self.hrv_interval > 0:
+            status["hrv_interval"] = self.hrv_interval
+            status["hrv_window"] = self.hrv_window
+        if self.views:
+            status["views"] = [name if points is None else f"{name}:{points}" for name, points in self.views.items()]
+        if self.views_only:
+            status["views_only"] = True
+        return status
+    
+    def create_pool(self):
+        """
+        Create the prepared participant pool for the configured session.
+        
+        Returns:
+            ParticipantPool: Pool sharing this simulator's dataset and heart rate caches
+        """
+        return ParticipantPool(self.base_path, self.session, max_videos=self.max_videos,
+                               window_seconds=3, method=config.HEART_RATE_METHOD,
+                               gap_fill=self.gap_fill, sampling_rate=self.processor.sampling_rate,
+                               memory_budget_mb=self.pool_memory_mb,
+                               cache=self.cache, hr_cache=self.hr_cache)
+    
     def load_data(self, session=None, participant=None):
         """
         Load ECG data for the simulation.
@@ -102,18 +237,7 @@ class SmartWatchSimulator:
         Returns:
             list: Sorted list of participant IDs available in the dataset
         """
-        participants = set()
-        ecg_path = os.path.join(self.base_path, "Raw Data", "Multimodal", "ECG")
-        
-        for filename in os.listdir(ecg_path):
-            if filename.lower().startswith(f"ecgdata_s{self.session}p"):
-                try:
-                    p_str = filename.lower().split(f"s{self.session}p")[1].split("v")[0]
-                    participants.add(int(p_str))
-                except (IndexError, ValueError):
-                    continue
-        
-        return sorted(list(participants))
+        return get_catalog(self.base_path).participants(self.session)
     
     def start(self):
         """
@@ -122,11 +246,7 @@ class SmartWatchSimulator:
         Returns:
             bool: True if simulation completes successfully, False otherwise
         """
-        try:
-            self.client.connect(self.broker, self.port)
-            self.client.loop_start()
-        except Exception as e:
-            print(f"Error connecting to MQTT broker: {e}")
+        if not self.connect():
             return False
         
         self.running = True
@@ -140,12 +260,25 @@ class SmartWatchSimulator:
                 
                 print(f"Available participants for session {self.session}: {available_participants}")
                 
+                self.pool = self.create_pool()
+                next_participant = random.choice(available_participants)
+                
                 while self.running:
-                    participant = random.choice(available_participants)
+                    participant = next_participant
                     print(f"Selected participant: {participant}")
+                    prepared = self.pool.get(participant)
+                    
+                    # Prepare the following participant while this one streams
+                    next_participant = random.choice(available_participants)
+                    self.pool.prefetch(next_participant)
                     
-                    if not self.process_and_send_data(participant=participant):
+                    if prepared is None:
                         print(f"Failed to process data for participant {participant}")
+                    else:
+                        print(f"Source files: {', '.join(prepared.source_files)}")
+                        self.stream_data(prepared.ecg_data, prepared.heart_rates, prepared.hr_measured,
+                                         prepared.source_files, participant, r_peaks=prepared.r_peaks,
+                                         hr_quality=prepared.hr_quality)
                     
                     if not self.running:
                         break
@@ -181,49 +314,120 @@ class SmartWatchSimulator:
         if not self.load_data(session, participant):
             return False
         
-        self.processor.calculate_heart_rate(window_seconds=3)
-        if not self.processor.heart_rates:
+        self.processor.calculate_heart_rate(window_seconds=3, method=config.HEART_RATE_METHOD, gap_fill=self.gap_fill)
+        if len(self.processor.heart_rates) == 0:
             print("Failed to calculate heart rates")
             return False
+        if self.hr_cache is not None:
+            stats = self.hr_cache.stats()
+            print(f"Heart rate cache: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses")
             
         # Use raw ECG data directly without preprocessing
         ecg_data = self.processor.ecg_data
         if ecg_data is None:
             print("No ECG data available")
             return False
+        
+        return self.stream_data(ecg_data, self.processor.heart_rates, self.processor.hr_measured,
+                                self.processor.source_files,
+                                participant if participant is not None else self.participant,
+                                r_peaks=self.processor.r_peaks, hr_quality=self.processor.hr_quality)
+    
+    def stream_data(self, ecg_data, heart_rates, hr_measured, source_files, participant, r_peaks=None,
+                    hr_quality=None):
+        """
+        Publish prepared ECG data and heart rates one second at a time.
+        
+        Args:
+            ecg_data (np.ndarray): Raw ECG samples
+            heart_rates (np.ndarray): Heart rate for each second
+            hr_measured (np.ndarray): Whether each heart rate was measured or imputed
+            source_files (list): Source filenames of the ECG data
+            participant (int): Participant number reported in the payload
+            r_peaks (np.ndarray, optional): Beat sample indices; HRV messages are only published when given
+            hr_quality (np.ndarray, optional): Signal quality of each heart rate window
             
-        print(f"Streaming {len(self.processor.heart_rates)} seconds of data")
+        Returns:
+            bool: True if all data was sent, False if the simulation was stopped
+        """
+        print(f"Streaming {len(heart_rates)} seconds of data at speed {format_speed(self.speed)}")
+        # An accelerated replay runs ahead of the clock, so the next stream continues from its last timestamp
+        start_timestamp = time.time() if self.next_timestamp is None else max(time.time(), self.next_timestamp)
+        scheduler = PublishScheduler(self.data_interval, self.speed, timestamp=start_timestamp)
+        # Per-message output would dominate an accelerated replay, so report progress periodically instead
+        verbose = self.speed <= 1
+        next_report = time.monotonic() + 10.0
+        hrv = self.create_hrv() if r_peaks is not None else None
         
-        for i in range(len(self.processor.heart_rates)):
+        for i in range(len(heart_rates)):
             if not self.running:
+                print(f"Scheduler: {scheduler.summary()}")
                 return False
                 
-            heart_rate = self.processor.heart_rates[i]
-            
-            start_idx = i * self.processor.sampling_rate
-            end_idx = start_idx + self.processor.sampling_rate
-            if end_idx <= len(ecg_data):
-                ecg_samples = ecg_data[start_idx:end_idx].tolist()
-                
-                zone = self.get_heart_rate_zone(heart_rate)
-                
-                payload = {
-                    "timestamp": time.time(),
-                    "heart_rate": heart_rate,
-                    "zone": zone,
-                    "ecg_samples": ecg_samples,
-                    "source": self.processor.source_files[0] if self.processor.source_files else "unknown",
-                    "participant": participant if participant is not None else self.participant
-                }
-                
-                self.publish_data(payload)
-                
-                print(f"Time: {i}s | Heart Rate: {heart_rate} BPM | Zone: {zone}")
+            payload = self.build_payload(ecg_data, heart_rates, hr_measured, i, source_files, participant,
+                                         timestamp=scheduler.timestamp(), hr_quality=hr_quality)
+            if payload is not None:
+                scheduler.wait()
+                self.next_timestamp = scheduler.timestamp()
+                self.publish_data(payload, r_peaks=r_peaks, second=i)
+                self.flush_batches()
+                if hrv is not None:
+                    hrv_payload = self.update_hrv(hrv, r_peaks, i, payload["timestamp"], participant)
+                    if hrv_payload is not None:
+                        self.publish_hrv(hrv_payload)
                 
-                time.sleep(self.data_interval)
+                if verbose:
+                    heart_rate = payload["heart_rate"]
+                    zone = payload["zone"]
+                    print(f"Time: {i}s | Heart Rate: {heart_rate} BPM | Zone: {zone}")
+                elif time.monotonic() >= next_report:
+                    print(f"Time: {i}s | Scheduler: {scheduler.summary()}")
+                    next_report += 10.0
         
+        self.flush_batches(everything=True)
+        print(f"Scheduler: {scheduler.summary()}")
+        print(f"Publish pipeline: {self.pipeline.summary()}")
         return True
     
+    def build_payload(self, ecg_data, heart_rates, hr_measured, second, source_files, participant, timestamp=None,
+                      hr_quality=None):
+        """
+        Build the message for one second of data.
+        
+        Args:
+            ecg_data (np.ndarray): Raw ECG samples
+            heart_rates (np.ndarray): Heart rate for each second
+            hr_measured (np.ndarray): Whether each heart rate was measured or imputed
+            second (int): Index of the second to send
+            source_files (list): Source filenames of the ECG data
+            participant (int): Participant number reported in the payload
+            timestamp (float, optional): Timestamp of the second. Defaults to the current time
+            hr_quality (np.ndarray, optional): Signal quality of each heart rate window, sent as "quality"
+            
+        Returns:
+            dict: Data payload, or None if the ECG data does not cover the whole second
+        """
+        sampling_rate = self.processor.sampling_rate
+        start_idx = second * sampling_rate
+        end_idx = start_idx + sampling_rate
+        if end_idx > len(ecg_data):
+            return None
+        
+        heart_rate = int(heart_rates[second])
+        quality = None
+        if hr_quality is not None and second < len(hr_quality):
+            quality = round(float(hr_quality[second]), 2)
+        return {
+            "timestamp": time.time() if timestamp is None else timestamp,
+            "heart_rate": heart_rate,
+            "measured": bool(hr_measured[second]),
+            "quality": quality,
+            "zone": self.get_heart_rate_zone(heart_rate),
+            "ecg_samples": ecg_data[start_idx:end_idx],
+            "source": source_files[0] if source_files else "unknown",
+            "participant": participant
+        }
+    
     def get_heart_rate_zone(self, heart_rate):
         """
         Determine the heart rate zone based on heart rate value.
@@ -255,19 +459,122 @@ class SmartWatchSimulator:
         else:
             return 5
     
-    def publish_data(self, payload):
+    def create_hrv(self):
+        """
+        Create the rolling HRV window of one stream.
+        
+        Returns:
+            RollingHRV: Empty window, or None if HRV messages are disabled
+        """
+        if self.hrv_interval <= 0:
+            return None
+        return RollingHRV(self.hrv_window, self.processor.sampling_rate)
+    
+    def update_hrv(self, hrv, r_peaks, second, timestamp, participant):
+        """
+        Add the beats of one second to an HRV window and build an HRV message when one is due.
+        
+        Args:
+            hrv (RollingHRV): Window of the stream
+            r_peaks (np.ndarray): Sorted beat sample indices of the stream
+            second (int): Index of the second that was just sent
+            timestamp (float): Timestamp of that second
+            participant (int): Participant number reported in the payload
+            
+        Returns:
+            dict: HRV payload every hrv_interval seconds, None otherwise
+        """
+        sampling_rate = self.processor.sampling_rate
+        end = (second + 1) * sampling_rate
+        lo, hi = np.searchsorted(r_peaks, [end - sampling_rate, end])
+        hrv.add_beats(r_peaks[lo:hi])
+        hrv.advance(end)
+        if (second + 1) % self.hrv_interval:
+            return None
+        payload = {"timestamp": timestamp, "participant": participant, "window_seconds": self.hrv_window}
+        payload.update(hrv.metrics())
+        return payload
+    
+    def publish_hrv(self, payload, topic=None):
+        """
+        Publish HRV metrics as JSON, outside the data batches.
+        
+        Args:
+            payload (dict): HRV payload from update_hrv
+            topic (str, optional): Topic to publish on. Defaults to <topic_prefix>/hrv
+        """
+        self.pipeline.submit(topic or f"{self.topic_prefix}/hrv", json.dumps(payload))
+    
+    def publish_data(self, payload, topic=None, r_peaks=None, second=None):
         """
         Publish data to MQTT broker.
         
         Args:
             payload (dict): Data payload to publish
+            topic (str, optional): Topic to publish on. Defaults to <topic_prefix>/data
+            r_peaks (np.ndarray, optional): Beat sample indices of the stream, for the "peaks" view
+            second (int, optional): Index of the payload's second in the stream, for the "peaks" view
+        """
+        for message_topic, message in self.encode_messages(payload, topic, r_peaks, second):
+            self.pipeline.submit(message_topic, message)
+    
+    def encode_messages(self, payload, topic=None, r_peaks=None, second=None):
+        """
+        Encode a data payload and its configured views and pass them through the batcher.
+        
+        With views_only, the full-rate message on the data topic itself is left out.
+        
+        Args:
+            payload (dict): Data payload to publish
+            topic (str, optional): Topic to publish on. Defaults to <topic_prefix>/data
+            r_peaks (np.ndarray, optional): Beat sample indices of the stream, for the "peaks" view
+            second (int, optional): Index of the payload's second in the stream, for the "peaks" view
+            
+        Returns:
+            list: (topic, message) pairs ready to publish
+        """
+        topic = topic or f"{self.topic_prefix}/data"
+        messages = [] if self.views_only else [(topic, encode_payload(payload, self.payload_format))]
+        for view, points in self.views.items():
+            message = build_view(payload, view, points, r_peaks, second, self.processor.sampling_rate)
+            if message is not None:
+                messages.append((view_topic(topic, view), message))
+        if self.batcher is None:
+            return messages
+        return [ready for message_topic, message in messages for ready in self.batcher.add(message_topic, message)]
+    
+    def due_batches(self, everything=False):
         """
-        message = json.dumps(payload)
-        self.client.publish(f"{self.topic_prefix}/data", message, qos=self.qos)
+        Take the buffered batches that have waited long enough.
+        
+        Args:
+            everything (bool): Take every buffered batch regardless of age
+            
+        Returns:
+            list: (topic, batch) pairs ready to publish
+        """
+        if self.batcher is None:
+            return []
+        return self.batcher.flush() if everything else self.batcher.due()
+    
+    def flush_batches(self, everything=False):
+        """
+        Publish buffered batches that have waited long enough.
+        
+        Args:
+            everything (bool): Publish every buffered batch regardless of age
+        """
+        for topic, batch in self.due_batches(everything):
+            self.pipeline.submit(topic, batch)
     
     def stop(self):
         """Stop the simulation and disconnect from MQTT broker."""
         self.running = False
+        self.flush_batches(everything=True)
+        self.pipeline.close(timeout=self.pipeline.queue_timeout)
+        print(f"Publish pipeline: {self.pipeline.summary()}")
+        if self.pool is not None:
+            self.pool.close()
         self.client.loop_stop()
         self.client.disconnect()
         print("Disconnected from MQTT broker")
@@ -277,14 +584,15 @@ def signal_handler(sig, frame):
     """
     Signal handler for graceful termination.
     
+    Raises KeyboardInterrupt so the running simulation unwinds and start()
+    stops the simulator exactly once.
+    
     Args:
         sig: Signal number
         frame: Current stack frame
     """
     print("\nReceived signal to terminate")
-    if simulator:
-        simulator.stop()
-    sys.exit(0)
+    raise KeyboardInterrupt
 
 
 if __name__ == "__main__":
@@ -299,13 +607,38 @@ if __name__ == "__main__":
     parser.add_argument("--loop", action="store_true", default=True, help="Loop the data continuously (default: True)")
     parser.add_argument("--random", action="store_true", default=False, help="Randomly select participants when looping (default: False)")
     parser.add_argument("--max-videos", type=int, default=1, help="Maximum number of videos to include per participant (default: 1, only v1)")
+    parser.add_argument("--gap-fill", default=config.GAP_FILL_STRATEGY, choices=["hold", "interpolate", "jitter"], help="How to fill seconds without a heart rate measurement")
+    parser.add_argument("--pool-memory-mb", type=float, default=config.POOL_MEMORY_BUDGET_MB, help="Memory budget in MB for participants kept ready in random mode")
+    parser.add_argument("--no-hr-cache", action="store_true", default=False, help="Recompute heart rates instead of using the heart rate cache")
+    parser.add_argument("--no-cache", action="store_true", default=False, help="Parse the text .dat files instead of using the binary cache")
+    parser.add_argument("--payload-format", default=config.PAYLOAD_FORMAT, choices=PAYLOAD_FORMATS, help="Encoding of data messages: json (Node-RED dashboard), f32, delta16 or varint binary frames")
+    parser.add_argument("--views", default=config.ECG_VIEWS, help="Extra representations published on <topic>/data/<view>, comma-separated: minmax[:points], lttb[:points], varint, peaks")
+    parser.add_argument("--views-only", action="store_true", default=config.ECG_VIEWS_ONLY, help="Publish only the --views, not the full-rate data messages on <topic>/data")
+    parser.add_argument("--batch-seconds", type=int, default=config.BATCH_SECONDS, help="Seconds of data combined into one MQTT message (default: 1, no batching)")
+    parser.add_argument("--batch-bytes", type=int, default=config.BATCH_MAX_BYTES, help="Publish a batch early once it reaches this many bytes")
+    parser.add_argument("--batch-delay", type=float, default=config.BATCH_MAX_DELAY, help="Publish a batch once its oldest second has waited this many seconds")
+    parser.add_argument("--max-in-flight", type=int, default=config.PUBLISH_MAX_IN_FLIGHT, help="Messages published but not yet acknowledged by the broker")
+    parser.add_argument("--queue-size", type=int, default=config.PUBLISH_QUEUE_SIZE, help="Messages waiting to be published before the simulator slows down")
+    parser.add_argument("--spool-mb", type=float, default=config.SPOOL_MAX_MB, help="Size in MB of the on-disk spool for messages published while disconnected (0 disables it)")
+    parser.add_argument("--catchup-rate", type=float, default=config.SPOOL_CATCHUP_RATE, help="Spooled messages published per second after reconnecting")
+    parser.add_argument("--hrv-interval", type=int, default=config.HRV_PUBLISH_INTERVAL, help="Seconds of data between HRV messages on <topic>/hrv (0 disables them)")
+    parser.add_argument("--hrv-window", type=float, default=config.HRV_WINDOW_SECONDS, help="Length in seconds of the window HRV metrics are computed over")
+    parser.add_argument("--speed", type=parse_speed, default=config.DEFAULT_REPLAY_SPEED, help="Replay speed multiplier such as 1x, 10x or max (default: 1x)")
+    parser.add_argument("--devices", type=int, default=config.DEFAULT_FLEET_DEVICES, help="Number of virtual smartwatches to simulate (default: 1)")
+    parser.add_argument("--stagger", type=float, default=None, help="Delay in seconds between device starts in fleet mode (default: interval / devices)")
     
     args = parser.parse_args()
+    try:
+        parse_views(args.views)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.views_only and not args.views:
+        parser.error("--views-only needs --views")
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    simulator = SmartWatchSimulator(
+    simulator_args = dict(
         broker=args.broker,
         port=args.port,
         qos=args.qos,
@@ -315,7 +648,30 @@ if __name__ == "__main__":
         data_interval=args.interval,
         loop_forever=args.loop,
         max_videos=args.max_videos,
-        random_participants=args.random
+        random_participants=args.random,
+        use_cache=not args.no_cache,
+        gap_fill=args.gap_fill,
+        use_hr_cache=not args.no_hr_cache,
+        pool_memory_mb=args.pool_memory_mb,
+        speed=args.speed,
+        payload_format=args.payload_format,
+        batch_seconds=args.batch_seconds,
+        batch_bytes=args.batch_bytes,
+        batch_delay=args.batch_delay,
+        max_in_flight=args.max_in_flight,
+        queue_size=args.queue_size,
+        spool_mb=args.spool_mb,
+        catchup_rate=args.catchup_rate,
+        hrv_interval=args.hrv_interval,
+        hrv_window=args.hrv_window,
+        views=args.views,
+        views_only=args.views_only
     )
     
+    if args.devices > 1:
+        from fleet_simulator import FleetSimulator
+        simulator = FleetSimulator(devices=args.devices, stagger=args.stagger, **simulator_args)
+    else:
+        simulator = SmartWatchSimulator(**simulator_args)
+    
     simulator.start()
\ No newline at end of file
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Pooled, caching proxy to the internal Node-RED HTTP endpoints.
+
+Upstream requests reuse persistent HTTP/1.1 connections from a small pool
+instead of opening a connection per request. For each API path the proxy
+remembers which Node-RED path variant answered (/api/heartrate or /heartrate)
+and tries it first. Successful responses are cached for a short TTL, and
+concurrent requests for a path that is being fetched wait for that fetch
+instead of starting their own, so any number of polling dashboards cost at
+most one upstream request per path and TTL window.
+
+The Node-RED endpoints ignore query strings, so requests are keyed and
+forwarded by their path alone; cache-busting parameters neither bypass the
+cache nor add entries. Expired entries are removed when they are looked up,
+and the cache holds at most CACHE_MAX_ENTRIES paths.
+"""
+import time
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlparse
+import numpy as np
+
+LATENCY_SAMPLES = 1024
+CACHE_MAX_ENTRIES = 256
+
+PATH_VARIANTS = {
+    '/api/heartrate': ['/api/heartrate', '/heartrate'],
+    '/api/status': ['/api/status', '/status'],
+}
+
+
+def api_path(path):
+    """
+    Get the path of a request without its query string, as Node-RED routes it.
+
+    Args:
+        path (str): Request path, possibly with a query string
+
+    Returns:
+        str: Path part of the request
+    """
+    return urlparse(path).path
+
+
+class UpstreamError(Exception):
+    """Raised when no path variant of a request could be served by Node-RED."""
+
+    def __init__(self, message, tried_paths):
+        super().__init__(message)
+        self.tried_paths = tried_paths
+
+
+class ConnectionPool:
+    def __init__(self, host, port, size=8, timeout=5):
+        """
+        Initialize the pool.
+
+        Args:
+            host (str): Upstream host
+            port (int): Upstream port
+            size (int): Idle connections kept for reuse
+            timeout (float): Socket timeout of each connection in seconds
+        """
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.created += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def get(self, path):
+        """
+        Send a GET request on a pooled connection.
+
+        A reused connection that the server has closed in the meantime is
+        replaced by a new one and the request is sent again.
+
+        Args:
+            path (str): Request path
+
+        Returns:
+            tuple: (status, content type, body bytes)
+
+        Raises:
+            OSError: If the upstream cannot be reached
+            http.client.HTTPException: If the upstream response is malformed
+        """
+        connection, reused = self._acquire()
+        while True:
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+                connection, reused = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+                with self._lock:
+                    self.created += 1
+                continue
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, response.headers.get('Content-Type', 'application/json'), body
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+class NodeRedProxy:
+    def __init__(self, host='localhost', port=1880, cache_ttl=0.5, pool_size=8, timeout=5):
+        """
+        Initialize the proxy.
+
+        Args:
+            host (str): Node-RED host
+            port (int): Node-RED port
+            cache_ttl (float): Seconds a successful response is served from the cache, 0 disables caching
+            pool_size (int): Idle upstream connections kept for reuse
+            timeout (float): Upstream socket timeout in seconds
+        """
+        self.cache_ttl = cache_ttl
+        self.pool = ConnectionPool(host, port, size=pool_size, timeout=timeout)
+        self._working_paths = {}
+        self._cache = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._latencies = np.zeros(LATENCY_SAMPLES)
+        self._latency_count = 0
+
+        self.cache_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+
+    def candidate_paths(self, path):
+        """
+        Get the Node-RED paths to try for an API path, the last working one first.
+
+        Args:
+            path (str): Requested API path
+
+        Returns:
+            list: Upstream paths in the order they should be tried
+        """
+        path = api_path(path)
+        variants = PATH_VARIANTS.get(path, [path])
+        working = self._working_paths.get(path)
+        if working is None:
+            return list(variants)
+        return [working] + [variant for variant in variants if variant != working]
+
+    def fetch(self, path):
+        """
+        Get the response for an API path from the cache or from Node-RED.
+
+        Args:
+            path (str): Requested API path
+
+        Returns:
+            tuple: (status, content type, body bytes)
+
+        Raises:
+            UpstreamError: If Node-RED could not serve the request
+        """
+        path = api_path(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self.cache_hits += 1
+                    return cached[1]
+                del self._cache[path]
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = [threading.Event(), None, None]
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            pending[0].wait()
+            if pending[2] is not None:
+                raise pending[2]
+            return pending[1]
+
+        try:
+            result = self._fetch_upstream(path)
+            pending[1] = result
+            if self.cache_ttl > 0:
+                with self._lock:
+                    self._store(path, result)
+            return result
+        except Exception as e:
+            pending[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[path]
+            pending[0].set()
+
+    def _store(self, path, result):
+        now = time.monotonic()
+        if path not in self._cache and len(self._cache) >= CACHE_MAX_ENTRIES:
+            for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[key]
+            if len(self._cache) >= CACHE_MAX_ENTRIES:
+                # Entries are inserted in time order, so the first one expires first
+                del self._cache[next(iter(self._cache))]
+        self._cache.pop(path, None)
+        self._cache[path] = (now + self.cache_ttl, result)
+
+    def _fetch_upstream(self, path):
+        tried = []
+        for upstream_path in self.candidate_paths(path):
+            tried.append(upstream_path)
+            start = time.monotonic()
+            try:
+                status, content_type, body = self.pool.get(upstream_path)
+            except (OSError, http.client.HTTPException) as e:
+                with self._lock:
+                    self.upstream_requests += 1
+                    self.upstream_errors += 1
+                raise UpstreamError(f"Connection error for {upstream_path}: {e}", tried)
+            with self._lock:
+                self.upstream_requests += 1
+                self._latencies[self._latency_count % LATENCY_SAMPLES] = time.monotonic() - start
+                self._latency_count += 1
+
+            if status == 404:
+                with self._lock:
+                    if self._working_paths.get(path) == upstream_path:
+                        del self._working_paths[path]
+                continue
+            if status >= 400:
+                with self._lock:
+                    self.upstream_errors += 1
+                raise UpstreamError(f"Node-RED returned {status} for {upstream_path}", tried)
+            if path in PATH_VARIANTS:
+                with self._lock:
+                    self._working_paths[path] = upstream_path
+            return status, content_type, body
+
+        with self._lock:
+            self.upstream_errors += 1
+        raise UpstreamError("All endpoint variations returned 404", tried)
+
+    def stats(self):
+        """
+        Get proxy counters.
+
+        Returns:
+            dict: cache hits and misses, coalesced requests, upstream requests and errors, cache hit rate,
+                cached paths, pooled connections created, memoized path variants and upstream latency p50/p99 in ms
+        """
+        with self._lock:
+            latencies = self._latencies[:min(self._latency_count, LATENCY_SAMPLES)]
+            p50, p99 = (np.percentile(latencies, [50, 99]) * 1000) if len(latencies) else (0.0, 0.0)
+            served = self.cache_hits + self.coalesced + self.misses
+            return {
+                'cache_ttl': self.cache_ttl,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.misses,
+                'coalesced': self.coalesced,
+                'upstream_requests': self.upstream_requests,
+                'upstream_errors': self.upstream_errors,
+                'cache_hit_rate': (self.cache_hits + self.coalesced) / served if served else 0.0,
+                'cache_entries': len(self._cache),
+                'connections_created': self.pool.created,
+                'working_paths': dict(self._working_paths),
+                'upstream_p50_ms': float(p50),
+                'upstream_p99_ms': float(p99)
+            }